@@ -0,0 +1,120 @@
+# ann_index.py - approximate nearest-neighbour FAISS indexes (IVF-Flat, IVF-PQ, HNSW)
+#
+# The LangChain store keeps its exact flat index (it is the persisted source of
+# truth and what segments replay into). When FAISS_INDEX_TYPE is not "flat", an
+# ANN index trained on those same vectors serves the searches; its row i is the
+# flat index's row i, so index_to_docstore_id maps both.
+#
+# Persisted next to the snapshot as ann/index.faiss + ann/ann.json so restarts
+# reuse the trained index and only add the vectors appended since.
+import json
+import math
+import os
+import shutil
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from config import settings
+from logger import logger
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+ANN_DIR = "ann"
+
+
+def index_params(index_type: str = settings.FAISS_INDEX_TYPE) -> Dict[str, int]:
+    """Build-time parameters from settings; part of the persisted index's identity"""
+    if index_type == "hnsw":
+        return {"m": settings.FAISS_HNSW_M, "ef_construction": settings.FAISS_HNSW_EF_CONSTRUCTION}
+    if index_type == "ivf_flat":
+        return {"nlist": settings.FAISS_NLIST}
+    if index_type == "ivf_pq":
+        return {"nlist": settings.FAISS_NLIST, "pq_m": settings.FAISS_PQ_M, "pq_bits": settings.FAISS_PQ_BITS}
+    return {}
+
+
+def default_nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, with the >= 39 training points per centroid faiss asks for
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def build_index(vectors: np.ndarray, index_type: str, params: Optional[Dict[str, int]] = None) -> Optional[faiss.Index]:
+    """
+    Train (if needed) and fill an ANN index with vectors, in order.
+    Returns None for "flat" or when there are too few vectors to train on.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS_INDEX_TYPE '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+    if index_type == "flat":
+        return None
+
+    params = params if params is not None else index_params(index_type)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.add(vectors)
+        return index
+
+    nlist = params.get("nlist") or default_nlist(n)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        min_train = nlist
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        if dim % params["pq_m"]:
+            raise ValueError(f"FAISS_PQ_M={params['pq_m']} must divide the embedding dimension {dim}")
+        min_train = max(nlist, 2 ** params["pq_bits"])
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, params["pq_m"], params["pq_bits"])
+
+    if n < min_train:
+        logger.info(f"{n} vectors are too few to train {index_type} (need {min_train}) - searching the flat index")
+        return None
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: int = settings.FAISS_NPROBE,
+                      ef_search: int = settings.FAISS_HNSW_EF_SEARCH):
+    """Query-time recall/latency knobs"""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+        return
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+
+def save_ann(faiss_dir: str, index: faiss.Index, index_type: str, params: Dict[str, int], trained_on: int):
+    target = os.path.join(faiss_dir, ANN_DIR)
+    tmp_dir = target + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    faiss.write_index(index, os.path.join(tmp_dir, "index.faiss"))
+    with open(os.path.join(tmp_dir, "ann.json"), "w") as f:
+        json.dump({"type": index_type, "params": params, "ntotal": index.ntotal, "trained_on": trained_on}, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+
+
+def drop_ann(faiss_dir: str):
+    """Forget the persisted ANN index (its rows no longer match the flat index)"""
+    shutil.rmtree(os.path.join(faiss_dir, ANN_DIR), ignore_errors=True)
+
+
+def load_ann(faiss_dir: str, index_type: str, params: Dict[str, int]) -> Optional[Tuple[faiss.Index, int]]:
+    """(index, trained_on) for the persisted ANN index, if it was built with the current type and parameters"""
+    target = os.path.join(faiss_dir, ANN_DIR)
+    meta_path = os.path.join(target, "ann.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("type") != index_type or meta.get("params") != params:
+        logger.info(f"Persisted ANN index is {meta.get('type')} {meta.get('params')} - rebuilding as {index_type}")
+        return None
+    return faiss.read_index(os.path.join(target, "index.faiss")), meta.get("trained_on", meta.get("ntotal", 0))
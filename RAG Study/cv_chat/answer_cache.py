@@ -0,0 +1,150 @@
+# answer_cache.py - two-tier (exact + semantic) cache for /ask answers
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from profile_extractor import SKILL_ALIASES, parse_structured_query
+
+# sparse_index.TOKEN_PATTERN widened to Unicode letters: keeps c++ / c# / node.js (and accented names) whole
+QUESTION_TOKEN = re.compile(r"[^\W_][\w+#]*(?:[./][\w+#]+)*")
+# Single-word skill names and aliases, plus the bare "c" / "r" / "go" a question may use
+SKILL_TOKENS = frozenset(
+    name for canonical, aliases in SKILL_ALIASES.items() for name in (canonical, *aliases) if " " not in name
+)
+
+
+def question_tokens(question: str) -> List[str]:
+    return QUESTION_TOKEN.findall(question.lower())
+
+
+def normalize_question(question: str) -> str:
+    """Case, punctuation and whitespace-insensitive form used by the exact tier"""
+    return " ".join(question_tokens(question))
+
+
+def question_facets(question: str) -> Tuple:
+    """
+    What a question asks about beyond its wording: skill tokens (c vs c++ vs c#),
+    roles and minimum years. Near-identical embeddings with different facets are
+    different questions to a CV search.
+    """
+    skills = {token for token in question_tokens(question)
+              if token in SKILL_TOKENS or (token[0].isalpha() and ("+" in token or "#" in token))}
+    parsed = parse_structured_query(question) or {}
+    skills.update(parsed.get("skills", ()))
+    return frozenset(skills), frozenset(parsed.get("roles", ())), parsed.get("min_years")
+
+
+class AnswerCache:
+    """
+    LRU + TTL answer cache keyed on the FAISS index version and retrieval scope.
+
+    Tier 1 matches the normalized question text exactly. Tier 2 compares the
+    query embedding (the same MiniLM vector retrieval uses) against cached
+    questions and hits above similarity_threshold, but only for a cached question
+    with the same skills, roles and minimum years. Every entry carries the index
+    version it was computed against, so an upload, a candidate delete/update or /reset
+    makes it unreachable,
+    and the candidate scope (() = all candidates), so scoped answers never leak.
+    """
+
+    def __init__(self, max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = settings.ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = settings.ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        # (version, scope, normalized question) -> (answer, expires_at, vector or None, facets)
+        self._entries: "OrderedDict[Tuple, Tuple[str, float, Optional[np.ndarray], Tuple]]" = OrderedDict()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+    def _expired(self, expires_at: float, now: float) -> bool:
+        return expires_at < now
+
+    @staticmethod
+    def scope_key(candidate_ids=None) -> Tuple[str, ...]:
+        return tuple(sorted(set(candidate_ids))) if candidate_ids else ()
+
+    def get_exact(self, question: str, version: int, scope: Tuple[str, ...] = ()) -> Optional[str]:
+        key = (version, scope, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[1], now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return entry[0]
+
+    def get_semantic(self, question: str, vector, version: int, scope: Tuple[str, ...] = ()) -> Optional[str]:
+        """
+        Best cached answer for the same index version and question facets above the
+        similarity threshold. Counts the miss for the lookup.
+        """
+        query = self._unit(vector)
+        facets = question_facets(question)
+        now = time.time()
+        with self._lock:
+            keys: List[Tuple] = []
+            vectors = []
+            for key, (_, expires_at, cached_vector, cached_facets) in self._entries.items():
+                if (key[0] == version and key[1] == scope and cached_vector is not None
+                        and cached_facets == facets and not self._expired(expires_at, now)):
+                    keys.append(key)
+                    vectors.append(cached_vector)
+            if vectors:
+                scores = np.vstack(vectors) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    self._entries.move_to_end(keys[best])
+                    self._stats["semantic_hits"] += 1
+                    return self._entries[keys[best]][0]
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, question: str, version: int, answer: str, vector=None, scope: Tuple[str, ...] = ()):
+        key = (version, scope, normalize_question(question))
+        cached_vector = self._unit(vector) if vector is not None else None
+        facets = question_facets(question)
+        with self._lock:
+            self._entries[key] = (answer, time.time() + self.ttl_seconds, cached_vector, facets)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "exact_hit_rate": round(self._stats["exact_hits"] / lookups, 4) if lookups else 0.0,
+                "semantic_hit_rate": round(self._stats["semantic_hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,204 @@
+# batch_ingest.py - staged bulk CV ingestion
+#
+# parse (Docling, process pool) -> clean (name + lightweight_llm_validation, bounded threads;
+# golden chunk + section chunks) -> embed (one batched call) -> one FAISS commit + one candidate-store transaction for the whole batch.
+#
+# CLI (from cv_chat/):
+#   python batch_ingest.py ../demoCVforTest --parse-workers 4 --llm-concurrency 8
+#
+# The CLI opens the FAISS directory itself, so it refuses to run while a server holds it;
+# with the server up, POST the files to /upload-batch instead.
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from config import settings
+from logger import logger
+from candidate_manager import CandidateManager
+from converter_registry import convert_to_markdown, warm_up
+from profile_extractor import extract_profile
+from store_service import IndexLockedError, get_store_service, init_store_service
+from vector_store import (
+    compute_pdf_hash,
+    split_markdown_sections,
+    lightweight_llm_validation,
+    create_single_golden_chunk,
+    create_section_chunks,
+)
+
+
+def _clean_cv(item: Dict[str, Any], candidate_manager: CandidateManager) -> Dict[str, Any]:
+    """Stage 2: name extraction + LLM cleanup -> golden chunk (runs in the bounded LLM pool)"""
+    markdown = item["markdown"]
+    candidate_data = candidate_manager.build_candidate(item["filename"], markdown[:2000])
+    sections = split_markdown_sections(markdown)
+    final_content = lightweight_llm_validation(sections, candidate_data["candidate_name"])
+
+    golden_chunks = create_single_golden_chunk(final_content, candidate_data)
+    section_chunks = create_section_chunks(sections, candidate_data) if settings.SECTION_EMBEDDINGS_ENABLED else []
+
+    item["candidate"] = candidate_data
+    item["chunks"] = golden_chunks + section_chunks
+    item["profile"] = extract_profile("\n".join(chunk.page_content for chunk in golden_chunks))
+    return item
+
+
+def ingest_batch(
+    pdf_paths: List[str],
+    hash_index_file: str = settings.HASH_INDEX_FILE,
+    store=None,
+    candidate_db: str = settings.CANDIDATE_DB_FILE,
+    parse_workers: int = settings.BATCH_PARSE_WORKERS,
+    llm_concurrency: int = settings.BATCH_LLM_CONCURRENCY,
+    on_stage=None,
+) -> Dict[str, Any]:
+    """
+    Ingest many CVs at once. Returns per-file results plus per-stage timings.
+    parse_workers < 1 parses in this process (handy for small batches).
+    on_stage(name) is called as the batch enters dedupe / parse_and_clean / embed_and_commit.
+    """
+    if store is None:
+        store = get_store_service()
+    if on_stage is None:
+        on_stage = lambda stage: None
+    candidate_manager = CandidateManager(hash_index_file, candidate_db)
+    timings = {}
+
+    # Stage 0: dedupe against the candidate store and within the batch
+    on_stage("dedupe")
+    start = time.perf_counter()
+    results = [{"path": path, "filename": os.path.basename(path), "file_hash": compute_pdf_hash(path)}
+               for path in pdf_paths]
+    seen_hashes = candidate_manager.known_file_hashes(item["file_hash"] for item in results)
+    pending = []
+    for item in results:
+        if item["file_hash"] in seen_hashes:
+            item["status"] = "skipped"
+        else:
+            seen_hashes.add(item["file_hash"])
+            pending.append(item)
+    timings["dedupe"] = time.perf_counter() - start
+
+    # Stage 1 + 2: Docling parsing in processes, each result handed straight to the LLM pool
+    on_stage("parse_and_clean")
+    start = time.perf_counter()
+    cleaned = []
+    with ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="cv-clean") as llm_pool:
+        clean_futures = {}
+
+        def _submit_clean(item, markdown):
+            item["markdown"] = markdown
+            clean_futures[llm_pool.submit(_clean_cv, item, candidate_manager)] = item
+
+        if parse_workers >= 1 and len(pending) > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=parse_workers, mp_context=ctx, initializer=warm_up) as parse_pool:
+                parse_futures = {parse_pool.submit(convert_to_markdown, item["path"]): item for item in pending}
+                for future in as_completed(parse_futures):
+                    item = parse_futures[future]
+                    try:
+                        _submit_clean(item, future.result())
+                    except Exception as e:
+                        logger.error(f"Docling parse failed for {item['filename']}: {e}")
+                        item["status"], item["error"] = "failed", f"parse: {e}"
+        else:
+            for item in pending:
+                try:
+                    _submit_clean(item, convert_to_markdown(item["path"]))
+                except Exception as e:
+                    logger.error(f"Docling parse failed for {item['filename']}: {e}")
+                    item["status"], item["error"] = "failed", f"parse: {e}"
+
+        for future in as_completed(clean_futures):
+            item = clean_futures[future]
+            try:
+                cleaned.append(future.result())
+            except Exception as e:
+                logger.error(f"CV cleaning failed for {item['filename']}: {e}")
+                item["status"], item["error"] = "failed", f"clean: {e}"
+    timings["parse_and_clean"] = time.perf_counter() - start
+
+    # Stage 3: claim the files, then embed everything in one batched call and commit once
+    on_stage("embed_and_commit")
+    start = time.perf_counter()
+    # Another upload may have registered some of these files since the dedupe step
+    registered = candidate_manager.register_candidates([(item["file_hash"], item["candidate"]) for item in cleaned])
+    for item in cleaned:
+        if item["file_hash"] not in registered:
+            item["status"] = "skipped"
+    cleaned = [item for item in cleaned if item["file_hash"] in registered]
+    all_chunks = [chunk for item in cleaned for chunk in item["chunks"]]
+    if all_chunks:
+        try:
+            store.add_documents(all_chunks)
+        except Exception:
+            # Don't leave candidates behind that have no vectors
+            for item in cleaned:
+                candidate_manager.delete_candidate(item["candidate"]["candidate_id"])
+            raise
+        candidate_manager.set_candidate_profiles([(item["candidate"]["candidate_id"], item["profile"]) for item in cleaned])
+    for item in cleaned:
+        item["status"] = "indexed"
+    timings["embed_and_commit"] = time.perf_counter() - start
+
+    summary = {
+        "indexed": sum(1 for item in results if item.get("status") == "indexed"),
+        "skipped": sum(1 for item in results if item.get("status") == "skipped"),
+        "failed": sum(1 for item in results if item.get("status") == "failed"),
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "files": [
+            {
+                "filename": item["filename"],
+                "status": item.get("status"),
+                "candidate_id": item.get("candidate", {}).get("candidate_id"),
+                "candidate_name": item.get("candidate", {}).get("candidate_name"),
+                "error": item.get("error"),
+            }
+            for item in results
+        ],
+    }
+    logger.info(f"Batch ingest: {summary['indexed']} indexed, {summary['skipped']} skipped, "
+                f"{summary['failed']} failed, timings {summary['timings']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest CV PDFs into the cv_chat FAISS index")
+    parser.add_argument("paths", nargs="+", help="PDF files and/or folders containing PDFs")
+    parser.add_argument("--parse-workers", type=int, default=settings.BATCH_PARSE_WORKERS)
+    parser.add_argument("--llm-concurrency", type=int, default=settings.BATCH_LLM_CONCURRENCY)
+    parser.add_argument("--faiss-dir", default=settings.FAISS_DIR)
+    parser.add_argument("--hash-index", default=settings.HASH_INDEX_FILE, help="Legacy JSON index to migrate, if present")
+    parser.add_argument("--candidate-db", default=settings.CANDIDATE_DB_FILE)
+    args = parser.parse_args()
+
+    pdf_paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(
+                os.path.join(path, fname) for fname in sorted(os.listdir(path)) if fname.lower().endswith(".pdf")
+            )
+        elif path.lower().endswith(".pdf"):
+            pdf_paths.append(path)
+    if not pdf_paths:
+        raise SystemExit("No PDF files found")
+
+    try:
+        store = init_store_service(args.faiss_dir)
+    except IndexLockedError as e:
+        raise SystemExit(str(e))
+    summary = ingest_batch(pdf_paths, args.hash_index, store, args.candidate_db,
+                           args.parse_workers, args.llm_concurrency)
+
+    for entry in summary["files"]:
+        detail = entry["candidate_name"] or entry["error"] or ""
+        print(f"{entry['status']:<8} {entry['filename']}  {detail}")
+    print(f"indexed={summary['indexed']} skipped={summary['skipped']} failed={summary['failed']} "
+          f"timings={summary['timings']}")
+
+
+if __name__ == "__main__":
+    main()
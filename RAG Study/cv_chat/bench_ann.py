@@ -0,0 +1,99 @@
+# bench_ann.py - recall@k vs latency for the FAISS index types
+#
+# From cv_chat/:
+#   python bench_ann.py --synthetic 200000                  # clustered random unit vectors
+#   python bench_ann.py --faiss-dir faiss_index             # the vectors actually stored
+#   python bench_ann.py --synthetic 100000 --nprobe 4 16 64 --ef-search 32 64 128
+#
+# Ground truth is exact search over the same vectors. Queries are held-out
+# vectors with a little noise, so they resemble real questions landing near CVs.
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from config import settings
+from ann_index import build_index, index_params, set_search_params
+from segment_log import SegmentLog
+
+
+def synthetic_vectors(n: int, dim: int = 384, clusters: int = 256, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def stored_vectors(faiss_dir: str) -> np.ndarray:
+    store = SegmentLog(faiss_dir).load(None)
+    if store is None:
+        raise SystemExit(f"No FAISS index in {faiss_dir}")
+    return store.index.reconstruct_n(0, store.index.ntotal)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 11) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    noisy = picked + 0.05 * rng.standard_normal(picked.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def measure(index, queries, truth, k):
+    latencies = []
+    found = 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found += len(set(ids[0].tolist()) & set(truth[i].tolist()))
+    latencies.sort()
+    return found / truth.size, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of FAISS index types")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, default=50000, help="Number of synthetic vectors")
+    source.add_argument("--faiss-dir", help="Benchmark the vectors stored in this cv_chat FAISS directory")
+    parser.add_argument("--types", nargs="+", default=["flat", "ivf_flat", "ivf_pq", "hnsw"])
+    parser.add_argument("--k", type=int, default=settings.SEARCH_K)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+
+    vectors = stored_vectors(args.faiss_dir) if args.faiss_dir else synthetic_vectors(args.synthetic)
+    queries = make_queries(vectors, args.queries)
+    n, dim = vectors.shape
+    print(f"{n} vectors x {dim} dims, {len(queries)} queries, k={args.k}")
+
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{'index':<10} {'setting':<14} {'build':>8} {'recall@k':>9} {'p50':>9} {'p95':>9}")
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = exact if index_type == "flat" else build_index(vectors, index_type, index_params(index_type))
+        build_seconds = time.perf_counter() - start
+        if index is None:
+            print(f"{index_type:<10} skipped: not enough vectors to train")
+            continue
+
+        if index_type == "hnsw":
+            sweep = [("efSearch", value, {"ef_search": value}) for value in args.ef_search]
+        elif index_type.startswith("ivf"):
+            sweep = [("nprobe", value, {"nprobe": value}) for value in args.nprobe]
+        else:
+            sweep = [("exact", "", {})]
+
+        for name, value, knobs in sweep:
+            set_search_params(index, **knobs)
+            recall, p50, p95 = measure(index, queries, truth, args.k)
+            print(f"{index_type:<10} {f'{name}={value}' if value != '' else name:<14} {build_seconds:7.1f}s "
+                  f"{recall:9.3f} {p50:7.3f}ms {p95:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_context.py - prompt tokens and answer latency with and without context packing
+#
+# From cv_chat/, against the CVs already indexed in faiss_index (needs GOOGLE_API_KEY
+# unless --skip-llm):
+#   python bench_context.py --budget 3000
+#   python bench_context.py --skip-llm          # token savings only
+#
+# Every question retrieves once; the same chunks are then sent as full golden
+# chunks and as a packed context. Prompt tokens are the character-based estimate
+# from context_packer (the same one the budget uses).
+import argparse
+import statistics
+import time
+
+from config import settings
+from context_packer import estimate_tokens
+from rag import RAG_LLM, _build_rag_prompt, _retrieve
+import llm_client
+
+EVAL_QUESTIONS = [
+    "Which candidates know Python?",
+    "List the SQA candidates",
+    "Who has experience with React?",
+    "Which candidates have worked with Docker or Kubernetes?",
+    "Summarize the education of each candidate",
+    "Who has the most years of experience?",
+    "Which candidates have a computer science degree?",
+    "Who would fit a backend Java role?",
+    "Which candidates mention machine learning projects?",
+    "Compare the frontend developers",
+    "Who has worked with SQL databases?",
+    "Which candidates have leadership or team lead experience?",
+]
+
+
+def run(question, docs, packing, skip_llm):
+    prompt, _ = _build_rag_prompt(docs, question, packing=packing)
+    tokens = estimate_tokens(prompt)
+    if skip_llm:
+        return tokens, None
+    start = time.perf_counter()
+    llm_client.invoke(prompt, *RAG_LLM)
+    return tokens, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context packing: prompt tokens and answer latency")
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--skip-llm", action="store_true", help="Only compare prompt sizes")
+    args = parser.parse_args()
+    settings.CONTEXT_TOKEN_BUDGET = args.budget
+
+    full_tokens, packed_tokens, full_times, packed_times = [], [], [], []
+    print(f"{'question':<58} {'full tok':>9} {'packed':>7} {'saved':>6} {'full s':>7} {'packed s':>8}")
+    for question in EVAL_QUESTIONS:
+        docs = _retrieve(question, k=args.k)
+        if not docs:
+            print(f"{question[:58]:<58} no documents retrieved")
+            continue
+        full, full_seconds = run(question, docs, False, args.skip_llm)
+        packed, packed_seconds = run(question, docs, True, args.skip_llm)
+        full_tokens.append(full)
+        packed_tokens.append(packed)
+        if not args.skip_llm:
+            full_times.append(full_seconds)
+            packed_times.append(packed_seconds)
+        timing = "" if args.skip_llm else f" {full_seconds:6.2f}s {packed_seconds:7.2f}s"
+        print(f"{question[:58]:<58} {full:9d} {packed:7d} {1 - packed / full:5.0%}{timing}")
+
+    if not full_tokens:
+        print("Nothing retrieved - index some CVs first")
+        return
+    print(f"\nbudget {args.budget} tokens, {len(full_tokens)} questions")
+    print(f"prompt tokens: full {sum(full_tokens)} -> packed {sum(packed_tokens)} "
+          f"({1 - sum(packed_tokens) / sum(full_tokens):.0%} saved)")
+    if full_times:
+        print(f"answer latency p50: full {statistics.median(full_times):.2f}s -> "
+              f"packed {statistics.median(packed_times):.2f}s; "
+              f"mean {statistics.mean(full_times):.2f}s -> {statistics.mean(packed_times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_docling.py - seconds per CV: fresh default converter vs cached configured converter
+#
+# Usage (from cv_chat/):
+#   python bench_docling.py ../demoCVforTest
+import argparse
+import os
+import time
+
+from docling.document_converter import DocumentConverter
+
+from converter_registry import get_converter
+
+
+def list_pdfs(folder: str):
+    return sorted(
+        os.path.join(folder, fname) for fname in os.listdir(folder) if fname.lower().endswith(".pdf")
+    )
+
+
+def run_before(pdf_paths):
+    """Old behaviour: a fresh DocumentConverter() (OCR + tables on) for every CV"""
+    timings = []
+    for path in pdf_paths:
+        start = time.perf_counter()
+        DocumentConverter().convert(path).document.export_to_markdown()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_after(pdf_paths):
+    """New behaviour: one cached converter with CV_PIPELINE_OPTIONS, built up front"""
+    start = time.perf_counter()
+    converter = get_converter()
+    init_seconds = time.perf_counter() - start
+
+    timings = []
+    for path in pdf_paths:
+        start = time.perf_counter()
+        converter.convert(path).document.export_to_markdown()
+        timings.append(time.perf_counter() - start)
+    return init_seconds, timings
+
+
+def report(label, timings):
+    total = sum(timings)
+    print(f"{label:<8} {len(timings)} CVs  total {total:7.2f}s  "
+          f"mean {total / len(timings):6.2f}s/CV  max {max(timings):6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Docling conversion cost per CV")
+    parser.add_argument("folder", nargs="?", default="../demoCVforTest")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N PDFs")
+    args = parser.parse_args()
+
+    pdf_paths = list_pdfs(args.folder)
+    if args.limit:
+        pdf_paths = pdf_paths[:args.limit]
+    if not pdf_paths:
+        raise SystemExit(f"No PDFs found in {args.folder}")
+
+    before = run_before(pdf_paths)
+    init_seconds, after = run_after(pdf_paths)
+
+    report("before", before)
+    report("after", after)
+    print(f"after: one-off converter init {init_seconds:.2f}s, "
+          f"speedup {sum(before) / max(sum(after), 1e-9):.1f}x per CV")
+
+
+if __name__ == "__main__":
+    main()
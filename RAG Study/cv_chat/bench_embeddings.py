@@ -0,0 +1,72 @@
+# bench_embeddings.py - CPU embedding throughput (texts/sec)
+#
+# From cv_chat/:
+#   python bench_embeddings.py --count 2000 --batch-sizes 16 32 64 --threads 1 4
+#
+# Compares HuggingFaceEmbeddings with default settings against EmbeddingEngine
+# (length-sorted batches) over a mix of short queries and long CV sections.
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from config import settings
+from embedding_engine import EmbeddingEngine
+
+SNIPPETS = [
+    "Python developer",
+    "Experienced QA engineer with Selenium and Cypress.",
+    "Built REST APIs with Django and FastAPI, deployed on AWS using Docker and Kubernetes.",
+    "Led a team of five frontend engineers delivering a React and TypeScript dashboard for 20k daily users.",
+    "B.Sc. in Computer Science, thesis on graph neural networks for traffic forecasting.",
+]
+
+
+def make_texts(count: int, seed: int = 13):
+    rng = random.Random(seed)
+    # 1 to 40 snippets per text: anything from a query to a full CV section
+    return [" ".join(rng.choice(SNIPPETS) for _ in range(rng.randint(1, 40))) for _ in range(count)]
+
+
+def throughput(embed, texts, repeats):
+    embed(texts[:16])  # warm up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embed(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput on CPU")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = make_texts(args.count)
+    print(f"{args.count} texts, {sum(map(len, texts)) / len(texts):.0f} chars on average, model {args.model}")
+
+    baseline = HuggingFaceEmbeddings(model_name=args.model)
+    reference = np.asarray(baseline.embed_documents(texts[:64]), dtype=np.float32)
+    print(f"{'HuggingFaceEmbeddings (default)':<40} {throughput(baseline.embed_documents, texts, args.repeats):8.1f} texts/sec")
+
+    for threads in args.threads:
+        for batch_size in args.batch_sizes:
+            engine = EmbeddingEngine(args.model, batch_size=batch_size, num_threads=threads)
+            rate = throughput(engine.embed, texts, args.repeats)
+            vectors = engine.embed(texts[:64])
+            reference_unit = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            min_cosine = float(np.min(np.sum(vectors * reference_unit, axis=1)))
+            print(f"{f'EmbeddingEngine threads={threads} batch={batch_size}':<40} {rate:8.1f} texts/sec  "
+                  f"min cosine vs baseline {min_cosine:.5f}")
+
+
+if __name__ == "__main__":
+    main()
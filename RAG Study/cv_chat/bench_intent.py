@@ -0,0 +1,108 @@
+# bench_intent.py - local intent classifier vs the flash-lite LLM router
+#
+# From cv_chat/ (needs GOOGLE_API_KEY for the LLM side):
+#   python bench_intent.py --margin 0.05
+#
+# The held-out questions below are not in intent_classifier.SEED_EXAMPLES.
+# Reports routing latency for both routers, how often the local classifier is
+# confident, and agreement with the LLM on confident and on all questions.
+import argparse
+import statistics
+import time
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from config import settings
+from intent_classifier import IntentClassifier, CV_RELATED, GENERAL_KNOWLEDGE
+from rag import llm_determine_intent
+
+HELD_OUT = [
+    ("Which candidates have worked with Flutter?", CV_RELATED),
+    ("Who among the applicants knows TensorFlow?", CV_RELATED),
+    ("List everyone with a computer science degree", CV_RELATED),
+    ("Who would be a good QA lead?", CV_RELATED),
+    ("Which CVs mention PostgreSQL?", CV_RELATED),
+    ("Summarize the experience of the Java developers", CV_RELATED),
+    ("Who has the strongest frontend portfolio?", CV_RELATED),
+    ("Do any candidates speak German?", CV_RELATED),
+    ("Pick the best two people for a Python backend job", CV_RELATED),
+    ("How many years has Sarah worked in testing?", CV_RELATED),
+    ("Which candidate has internship experience?", CV_RELATED),
+    ("Who built an e-commerce project?", CV_RELATED),
+    ("Are there any candidates from a finance background?", CV_RELATED),
+    ("Compare the two most senior applicants", CV_RELATED),
+    ("What is a microservice architecture?", GENERAL_KNOWLEDGE),
+    ("Explain the CAP theorem", GENERAL_KNOWLEDGE),
+    ("How does TCP differ from UDP?", GENERAL_KNOWLEDGE),
+    ("What is Flutter?", GENERAL_KNOWLEDGE),
+    ("Who wrote Pride and Prejudice?", GENERAL_KNOWLEDGE),
+    ("What is the difference between a list and a tuple in Python?", GENERAL_KNOWLEDGE),
+    ("How do I prepare for a technical interview?", GENERAL_KNOWLEDGE),
+    ("What are SOLID principles?", GENERAL_KNOWLEDGE),
+    ("Good morning!", GENERAL_KNOWLEDGE),
+    ("Explain what PostgreSQL indexes do", GENERAL_KNOWLEDGE),
+    ("What is the boiling point of water?", GENERAL_KNOWLEDGE),
+    ("What is continuous integration?", GENERAL_KNOWLEDGE),
+    ("How should a CV be formatted?", GENERAL_KNOWLEDGE),
+    ("What is transfer learning?", GENERAL_KNOWLEDGE),
+]
+
+
+def ms(values):
+    return f"p50={statistics.median(values) * 1000:7.1f}ms  mean={statistics.mean(values) * 1000:7.1f}ms"
+
+
+def short(label):
+    return "-" if label is None else ("cv" if label == CV_RELATED else "gk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the local intent classifier with the LLM router")
+    parser.add_argument("--margin", type=float, default=settings.INTENT_MIN_MARGIN)
+    parser.add_argument("--skip-llm", action="store_true", help="Only score against the hand labels")
+    args = parser.parse_args()
+
+    embedding_model = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    classifier = IntentClassifier(embedding_model, min_margin=args.margin)
+    classifier.predict("warm up")
+
+    local_times, llm_times = [], []
+    rows = []
+    for question, expected in HELD_OUT:
+        start = time.perf_counter()
+        label, margin = classifier.predict(question)
+        local_times.append(time.perf_counter() - start)
+
+        llm_label = None
+        if not args.skip_llm:
+            start = time.perf_counter()
+            llm_label = llm_determine_intent(question)
+            llm_times.append(time.perf_counter() - start)
+        rows.append((question, expected, label, margin, llm_label))
+
+    confident = [row for row in rows if row[3] >= args.margin]
+    print(f"{'local':<6} {'margin':>6}  {'llm':<6} {'label':<6}  question")
+    for question, expected, label, margin, llm_label in rows:
+        flag = "" if margin >= args.margin else "  (-> LLM)"
+        print(f"{short(label):<6} {margin:6.3f}  {short(llm_label):<6} {short(expected):<6}  {question}{flag}")
+
+    print()
+    print(f"local classifier   {ms(local_times)}")
+    if llm_times:
+        print(f"LLM router         {ms(llm_times)}")
+    print(f"confident (margin >= {args.margin}): {len(confident)}/{len(rows)} "
+          f"({len(confident) / len(rows):.0%} of questions skip the LLM call)")
+    print(f"accuracy vs labels: all={sum(r[1] == r[2] for r in rows) / len(rows):.0%}  "
+          f"confident={sum(r[1] == r[2] for r in confident) / max(1, len(confident)):.0%}")
+    if not args.skip_llm:
+        print(f"agreement vs LLM:   all={sum(r[2] == r[4] for r in rows) / len(rows):.0%}  "
+              f"confident={sum(r[2] == r[4] for r in confident) / max(1, len(confident)):.0%}")
+        print(f"LLM accuracy vs labels: {sum(r[1] == r[4] for r in rows) / len(rows):.0%}")
+        # Routed latency: confident questions cost one local prediction, the rest also pay the LLM call
+        routed = [local + (0 if row[3] >= args.margin else llm)
+                  for local, llm, row in zip(local_times, llm_times, rows)]
+        print(f"hybrid routing     {ms(routed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# bench_load.py - /ask latency with and without uploads in flight
+#
+# Start the API with the answer cache off, so every /ask does the full retrieval + LLM work:
+#   ANSWER_CACHE_ENABLED=false uvicorn main:app --port 8000
+# then from cv_chat/:
+#   python bench_load.py --url http://localhost:8000 --pdfs ../demoCVforTest --requests 200
+#
+# Phase 1 measures /ask alone, phase 2 repeats it while uploads are being converted.
+# Each upload is a fresh copy of a sample CV (a trailing PDF comment changes its hash, so
+# dedup never skips it), and each uploader waits on /jobs/{id} before the next one, so
+# there is always a conversion in flight. With the ingest/query pools and async LLM
+# calls, p99 should stay roughly flat.
+# --stream asks for SSE and also reports time-to-first-token.
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+
+QUESTION_TEMPLATES = [
+    "List {} developers",
+    "Who has experience with {}?",
+    "Which candidates know {}?",
+    "Summarize the candidates who use {}",
+    "What is {} used for?",
+]
+SKILLS = ["Python", "React", "SQL", "Java", "C++", "C#", "Go", "Docker", "Kubernetes", "Django",
+          "Flutter", "TypeScript", "AWS", "Node.js", "Figma", "Selenium"]
+QUESTIONS = [template.format(skill) for skill, template in itertools.product(SKILLS, QUESTION_TEMPLATES)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def ask_load(client, total, concurrency, stream=False, first_tokens=None):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            data = {"question": QUESTIONS[i % len(QUESTIONS)]}
+            if not stream:
+                response = await client.post("/ask", data=data)
+                response.raise_for_status()
+            else:
+                first_token = None
+                async with client.stream("POST", "/ask", data={**data, "stream": "true"}) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if first_token is None and line.startswith("event: token"):
+                            first_token = time.perf_counter() - start
+                if first_tokens is not None and first_token is not None:
+                    first_tokens.append(first_token)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+def unique_copy(pdf_bytes: bytes) -> bytes:
+    """Same document, new file hash: readers ignore a comment after %%EOF"""
+    return pdf_bytes + f"\n% bench_load {uuid.uuid4().hex}\n".encode()
+
+
+async def wait_for_job(client, job_id, poll_interval=0.5):
+    while True:
+        response = await client.get(f"/jobs/{job_id}")
+        response.raise_for_status()
+        job = response.json()
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+async def upload_loop(client, pdf_paths, stop: asyncio.Event):
+    """Upload unique copies one at a time until stopped. Returns (indexed, failed)."""
+    indexed = failed = 0
+    for path in itertools.cycle(pdf_paths):
+        if stop.is_set():
+            break
+        with open(path, "rb") as f:
+            files = {"file": (os.path.basename(path), unique_copy(f.read()), "application/pdf")}
+        response = await client.post("/upload-pdf", files=files)
+        response.raise_for_status()
+        job = await wait_for_job(client, response.json()["job_id"])
+        if job["status"] == "done":
+            indexed += 1
+        else:
+            failed += 1
+            print(f"upload of {os.path.basename(path)} failed: {job['error']}")
+    return indexed, failed
+
+
+async def cache_hits(client) -> int:
+    response = await client.get("/cache/stats")
+    response.raise_for_status()
+    stats = response.json()
+    return stats["exact_hits"] + stats["semantic_hits"]
+
+
+def report(label, latencies):
+    print(f"{label:<18} n={len(latencies):<4} p50={percentile(latencies, 50) * 1000:8.1f}ms  "
+          f"p95={percentile(latencies, 95) * 1000:8.1f}ms  p99={percentile(latencies, 99) * 1000:8.1f}ms  "
+          f"mean={statistics.mean(latencies) * 1000:8.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load-test /ask with concurrent uploads")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pdfs", default="../demoCVforTest")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--uploaders", type=int, default=2)
+    parser.add_argument("--stream", action="store_true", help="Use SSE and report time-to-first-token")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(
+        os.path.join(args.pdfs, fname) for fname in os.listdir(args.pdfs) if fname.lower().endswith(".pdf")
+    )
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        idle_ttft, busy_ttft = [], []
+        hits_before = await cache_hits(client)
+        idle = await ask_load(client, args.requests, args.concurrency, args.stream, idle_ttft)
+
+        stop = asyncio.Event()
+        uploaders = [asyncio.create_task(upload_loop(client, pdf_paths, stop)) for _ in range(args.uploaders)]
+        busy = await ask_load(client, args.requests, args.concurrency, args.stream, busy_ttft)
+        stop.set()
+        results = await asyncio.gather(*uploaders)
+        hits = await cache_hits(client) - hits_before
+
+    report("/ask idle", idle)
+    report("/ask + uploads", busy)
+    if idle_ttft and busy_ttft:
+        report("TTFT idle", idle_ttft)
+        report("TTFT + uploads", busy_ttft)
+    print(f"uploads started in phase 2 and indexed: {sum(indexed for indexed, _ in results)} "
+          f"({sum(failed for _, failed in results)} failed)")
+    if hits:
+        print(f"warning: {hits} answers came from the answer cache; restart the API with ANSWER_CACHE_ENABLED=false")
+    print(f"p99 ratio (busy / idle): {percentile(busy, 99) / percentile(idle, 99):.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+# bench_multivector.py - single golden-chunk vectors vs golden + per-section vectors
+#
+# From cv_chat/, against the CVs already indexed in faiss_index:
+#   python bench_multivector.py --k 5 --queries-per-cv 5
+#
+# Known-item test: queries are lines taken from deep inside each CV (past
+# --min-offset characters, i.e. beyond what MiniLM sees of a whole golden chunk),
+# and a hit is the query's own candidate in the top k. Both indexes are built
+# in memory from the same golden chunks; sections are split the way ingest does.
+import argparse
+import random
+import time
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+
+from config import settings
+from candidate_pooling import pool_scores
+from context_packer import split_sections
+from embedding_engine import get_embedding_engine
+from segment_log import SegmentLog
+from vector_store import create_section_chunks
+
+
+def golden_chunks(faiss_dir: str):
+    store = SegmentLog(faiss_dir).load(None)
+    if store is None:
+        raise SystemExit(f"No FAISS index in {faiss_dir}")
+    chunks = {}
+    for doc in store.docstore._dict.values():
+        candidate_id = doc.metadata.get("candidate_id")
+        if candidate_id and doc.metadata.get("document_type") != "cv_section":
+            chunks.setdefault(candidate_id, doc)
+    return chunks
+
+
+def sections_of(doc: Document):
+    sections = {}
+    for header, text in split_sections(doc.page_content):
+        name = header or "Profile"
+        while name in sections:
+            name += " (cont.)"
+        sections[name] = text
+    return create_section_chunks(sections, {
+        "candidate_id": doc.metadata["candidate_id"],
+        "candidate_name": doc.metadata.get("candidate_name", "Unknown"),
+        "original_filename": doc.metadata.get("source", ""),
+    })
+
+
+def make_queries(chunks, per_cv: int, min_offset: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for candidate_id, doc in chunks.items():
+        lines = [line.strip(" -*•\t") for line in doc.page_content[min_offset:].split("\n")]
+        lines = [line for line in lines if len(line) >= 40 and not line.startswith("#")]
+        for line in rng.sample(lines, min(per_cv, len(lines))):
+            queries.append((line, candidate_id))
+    return queries
+
+
+def flat_index(vectors: np.ndarray):
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def evaluate(index, labels, query_vectors, targets, k, hits, pooling):
+    found_1 = found_k = 0
+    latencies = []
+    for vector, target in zip(query_vectors, targets):
+        start = time.perf_counter()
+        similarities, rows = index.search(vector[None, :], hits)
+        ranked = pool_scores(((labels[row], float(sim)) for sim, row in zip(similarities[0], rows[0]) if row != -1),
+                             pooling)[:k]
+        latencies.append(time.perf_counter() - start)
+        found_1 += bool(ranked) and ranked[0] == target
+        found_k += target in ranked
+    latencies.sort()
+    count = len(targets)
+    return (found_1 / count, found_k / count,
+            latencies[count // 2] * 1000, latencies[min(count - 1, int(count * 0.95))] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency: single-chunk vs multi-vector CV index")
+    parser.add_argument("--faiss-dir", default=settings.FAISS_DIR)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries-per-cv", type=int, default=5)
+    parser.add_argument("--min-offset", type=int, default=1000, help="Only query text past this many characters")
+    parser.add_argument("--hits", type=int, default=settings.RETRIEVAL_HITS, help="Section hits pooled per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    chunks = golden_chunks(args.faiss_dir)
+    queries = make_queries(chunks, args.queries_per_cv, args.min_offset, args.seed)
+    if not queries:
+        raise SystemExit("No CV text past --min-offset to query with")
+    engine = get_embedding_engine(settings.EMBEDDING_MODEL)
+
+    candidate_ids = list(chunks)
+    golden_vectors = engine.embed([chunks[candidate_id].page_content for candidate_id in candidate_ids])
+    section_docs = [section for candidate_id in candidate_ids for section in sections_of(chunks[candidate_id])]
+    section_vectors = engine.embed([doc.page_content for doc in section_docs])
+    query_vectors = engine.embed([question for question, _ in queries])
+    targets = [candidate_id for _, candidate_id in queries]
+
+    single = flat_index(golden_vectors)
+    multi = flat_index(np.vstack([golden_vectors, section_vectors]))
+    multi_labels = candidate_ids + [doc.metadata["candidate_id"] for doc in section_docs]
+
+    print(f"{len(candidate_ids)} CVs, {len(section_docs)} sections, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<22} {'vectors':>8} {'recall@1':>9} {f'recall@{args.k}':>9} {'p50':>9} {'p95':>9}")
+    runs = [("single golden chunk", single, candidate_ids, args.k, "max")]
+    runs += [(f"multi-vector ({pooling})", multi, multi_labels, args.hits, pooling) for pooling in ("max", "sum")]
+    for name, index, labels, hits, pooling in runs:
+        recall_1, recall_k, p50, p95 = evaluate(index, labels, query_vectors, targets, args.k, hits, pooling)
+        print(f"{name:<22} {index.ntotal:8d} {recall_1:9.3f} {recall_k:9.3f} {p50:7.3f}ms {p95:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_onnx.py - ONNX Runtime embedding backend vs torch: parity and latency
+#
+# From cv_chat/ (needs onnxruntime + onnx):
+#   python bench_onnx.py --count 500 --min-cosine 0.98
+#
+# Parity: cosine between torch and ONNX vectors for the same texts. Exits
+# non-zero if any backend falls below --min-cosine, so it doubles as a check
+# after upgrading transformers/onnxruntime.
+# Latency: single-query p50/p95 (the /ask path) and batch throughput (ingestion).
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from config import settings
+from bench_embeddings import make_texts
+from embedding_engine import EmbeddingEngine
+from onnx_embeddings import OnnxEmbeddingEngine
+
+QUERIES = [
+    "List Python developers",
+    "Who has experience with React?",
+    "Which candidates know SQL and have worked on data pipelines?",
+    "Summarize the SQA candidates",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def query_latency(engine, rounds):
+    engine.embed_query("warm up")
+    latencies = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        engine.embed_query(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def batch_rate(engine, texts):
+    engine.embed(texts[:16])
+    start = time.perf_counter()
+    engine.embed(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ONNX embedding backend with torch")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--query-rounds", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_THREADS)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = make_texts(args.count) + QUERIES
+    load_start = time.perf_counter()
+    torch_engine = EmbeddingEngine(args.model, num_threads=args.threads)
+    backends = {"torch": (torch_engine, time.perf_counter() - load_start)}
+    for label, quantize in (("onnx fp32", False), ("onnx int8", True)):
+        load_start = time.perf_counter()
+        engine = OnnxEmbeddingEngine(args.model, quantize=quantize, num_threads=args.threads)
+        backends[label] = (engine, time.perf_counter() - load_start)
+
+    reference = torch_engine.embed(texts)
+    failed = False
+    print(f"{'backend':<10} {'load':>7} {'query p50':>10} {'query p95':>10} {'batch':>12} {'cos min':>8} {'cos mean':>9}")
+    for label, (engine, load_seconds) in backends.items():
+        cosines = np.sum(engine.embed(texts) * reference, axis=1)
+        latencies = query_latency(engine, args.query_rounds)
+        rate = batch_rate(engine, texts)
+        failed |= bool(cosines.min() < args.min_cosine)
+        print(f"{label:<10} {load_seconds:6.1f}s {percentile(latencies, 50) * 1000:8.2f}ms "
+              f"{percentile(latencies, 95) * 1000:8.2f}ms {rate:7.1f} txt/s {cosines.min():8.4f} {cosines.mean():9.4f}")
+
+    if failed:
+        print(f"PARITY FAILED: cosine below {args.min_cosine}")
+        sys.exit(1)
+    print(f"parity ok: every backend >= {args.min_cosine} cosine vs torch")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,19 @@ import uuid
 import re
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import json
 
+from config import settings
 from logger import logger
+from candidate_store import get_candidate_store
 
 class CandidateManager:
-    def __init__(self, hash_index_file: str):
+    def __init__(self, hash_index_file: str, db_path: str = settings.CANDIDATE_DB_FILE):
+        # hash_index_file is only read once, to migrate a legacy JSON index into the store
         self.hash_index_file = hash_index_file
+        self.store = get_candidate_store(db_path)
+        self._migrate_json_index()
     
     def generate_candidate_id(self) -> str:
         """Generate unique UUID for candidate"""
@@ -109,8 +114,8 @@ class CandidateManager:
         Use LLM as fallback to extract name from content
         """
         try:
-            from langchain_google_genai import ChatGoogleGenerativeAI
             from langchain.prompts import PromptTemplate
+            import llm_client
             
             # Take first 1000 characters to avoid token limits
             sample_content = content[:1000]
@@ -127,18 +132,12 @@ class CandidateManager:
             CANDIDATE NAME:
             """
             
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash-lite",
-                temperature=0.1,
-                convert_system_message_to_human=True
-            )
-            
             prompt = PromptTemplate(
                 template=prompt_template,
                 input_variables=["content"]
             )
             
-            response = llm.invoke(prompt.invoke({"content": sample_content}))
+            response = llm_client.invoke(prompt.invoke({"content": sample_content}), "gemini-2.5-flash-lite", 0.1)
             name = response.content.strip()
             
             if name and name != "NOT_FOUND" and len(name) > 3:
@@ -179,7 +178,7 @@ class CandidateManager:
         }
     
     def load_hash_index(self) -> Dict[str, Any]:
-        """Load enhanced hash index with candidate data"""
+        """Load the legacy JSON hash index (used only for migration into the candidate store)"""
         if os.path.exists(self.hash_index_file):
             try:
                 with open(self.hash_index_file, "r") as f:
@@ -221,26 +220,45 @@ class CandidateManager:
         logger.info(f"Migrated {len(new_index['candidates'])} candidates")
         return new_index
     
-    def save_hash_index(self, hash_index: Dict[str, Any]):
-        """Save enhanced hash index"""
+    def _migrate_json_index(self):
+        """One-time import of hash_index.json (either shape) into the candidate store"""
+        if not self.hash_index_file or not os.path.exists(self.hash_index_file):
+            return
+        if self.store.count() == 0:
+            hash_index = self.load_hash_index()
+            if hash_index["candidates"]:
+                self.store.import_index(hash_index)
+        # Keep the old file for reference, but never read it again
+        migrated_path = self.hash_index_file + ".migrated"
         try:
-            with open(self.hash_index_file, "w") as f:
-                json.dump(hash_index, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Error saving hash index: {e}")
-            raise
+            os.replace(self.hash_index_file, migrated_path)
+        except FileNotFoundError:
+            return  # another manager in this process migrated it first
+        logger.info(f"Candidate index migrated to SQLite; old JSON kept at {migrated_path}")
     
-    def register_candidate(self, file_hash: str, filename: str, content: str = None) -> Dict[str, str]:
-        """Register new candidate with enhanced name extraction"""
-        hash_index = self.load_hash_index()
-        
+    def register_candidate(self, file_hash: str, filename: str, content: str = None) -> Tuple[Dict[str, str], bool]:
+        """
+        Register new candidate with enhanced name extraction.
+        Returns (candidate_data, created); created is False when the file was already registered.
+        """
         # Check if file already processed
-        if file_hash in hash_index["file_hashes"]:
-            candidate_id = hash_index["file_hashes"][file_hash]
-            existing_candidate = hash_index["candidates"][candidate_id]
+        existing_candidate = self.store.get_by_hash(file_hash)
+        if existing_candidate:
             logger.info(f"File already processed for candidate: {existing_candidate['candidate_name']}")
-            return existing_candidate
+            return existing_candidate, False
         
+        candidate_data = self.build_candidate(filename, content)
+        # Returns the existing row instead if a concurrent upload registered this file first
+        candidate_data, created = self.store.add(file_hash, candidate_data)
+        if not created:
+            logger.info(f"File registered concurrently for candidate: {candidate_data['candidate_name']}")
+            return candidate_data, False
+        
+        logger.info(f"Registered new candidate: {candidate_data['candidate_name']} ({candidate_data['candidate_id']}) from {candidate_data['name_source']}")
+        return candidate_data, True
+    
+    def build_candidate(self, filename: str, content: str = None) -> Dict[str, str]:
+        """Create candidate data (name extraction + new ID) without touching the store"""
         # Get best candidate name using multiple strategies
         if content:
             name_data = self.get_best_candidate_name(filename, content)
@@ -253,29 +271,72 @@ class CandidateManager:
         # Create new candidate
         candidate_id = self.generate_candidate_id()
         
-        candidate_data = {
+        return {
             "candidate_id": candidate_id,
             "candidate_name": name_data["candidate_name"],
             "original_filename": filename,
             "upload_timestamp": datetime.now().isoformat(),
             "name_source": name_data["name_source"]
         }
-        
-        # Update index
-        hash_index["candidates"][candidate_id] = candidate_data
-        hash_index["file_hashes"][file_hash] = candidate_id
-        
-        self.save_hash_index(hash_index)
-        
-        logger.info(f"Registered new candidate: {candidate_data['candidate_name']} ({candidate_id}) from {name_data['name_source']}")
+    
+    def replace_candidate(self, file_hash: str, candidate_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Point an existing candidate (candidate_data["candidate_id"]) at a new file and details"""
+        candidate_data = self.store.replace(file_hash, candidate_data)
+        logger.info(f"Re-registered candidate: {candidate_data['candidate_name']} ({candidate_data['candidate_id']})")
         return candidate_data
     
+    def register_candidates(self, entries: list) -> set:
+        """Register many (file_hash, candidate_data) pairs in a single transaction. Returns the hashes registered."""
+        if not entries:
+            return set()
+        added = self.store.add_many(entries)
+        logger.info(f"Registered {len(added)} candidates in one batch")
+        return added
+    
+    def get_candidate_by_hash(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the candidate registered for a file hash, if any"""
+        return self.store.get_by_hash(file_hash)
+    
+    def known_file_hashes(self, file_hashes) -> set:
+        """Which of these file hashes are already registered"""
+        return self.store.known_hashes(file_hashes)
+    
     def get_candidate_by_id(self, candidate_id: str) -> Optional[Dict[str, Any]]:
         """Get candidate data by ID"""
-        hash_index = self.load_hash_index()
-        return hash_index["candidates"].get(candidate_id)
+        return self.store.get(candidate_id)
+    
+    def get_candidate_file_hash(self, candidate_id: str) -> Optional[str]:
+        """Hash of the file a candidate was indexed from"""
+        return self.store.get_file_hash(candidate_id)
     
     def list_all_candidates(self) -> list:
         """Get list of all candidates"""
-        hash_index = self.load_hash_index()
-        return list(hash_index["candidates"].values())
\ No newline at end of file
+        return self.store.list_all()
+    
+    def set_candidate_profile(self, candidate_id: str, profile: Dict[str, Any]) -> None:
+        """Store the skills / roles / years extracted from a candidate's golden chunk"""
+        self.store.set_profiles([(candidate_id, profile)])
+    
+    def set_candidate_profiles(self, entries: list) -> None:
+        """Store many (candidate_id, profile) pairs in a single transaction"""
+        if entries:
+            self.store.set_profiles(entries)
+    
+    def get_candidate_profile(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get_profile(candidate_id)
+    
+    def candidates_without_profile(self) -> list:
+        """Candidate ids ingested before profiles were extracted"""
+        return self.store.candidates_without_profile()
+    
+    def find_candidates(self, skills=(), roles=(), min_years: Optional[float] = None, match: str = "all") -> list:
+        """Structured lookup over the extracted profiles (no vector search, no LLM)"""
+        return self.store.find_candidates(skills, roles, min_years, match)
+    
+    def delete_candidate(self, candidate_id: str) -> bool:
+        """Remove one candidate with its file hashes and profile. False if it did not exist."""
+        return self.store.delete(candidate_id)
+    
+    def clear(self):
+        """Remove every candidate (used by /reset)"""
+        self.store.clear()
@@ -0,0 +1,56 @@
+# candidate_pooling.py - turn chunk-level hits into a per-candidate ranking
+#
+# Each CV is indexed as its golden chunk plus one vector per section (see
+# vector_store.create_section_chunks), all tagged with candidate_id. Retrieval
+# ranks candidates, not chunks:
+#   max - a candidate scores its single best-matching chunk
+#   sum - a candidate scores the sum over its chunks among the hits, which
+#         favours CVs that match the question in several sections
+from typing import Dict, Iterable, List, Tuple
+
+from langchain.schema import Document
+
+from config import settings
+
+POOLING_MODES = ("max", "sum")
+
+
+def l2_to_similarity(distance: float) -> float:
+    """Cosine similarity from the squared L2 distance between unit vectors"""
+    return 1.0 - distance / 2.0
+
+
+def pool_scores(hits: Iterable[Tuple[str, float]], pooling: str = settings.RETRIEVAL_POOLING) -> List[str]:
+    """Candidate ids ordered by pooled similarity, from (candidate_id, similarity) hits"""
+    if pooling not in POOLING_MODES:
+        raise ValueError(f"Unknown RETRIEVAL_POOLING '{pooling}' (expected one of {', '.join(POOLING_MODES)})")
+    pooled: Dict[str, float] = {}
+    for candidate_id, similarity in hits:
+        if pooling == "max":
+            pooled[candidate_id] = max(pooled.get(candidate_id, similarity), similarity)
+        else:
+            # Clamp so a far-off chunk can never lower a candidate's score
+            pooled[candidate_id] = pooled.get(candidate_id, 0.0) + max(similarity, 0.0)
+    return sorted(pooled, key=pooled.get, reverse=True)
+
+
+def pool_documents(scored_docs: Iterable[Tuple[Document, float]],
+                   pooling: str = settings.RETRIEVAL_POOLING) -> List[str]:
+    """pool_scores for (doc, squared L2 distance) pairs from the vector store"""
+    return pool_scores(
+        ((doc.metadata["candidate_id"], l2_to_similarity(distance))
+         for doc, distance in scored_docs if doc.metadata.get("candidate_id")),
+        pooling,
+    )
+
+
+def rank_candidates(docs: Iterable[Document]) -> List[str]:
+    """Candidate ids in order of their first (best) hit in an already ranked list"""
+    ranked = []
+    seen = set()
+    for doc in docs:
+        candidate_id = doc.metadata.get("candidate_id")
+        if candidate_id and candidate_id not in seen:
+            seen.add(candidate_id)
+            ranked.append(candidate_id)
+    return ranked
@@ -0,0 +1,319 @@
+# candidate_store.py - embedded transactional candidate store (SQLite, WAL)
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from logger import logger
+
+CANDIDATE_COLUMNS = ("candidate_id", "candidate_name", "original_filename", "upload_timestamp", "name_source")
+
+
+class CandidateStore:
+    """
+    Candidates and the file hashes that produced them.
+    Lookups hit a primary-key index; writes are single transactions.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                candidate_id TEXT PRIMARY KEY,
+                candidate_name TEXT NOT NULL,
+                original_filename TEXT,
+                upload_timestamp TEXT,
+                name_source TEXT
+            );
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                file_hash TEXT PRIMARY KEY,
+                candidate_id TEXT NOT NULL REFERENCES candidates(candidate_id) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_file_hashes_candidate ON file_hashes (candidate_id);
+
+            -- Structured profile extracted at ingest (profile_extractor), queried without the LLM
+            CREATE TABLE IF NOT EXISTS candidate_profiles (
+                candidate_id TEXT PRIMARY KEY REFERENCES candidates(candidate_id) ON DELETE CASCADE,
+                years_experience REAL
+            );
+            CREATE TABLE IF NOT EXISTS candidate_skills (
+                skill TEXT NOT NULL,
+                candidate_id TEXT NOT NULL REFERENCES candidates(candidate_id) ON DELETE CASCADE,
+                PRIMARY KEY (skill, candidate_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS candidate_roles (
+                role TEXT NOT NULL,
+                candidate_id TEXT NOT NULL REFERENCES candidates(candidate_id) ON DELETE CASCADE,
+                PRIMARY KEY (role, candidate_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_candidate_skills_candidate ON candidate_skills (candidate_id);
+            CREATE INDEX IF NOT EXISTS idx_candidate_roles_candidate ON candidate_roles (candidate_id);
+        """)
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ---- reads ----------------------------------------------------------
+
+    def get(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM candidates WHERE candidate_id = ?", (candidate_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_by_hash(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT c.* FROM file_hashes h JOIN candidates c ON c.candidate_id = h.candidate_id "
+                "WHERE h.file_hash = ?",
+                (file_hash,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_file_hash(self, candidate_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_hash FROM file_hashes WHERE candidate_id = ? LIMIT 1", (candidate_id,)
+            ).fetchone()
+        return row["file_hash"] if row else None
+
+    def known_hashes(self, file_hashes: Iterable[str]) -> set:
+        """Subset of file_hashes already registered"""
+        file_hashes = list(file_hashes)
+        known = set()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(file_hashes), 500):
+            batch = file_hashes[start:start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT file_hash FROM file_hashes WHERE file_hash IN ({placeholders})", batch
+                ).fetchall()
+            known.update(row["file_hash"] for row in rows)
+        return known
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM candidates ORDER BY upload_timestamp").fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+
+    def get_profile(self, candidate_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            profile = self._conn.execute(
+                "SELECT years_experience FROM candidate_profiles WHERE candidate_id = ?", (candidate_id,)
+            ).fetchone()
+            if profile is None:
+                return None
+            skills = self._conn.execute(
+                "SELECT skill FROM candidate_skills WHERE candidate_id = ? ORDER BY skill", (candidate_id,)
+            ).fetchall()
+            roles = self._conn.execute(
+                "SELECT role FROM candidate_roles WHERE candidate_id = ? ORDER BY role", (candidate_id,)
+            ).fetchall()
+        return {
+            "skills": [row["skill"] for row in skills],
+            "roles": [row["role"] for row in roles],
+            "years_experience": profile["years_experience"],
+        }
+
+    def candidates_without_profile(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.candidate_id FROM candidates c "
+                "LEFT JOIN candidate_profiles p ON p.candidate_id = c.candidate_id WHERE p.candidate_id IS NULL"
+            ).fetchall()
+        return [row["candidate_id"] for row in rows]
+
+    def find_candidates(self, skills: Iterable[str] = (), roles: Iterable[str] = (),
+                        min_years: Optional[float] = None, match: str = "all") -> List[Dict[str, Any]]:
+        """
+        Candidates with the given skills/roles (all of them, or any with match="any")
+        and at least min_years of experience. Every lookup is an index seek.
+        """
+        skills, roles = sorted(set(skills)), sorted(set(roles))
+        clauses, params = [], []
+        for table, column, values in (("candidate_skills", "skill", skills), ("candidate_roles", "role", roles)):
+            if not values:
+                continue
+            placeholders = ",".join("?" for _ in values)
+            subquery = f"SELECT candidate_id FROM {table} WHERE {column} IN ({placeholders})"
+            if match == "all":
+                subquery += f" GROUP BY candidate_id HAVING COUNT(*) = {len(values)}"
+            clauses.append(f"c.candidate_id IN ({subquery})")
+            params.extend(values)
+
+        where = (" AND " if match == "all" else " OR ").join(clauses)
+        if min_years is not None:
+            where = f"({where}) AND p.years_experience >= ?" if where else "p.years_experience >= ?"
+            params.append(min_years)
+
+        query = ("SELECT c.*, p.years_experience, "
+                 "(SELECT GROUP_CONCAT(skill, '|') FROM candidate_skills s WHERE s.candidate_id = c.candidate_id) AS skills, "
+                 "(SELECT GROUP_CONCAT(role, '|') FROM candidate_roles r WHERE r.candidate_id = c.candidate_id) AS roles "
+                 "FROM candidates c LEFT JOIN candidate_profiles p ON p.candidate_id = c.candidate_id")
+        if where:
+            query += f" WHERE {where}"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY c.upload_timestamp", params).fetchall()
+        candidates = []
+        for row in rows:
+            candidate = dict(row)
+            candidate["skills"] = sorted(candidate["skills"].split("|")) if candidate["skills"] else []
+            candidate["roles"] = sorted(candidate["roles"].split("|")) if candidate["roles"] else []
+            candidates.append(candidate)
+        return candidates
+
+    # ---- writes ---------------------------------------------------------
+
+    @staticmethod
+    def _insert(conn, file_hash: str, candidate_data: Dict[str, Any]):
+        conn.execute(
+            f"INSERT INTO candidates ({', '.join(CANDIDATE_COLUMNS)}) VALUES ({', '.join('?' for _ in CANDIDATE_COLUMNS)})",
+            tuple(candidate_data.get(column) for column in CANDIDATE_COLUMNS),
+        )
+        conn.execute(
+            "INSERT INTO file_hashes (file_hash, candidate_id) VALUES (?, ?)",
+            (file_hash, candidate_data["candidate_id"]),
+        )
+
+    def add(self, file_hash: str, candidate_data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Register one candidate. Returns (candidate, created): if another upload
+        registered the same file first, nothing is written and that existing
+        candidate is returned with created=False.
+        """
+        def _add(conn):
+            row = conn.execute(
+                "SELECT c.* FROM file_hashes h JOIN candidates c ON c.candidate_id = h.candidate_id "
+                "WHERE h.file_hash = ?",
+                (file_hash,),
+            ).fetchone()
+            if row:
+                return dict(row), False
+            self._insert(conn, file_hash, candidate_data)
+            return candidate_data, True
+
+        return self._transaction(_add)
+
+    def add_many(self, entries: List[Tuple[str, Dict[str, Any]]]) -> set:
+        """
+        Register many (file_hash, candidate_data) pairs in one transaction.
+        Already-known hashes are skipped; returns the hashes actually inserted.
+        """
+        def _add_many(conn):
+            added = set()
+            for file_hash, candidate_data in entries:
+                if file_hash in added or conn.execute(
+                        "SELECT 1 FROM file_hashes WHERE file_hash = ?", (file_hash,)).fetchone():
+                    continue
+                self._insert(conn, file_hash, candidate_data)
+                added.add(file_hash)
+            return added
+
+        return self._transaction(_add_many)
+
+    def import_index(self, hash_index: Dict[str, Any]) -> int:
+        """Load a {"candidates": ..., "file_hashes": ...} index (the old JSON shape)"""
+        def _import(conn):
+            for candidate_data in hash_index.get("candidates", {}).values():
+                conn.execute(
+                    f"INSERT OR IGNORE INTO candidates ({', '.join(CANDIDATE_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in CANDIDATE_COLUMNS)})",
+                    tuple(candidate_data.get(column) for column in CANDIDATE_COLUMNS),
+                )
+            for file_hash, candidate_id in hash_index.get("file_hashes", {}).items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO file_hashes (file_hash, candidate_id) VALUES (?, ?)",
+                    (file_hash, candidate_id),
+                )
+            return len(hash_index.get("candidates", {}))
+
+        imported = self._transaction(_import)
+        logger.info(f"Imported {imported} candidates into {self.db_path}")
+        return imported
+
+    def replace(self, file_hash: str, candidate_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Point an existing candidate (same candidate_id) at a new file: its details
+        are updated and its previous file hashes dropped, in one transaction.
+        """
+        candidate_id = candidate_data["candidate_id"]
+        columns = [column for column in CANDIDATE_COLUMNS if column != "candidate_id"]
+
+        def _replace(conn):
+            owner = conn.execute("SELECT candidate_id FROM file_hashes WHERE file_hash = ?", (file_hash,)).fetchone()
+            if owner and owner["candidate_id"] != candidate_id:
+                raise ValueError(f"File already belongs to candidate {owner['candidate_id']}")
+            updated = conn.execute(
+                f"UPDATE candidates SET {', '.join(f'{column} = ?' for column in columns)} WHERE candidate_id = ?",
+                tuple(candidate_data.get(column) for column in columns) + (candidate_id,),
+            ).rowcount
+            if not updated:
+                raise ValueError(f"Unknown candidate {candidate_id}")
+            conn.execute("DELETE FROM file_hashes WHERE candidate_id = ?", (candidate_id,))
+            conn.execute("INSERT INTO file_hashes (file_hash, candidate_id) VALUES (?, ?)", (file_hash, candidate_id))
+            return candidate_data
+
+        return self._transaction(_replace)
+
+    def delete(self, candidate_id: str) -> bool:
+        """Remove one candidate; its file hashes and profile go with it (ON DELETE CASCADE)"""
+        return self._transaction(
+            lambda conn: conn.execute("DELETE FROM candidates WHERE candidate_id = ?", (candidate_id,)).rowcount > 0)
+
+    @staticmethod
+    def _replace_profile(conn, candidate_id: str, profile: Dict[str, Any]):
+        conn.execute("DELETE FROM candidate_skills WHERE candidate_id = ?", (candidate_id,))
+        conn.execute("DELETE FROM candidate_roles WHERE candidate_id = ?", (candidate_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO candidate_profiles (candidate_id, years_experience) VALUES (?, ?)",
+            (candidate_id, profile.get("years_experience")),
+        )
+        conn.executemany("INSERT OR IGNORE INTO candidate_skills (skill, candidate_id) VALUES (?, ?)",
+                         [(skill, candidate_id) for skill in profile.get("skills", ())])
+        conn.executemany("INSERT OR IGNORE INTO candidate_roles (role, candidate_id) VALUES (?, ?)",
+                         [(role, candidate_id) for role in profile.get("roles", ())])
+
+    def set_profiles(self, entries: List[Tuple[str, Dict[str, Any]]]):
+        """Store (candidate_id, profile) pairs in one transaction, replacing earlier profiles"""
+        def _set(conn):
+            for candidate_id, profile in entries:
+                # Skip candidates removed (or never registered) in the meantime
+                if conn.execute("SELECT 1 FROM candidates WHERE candidate_id = ?", (candidate_id,)).fetchone():
+                    self._replace_profile(conn, candidate_id, profile)
+
+        self._transaction(_set)
+
+    def clear(self):
+        self._transaction(lambda conn: [conn.execute(f"DELETE FROM {table}") for table in (
+            "candidate_skills", "candidate_roles", "candidate_profiles", "file_hashes", "candidates")])
+
+
+_stores: Dict[str, CandidateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_candidate_store(db_path: str) -> CandidateStore:
+    """One shared connection per database file per process"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = CandidateStore(db_path)
+            _stores[db_path] = store
+        return store
@@ -1,14 +1,16 @@
 # config.py - ENHANCED FOR PHASE 2
 import os
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # API Configuration
     GOOGLE_API_KEY: str
     UPLOAD_DIR: str = "data"
     FAISS_DIR: str = "faiss_index"
-    HASH_INDEX_FILE: str = "hash_index.json"
+    HASH_INDEX_FILE: str = "hash_index.json"  # legacy, migrated into CANDIDATE_DB_FILE
+    CANDIDATE_DB_FILE: str = "candidates.db"
+    JOB_DB_FILE: str = "jobs.db"
     
     # Security
     # ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "https://your-hr-domain.com"]
@@ -16,6 +18,12 @@ class Settings(BaseSettings):
     
     # Model Configuration
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # "torch" (sentence-transformers) or "onnx" (ONNX Runtime)
+    EMBEDDING_ONNX_QUANTIZE: bool = True  # int8 dynamic quantization for the onnx backend
+    ONNX_MODEL_DIR: str = "onnx_models"
+    EMBEDDING_BATCH_SIZE: int = 32  # texts per forward pass (length-sorted)
+    EMBEDDING_THREADS: int = 0  # torch intra-op threads; 0 keeps torch's default
+    EMBEDDING_CACHE_DIR: str = "embedding_cache"  # (model, sha256(text)) -> vector, reused across re-ingests
     LLM_MODEL: str = "gemini-2.5-flash"
     LLM_VALIDATION_MODEL: str = "gemini-2.5-flash-lite" 
     LLM_TEMPERATURE: float = 0.1  # Lower for more consistent validation
@@ -23,8 +31,80 @@ class Settings(BaseSettings):
     # RAG Configuration 
     CHUNK_SIZE: int = 500  # Larger for comprehensive chunks
     CHUNK_OVERLAP: int = 100
+    DOCLING_PAGES_PER_WINDOW: int = 8  # streamed conversion: pages handed to Docling at a time
+    DOCLING_MAX_MARKDOWN_CHARS: int = 60000  # stop converting once this much markdown is collected (golden chunk keeps 15,000)
     SEARCH_K: int = 4
 
+    # Multi-vector CVs: one vector per section next to the golden chunk, pooled per candidate
+    SECTION_EMBEDDINGS_ENABLED: bool = True
+    SECTION_CHUNK_CHARS: int = 1000  # ~256 MiniLM word pieces; longer sections are split
+    RETRIEVAL_POOLING: str = "max"  # max | sum
+    RETRIEVAL_HITS: int = 50  # chunk hits pooled into candidates per retriever
+
+    # FAISS persistence: uploads append segment files, compaction folds them into the snapshot
+    FAISS_COMPACT_SEGMENTS: int = 50
+    FAISS_PURGE_DELETED_FRACTION: float = 0.1  # compact early once this share of rows belongs to deleted candidates
+
+    # Search index: "flat" (exact) or an ANN index trained on the stored vectors
+    FAISS_INDEX_TYPE: str = "flat"  # flat | ivf_flat | ivf_pq | hnsw
+    FAISS_ANN_MIN_VECTORS: int = 10000  # below this, exact search is fast enough
+    FAISS_ANN_RETRAIN_GROWTH: float = 2.0  # retrain once the index has grown this much since training
+    FAISS_NLIST: int = 0  # IVF lists; 0 = ~4*sqrt(n)
+    FAISS_NPROBE: int = 16  # IVF lists scanned per query
+    FAISS_PQ_M: int = 48  # IVF-PQ sub-quantizers (must divide the embedding dimension)
+    FAISS_PQ_BITS: int = 8
+    FAISS_HNSW_M: int = 32
+    FAISS_HNSW_EF_CONSTRUCTION: int = 200
+    FAISS_HNSW_EF_SEARCH: int = 64
+
+    # Hybrid retrieval: BM25 keyword hits fused with vector hits (reciprocal rank fusion)
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20  # hits taken from each retriever before fusion
+    BM25_K1: float = 1.5
+    BM25_B: float = 0.75
+    RRF_K: int = 60
+
+    # Structured candidate index (skills / roles / years extracted at ingest)
+    STRUCTURED_PREFILTER_ENABLED: bool = True  # scope RAG retrieval to candidates matching the question
+    STRUCTURED_PREFILTER_MAX_CANDIDATES: int = 1000  # broader matches search the whole index instead
+
+    # Optional cross-encoder reranking between retrieval and the Gemini prompt
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20  # chunks retrieved for the reranker to choose from
+    RERANK_TOP_K: int = 5  # chunks passed to the prompt
+    RERANK_MIN_SCORE: float = 0.1  # sigmoid relevance in [0, 1]
+    RERANK_MIN_KEEP: int = 1  # keep this many even if all score below RERANK_MIN_SCORE
+    RERANK_BATCH_SIZE: int = 8
+    RERANK_MAX_LENGTH: int = 512  # tokens per (question, chunk) pair; long CVs are truncated
+    RERANK_TIME_BUDGET_MS: int = 300
+
+    # Prompt context: most relevant "## sections" of each retrieved CV, within a token budget
+    CONTEXT_PACKING_ENABLED: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    CONTEXT_CHARS_PER_TOKEN: float = 4.0  # estimate used for budgeting
+
+    # Execution model: blocking work runs in these pools, LLM calls are awaited
+    INGEST_WORKERS: int = 2  # concurrent uploads being parsed/embedded
+    QUERY_WORKERS: int = 8  # query embedding + FAISS search threads
+    LLM_MAX_CONCURRENCY: int = 8  # in-flight Gemini calls per model per worker
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {}  # per-model overrides, e.g. {"gemini-2.5-flash": 4}
+
+    # /ask answer cache (exact + semantic tiers, invalidated by index version)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.92  # cosine on MiniLM query embeddings
+
+    # Local intent router (falls back to the flash-lite call when unsure)
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_MIN_MARGIN: float = 0.05  # cosine gap between the two class centroids
+    INTENT_EXAMPLES_FILE: str = "intent_examples.json"  # optional extra labelled questions
+
+    # Batch ingestion (/upload-batch and batch_ingest.py)
+    BATCH_PARSE_WORKERS: int = 2  # Docling processes
+    BATCH_LLM_CONCURRENCY: int = 4  # concurrent name/validation LLM calls
+
     class Config:
         env_file = ".env"
 
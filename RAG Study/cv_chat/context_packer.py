@@ -0,0 +1,119 @@
+# context_packer.py - fit retrieved CVs into a per-request prompt token budget
+#
+# Golden chunks are whole cleaned CVs (up to 15,000 characters) structured with
+# "## Section" headers by lightweight_llm_validation. Instead of pasting every
+# chunk in full, the packer splits each into sections, drops sections already
+# included for another chunk, scores the rest against the question (BM25-style
+# term weights, header words counted twice) and fills the budget:
+#   1. each candidate's best section, in retrieval order, so nobody disappears
+#   2. the remaining sections by score
+# Kept sections are emitted in their original order within each CV.
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from config import settings
+from sparse_index import tokenize
+
+SECTION_HEADER = re.compile(r"^\s*#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count; only used for budgeting and reporting"""
+    return math.ceil(len(text) / settings.CONTEXT_CHARS_PER_TOKEN)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """[(header, full section text including its header line)]; text before the first header is the lead"""
+    headers = list(SECTION_HEADER.finditer(text))
+    if not headers:
+        return [("", text.strip())] if text.strip() else []
+    sections = []
+    lead = text[:headers[0].start()].strip()
+    if lead:
+        sections.append(("", lead))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[header.start():end].strip()
+        # A header with nothing under it carries no information
+        if body and body != header.group(0).strip():
+            sections.append((header.group(1), body))
+    return sections
+
+
+def _fingerprint(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class ContextPacker:
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+
+    def pack(self, question: str, docs: List[Document]) -> Tuple[List[Tuple[Document, str]], Dict[str, int]]:
+        """
+        ([(doc, packed content)], stats). Docs left with nothing are dropped.
+        stats: original_tokens, packed_tokens, sections_total, sections_kept, duplicates_dropped.
+        """
+        query_terms = set(tokenize(question))
+        seen = set()
+        duplicates = 0
+        sections = []  # (doc index, text, term counts, header terms), in document order
+        for doc_index, doc in enumerate(docs):
+            for header, text in split_sections(doc.page_content):
+                fingerprint = _fingerprint(text)
+                if fingerprint in seen:
+                    duplicates += 1
+                    continue
+                seen.add(fingerprint)
+                sections.append((doc_index, text, Counter(tokenize(text)), set(tokenize(header))))
+
+        # Inverse document frequency over this request's sections only
+        document_frequency = Counter(term for section in sections for term in set(section[2]) & query_terms)
+        n = max(1, len(sections))
+
+        def score(section) -> float:
+            _, _, counts, header_terms = section
+            length = max(1, sum(counts.values()))
+            total = 0.0
+            for term in query_terms:
+                if counts.get(term) or term in header_terms:
+                    idf = math.log(1 + n / (1 + document_frequency[term]))
+                    total += idf * (1 + math.log(1 + counts.get(term, 0))) * (2 if term in header_terms else 1)
+            return total / math.sqrt(length)
+
+        scores = [score(section) for section in sections]
+        by_score = sorted(range(len(sections)), key=lambda i: scores[i], reverse=True)
+
+        best_per_doc = {}
+        for i in by_score:
+            best_per_doc.setdefault(sections[i][0], i)
+        order = [best_per_doc[doc_index] for doc_index in sorted(best_per_doc)]
+        firsts = set(order)
+        order += [i for i in by_score if i not in firsts]
+
+        kept = set()
+        used = 0
+        for i in order:
+            cost = estimate_tokens(sections[i][1])
+            if used + cost <= self.token_budget:
+                kept.add(i)
+                used += cost
+
+        packed = []
+        for doc_index, doc in enumerate(docs):
+            texts = [section[1] for i, section in enumerate(sections) if i in kept and section[0] == doc_index]
+            if texts:
+                packed.append((doc, "\n\n".join(texts)))
+
+        original_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+        stats = {
+            "original_tokens": original_tokens,
+            "packed_tokens": sum(estimate_tokens(content) for _, content in packed),
+            "sections_total": len(sections) + duplicates,
+            "sections_kept": len(kept),
+            "duplicates_dropped": duplicates,
+        }
+        return packed, stats
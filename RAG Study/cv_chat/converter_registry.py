@@ -0,0 +1,60 @@
+# converter_registry.py - configured Docling converters, built once per worker
+import threading
+from typing import Dict, Tuple
+
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling.document_converter import DocumentConverter, PdfFormatOption
+
+from logger import logger
+
+# CVs are born-digital text PDFs: no OCR, no table model, no rendered images
+CV_PIPELINE_OPTIONS = {
+    "do_ocr": False,
+    "do_table_structure": False,
+    "generate_page_images": False,
+    "generate_picture_images": False,
+}
+
+_converters: Dict[Tuple, DocumentConverter] = {}
+_converters_lock = threading.Lock()
+
+
+def _options_key(options: dict) -> Tuple:
+    return tuple(sorted(options.items()))
+
+
+def get_converter(**overrides) -> DocumentConverter:
+    """
+    Return the cached converter for CV_PIPELINE_OPTIONS updated with overrides.
+    The first call for a given option set builds the pipeline (and loads the layout
+    models); every later call in the same process reuses it.
+    """
+    options = {**CV_PIPELINE_OPTIONS, **overrides}
+    key = _options_key(options)
+
+    with _converters_lock:
+        converter = _converters.get(key)
+        if converter is None:
+            pipeline_options = PdfPipelineOptions(**options)
+            converter = DocumentConverter(
+                format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+            )
+            # Load the layout models now rather than on the first conversion
+            if hasattr(converter, "initialize_pipeline"):
+                converter.initialize_pipeline(InputFormat.PDF)
+            _converters[key] = converter
+            logger.info(f"Initialized Docling converter with options: {options}")
+    return converter
+
+
+def warm_up(**overrides):
+    """Build the converter ahead of the first request (app startup / pool initializer)"""
+    get_converter(**overrides)
+
+
+def convert_to_markdown(pdf_path: str) -> str:
+    """Convert one PDF with the cached CV converter. Picklable, so usable as a process-pool task."""
+    # Imported here: streaming_pipeline needs the settings, this module stays importable without them
+    from streaming_pipeline import read_markdown
+    return read_markdown(pdf_path, get_converter())
@@ -0,0 +1,198 @@
+# embedding_cache.py - persistent content-addressed embedding cache
+#
+# Layout (one directory per embedding model):
+#   <cache_dir>/<model>/meta.json     {"model": ..., "dimension": ...}
+#   <cache_dir>/<model>/vectors.f32   row i = float32 vector, read through np.memmap
+#   <cache_dir>/<model>/keys.bin      row i = 32-byte sha256 of the text
+#
+# Both files are append-only. Vectors are written before their keys, so a crash
+# mid-append leaves at most some unreferenced trailing rows, dropped by the next writer.
+# Several processes may share a cache (server, batch CLI, indexers): every append holds
+# an flock on <model>/lock, first reads the keys the others appended, and takes its row
+# numbers from the file sizes rather than from a counter of its own.
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+from logger import logger
+
+KEY_BYTES = 32
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """sha256(text) -> vector for one model, backed by a memory-mapped vector file"""
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.path = os.path.join(cache_dir, re.sub(r"[^\w.-]", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._keys_path = os.path.join(self.path, "keys.bin")
+        self._lock_path = os.path.join(self.path, "lock")
+        self._lock = threading.Lock()
+
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta["dimension"] != dimension:
+                raise ValueError(f"Embedding cache {self.path} holds {meta['dimension']}-d vectors, model gives {dimension}-d")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"model": model_name, "dimension": dimension}, f)
+
+        self._rows: Dict[bytes, int] = {}
+        self._next_row = 0
+        self._mapped = None
+        self._mapped_rows = 0
+        with self._lock, self._file_lock():
+            self._sync()
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive across processes; held while the files are checked or appended to"""
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """
+        Under the file lock: drop rows a crashed writer left without a key (or vector),
+        then read the keys appended since this process last looked.
+        """
+        row_bytes = self.dimension * 4
+        vector_bytes = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        key_bytes = os.path.getsize(self._keys_path) if os.path.exists(self._keys_path) else 0
+        rows = min(vector_bytes // row_bytes, key_bytes // KEY_BYTES)
+        if vector_bytes != rows * row_bytes:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+        if key_bytes != rows * KEY_BYTES:
+            with open(self._keys_path, "r+b") as f:
+                f.truncate(rows * KEY_BYTES)
+        if rows < self._next_row:
+            # The files were removed or replaced underneath us: start over from what is there
+            self._rows, self._next_row, self._mapped = {}, 0, None
+        if rows > self._next_row:
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._next_row * KEY_BYTES)
+                tail = f.read((rows - self._next_row) * KEY_BYTES)
+            for i in range(rows - self._next_row):
+                self._rows.setdefault(tail[i * KEY_BYTES:(i + 1) * KEY_BYTES], self._next_row + i)
+            self._next_row = rows
+
+    def _vectors(self, needed_rows: int) -> np.ndarray:
+        if self._mapped is None or self._mapped_rows < needed_rows:
+            self._mapped_rows = self._next_row
+            self._mapped = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                     shape=(self._mapped_rows, self.dimension))
+        return self._mapped
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_many(self, keys: List[bytes]) -> Dict[int, np.ndarray]:
+        """{position in keys: vector} for every cached key"""
+        with self._lock:
+            positions = [(i, self._rows[key]) for i, key in enumerate(keys) if key in self._rows]
+            if not positions:
+                return {}
+            vectors = self._vectors(max(row for _, row in positions) + 1)
+            return {i: np.array(vectors[row]) for i, row in positions}
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            # Another process may have appended (some of) these keys; its rows come first
+            self._sync()
+            fresh = [i for i, key in enumerate(keys) if key not in self._rows]
+            # The same text may appear twice in one batch
+            seen = set()
+            fresh = [i for i in fresh if not (keys[i] in seen or seen.add(keys[i]))]
+            if not fresh:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[fresh].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(keys[i] for i in fresh))
+                f.flush()
+                os.fsync(f.fileno())
+            for i in fresh:
+                self._rows[keys[i]] = self._next_row
+                self._next_row += 1
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model for indexing: texts already in the cache are not
+    re-embedded. Queries go straight to the wrapped model.
+    """
+
+    def __init__(self, embedding_model, cache_dir: str = settings.EMBEDDING_CACHE_DIR):
+        self.embedding_model = embedding_model
+        self.model_name = embedding_model.model_name
+        dimension = len(embedding_model.embed_query("dimension probe"))
+        self.cache = EmbeddingCache(cache_dir, self.model_name, dimension)
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        embed = getattr(self.embedding_model, "embed", None)
+        if embed is not None:
+            return np.asarray(embed(texts), dtype=np.float32)
+        return np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.cache.dimension), dtype=np.float32)
+        keys = [text_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        misses = [i for i in range(len(texts)) if i not in cached]
+
+        vectors = np.empty((len(texts), self.cache.dimension), dtype=np.float32)
+        for i, vector in cached.items():
+            vectors[i] = vector
+        if misses:
+            computed = self._embed_uncached([texts[i] for i in misses])
+            vectors[misses] = computed
+            self.cache.put_many([keys[i] for i in misses], computed)
+        logger.info(f"Embedding cache: {len(cached)} hits, {len(misses)} embedded")
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding_model.embed_query(text)
+
+
+_cached = {}
+_cached_lock = threading.Lock()
+
+
+def get_cached_embeddings(embedding_model, cache_dir: str = settings.EMBEDDING_CACHE_DIR) -> CachedEmbeddings:
+    """One cache (and one key index in memory) per model and directory per process"""
+    key = (embedding_model.model_name, os.path.abspath(cache_dir))
+    with _cached_lock:
+        cached = _cached.get(key)
+        if cached is None:
+            cached = CachedEmbeddings(embedding_model, cache_dir)
+            _cached[key] = cached
+        return cached
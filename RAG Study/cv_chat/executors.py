@@ -0,0 +1,45 @@
+# executors.py - worker pools that keep blocking work off the FastAPI event loop
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from config import settings
+
+# Separate pools so a burst of uploads can never starve /ask of threads
+_ingest_pool: Optional[ThreadPoolExecutor] = None
+_query_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_ingest_pool() -> ThreadPoolExecutor:
+    """Docling parsing, CV cleaning and embedding for uploads"""
+    global _ingest_pool
+    if _ingest_pool is None:
+        _ingest_pool = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix="ingest")
+    return _ingest_pool
+
+
+def get_query_pool() -> ThreadPoolExecutor:
+    """Query embedding and FAISS search for /ask"""
+    global _query_pool
+    if _query_pool is None:
+        _query_pool = ThreadPoolExecutor(max_workers=settings.QUERY_WORKERS, thread_name_prefix="query")
+    return _query_pool
+
+
+async def run_ingest(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ingest_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_query(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_query_pool(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_pools():
+    global _ingest_pool, _query_pool
+    for pool in (_ingest_pool, _query_pool):
+        if pool is not None:
+            pool.shutdown(wait=False)
+    _ingest_pool = _query_pool = None
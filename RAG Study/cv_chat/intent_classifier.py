@@ -0,0 +1,161 @@
+# intent_classifier.py - in-process cv_related / general_knowledge router
+#
+# Nearest-centroid classifier on the MiniLM embeddings the store service already
+# holds. Confident predictions skip the flash-lite routing call entirely; questions
+# whose two centroid scores are too close are handed back to the LLM router.
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from logger import logger
+
+CV_RELATED = "cv_related"
+GENERAL_KNOWLEDGE = "general_knowledge"
+
+# Labelled training examples. Extend via settings.INTENT_EXAMPLES_FILE
+# ({"cv_related": [...], "general_knowledge": [...]}) without touching the code.
+SEED_EXAMPLES: Dict[str, List[str]] = {
+    CV_RELATED: [
+        "List Python developers",
+        "Which candidates know React?",
+        "Who has experience with Java?",
+        "Show me all the SQA candidates",
+        "Who is the best fit for a frontend role?",
+        "Compare the backend developers",
+        "Which applicant has the most years of experience?",
+        "Summarize this candidate's work history",
+        "What is the education background of the candidates?",
+        "Does anyone have a master's degree?",
+        "Find candidates with machine learning projects",
+        "Who worked at a startup?",
+        "Which resumes mention Docker and Kubernetes?",
+        "Give me the names of UI/UX designers",
+        "Who should we hire for a data analyst position?",
+        "Rank the candidates for a DevOps role",
+        "What skills does John have?",
+        "Tell me about the uploaded CVs",
+        "How many candidates know SQL?",
+        "Who has led a team before?",
+        "Which candidates have certifications?",
+        "List applicants with Django experience",
+        "Who is a good match for a senior engineer?",
+        "What projects has the candidate done?",
+        "Any candidates with cloud experience on AWS?",
+        "Shortlist three people for an interview",
+        "Which CV shows the strongest communication skills?",
+        "Who graduated most recently?",
+        "Do we have any mobile app developers?",
+        "What programming languages do the candidates know?",
+    ],
+    GENERAL_KNOWLEDGE: [
+        "What is a REST API?",
+        "Explain the difference between SQL and NoSQL",
+        "How does garbage collection work in Java?",
+        "What is the capital of France?",
+        "What is machine learning?",
+        "How do I reverse a list in Python?",
+        "Explain object oriented programming",
+        "What is Docker used for?",
+        "What does a QA engineer do in general?",
+        "How does HTTPS work?",
+        "What is the difference between React and Angular?",
+        "Tell me a joke",
+        "What's the weather like today?",
+        "Who invented the telephone?",
+        "What are good interview questions for developers?",
+        "Explain how a hash map works",
+        "What is Kubernetes?",
+        "How do I write a good resume?",
+        "What is agile methodology?",
+        "Translate hello into Spanish",
+        "What is the time complexity of quicksort?",
+        "Explain what a neural network is",
+        "How do I center a div in CSS?",
+        "What is cloud computing?",
+        "Hi, how are you?",
+        "What is the difference between a process and a thread?",
+        "Write a haiku about autumn",
+        "How much RAM does a laptop need?",
+        "What is a vector database?",
+        "Define unit testing",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid router over unit-normalized sentence embeddings.
+
+    predict() returns (label, margin) where margin is the cosine gap between the
+    two class centroids. Callers treat margin < min_margin as "not sure".
+    """
+
+    def __init__(self, embedding_model, examples: Optional[Dict[str, List[str]]] = None,
+                 min_margin: float = settings.INTENT_MIN_MARGIN):
+        self.embedding_model = embedding_model
+        self.min_margin = min_margin
+        self.labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self.fit(examples or load_examples())
+
+    def fit(self, examples: Dict[str, List[str]]):
+        labels, centroids = [], []
+        for label in (CV_RELATED, GENERAL_KNOWLEDGE):
+            texts = examples.get(label, [])
+            if not texts:
+                raise ValueError(f"No training examples for intent '{label}'")
+            vectors = _unit_rows(np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32))
+            labels.append(label)
+            centroids.append(vectors.mean(axis=0))
+        self.labels = labels
+        self._centroids = _unit_rows(np.vstack(centroids))
+        logger.info(f"Intent classifier fitted on {sum(len(v) for v in examples.values())} examples")
+
+    def predict_vector(self, query_vector) -> Tuple[str, float]:
+        query = _unit_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = self._centroids @ query
+        order = np.argsort(scores)[::-1]
+        return self.labels[int(order[0])], float(scores[order[0]] - scores[order[1]])
+
+    def predict(self, question: str) -> Tuple[str, float]:
+        return self.predict_vector(self.embedding_model.embed_query(question))
+
+    def route(self, query_vector) -> Optional[str]:
+        """Confident label, or None when the question should go to the LLM router"""
+        label, margin = self.predict_vector(query_vector)
+        return label if margin >= self.min_margin else None
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def load_examples(path: str = settings.INTENT_EXAMPLES_FILE) -> Dict[str, List[str]]:
+    """Seed examples, plus any extra labelled questions from the examples file"""
+    examples = {label: list(texts) for label, texts in SEED_EXAMPLES.items()}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        for label in examples:
+            examples[label].extend(extra.get(label, []))
+        logger.info(f"Loaded extra intent examples from {path}")
+    return examples
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier(embedding_model) -> IntentClassifier:
+    """Fitted once per process on first use"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = IntentClassifier(embedding_model)
+        return _classifier
@@ -0,0 +1,199 @@
+# job_queue.py - SQLite-backed ingestion queue with stage tracking
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+from logger import logger
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# What a job's file_path points at: one uploaded PDF, or a folder of them for /upload-batch
+JOB_KIND_PDF = "pdf"
+JOB_KIND_BATCH = "batch"
+
+
+class JobQueue:
+    """Persistent FIFO of upload jobs. Survives restarts; running jobs are requeued on startup."""
+
+    def __init__(self, db_path: str = settings.JOB_DB_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'pdf',
+                status TEXT NOT NULL,
+                stage TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                timings TEXT NOT NULL DEFAULT '{}',
+                result TEXT,
+                error TEXT
+            )
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "kind" not in columns:
+            # Databases created before batch jobs hold only single-PDF jobs
+            self._conn.execute(f"ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT '{JOB_KIND_PDF}'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+
+    def enqueue(self, filename: str, file_path: str, job_id: Optional[str] = None, kind: str = JOB_KIND_PDF) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, filename, file_path, kind, status, stage, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, file_path, kind, JOB_QUEUED, JOB_QUEUED, time.time()),
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job and mark it running"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?",
+                    (JOB_RUNNING, time.time(), row["job_id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row_to_dict(row)
+
+    def set_stage(self, job_id: str, stage: str, timings: Dict[str, float]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, timings = ? WHERE job_id = ?", (stage, json.dumps(timings), job_id)
+            )
+
+    def finish(self, job_id: str, timings: Dict[str, float], result: Optional[dict] = None, error: Optional[str] = None):
+        status = JOB_FAILED if error else JOB_DONE
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, finished_at = ?, timings = ?, result = ?, error = ? WHERE job_id = ?",
+                (status, status, time.time(), json.dumps(timings),
+                 json.dumps(result) if result is not None else None, error, job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def requeue_running(self) -> int:
+        """Jobs left 'running' by a crash or restart go back to the queue"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, started_at = NULL WHERE status = ?",
+                (JOB_QUEUED, JOB_QUEUED, JOB_RUNNING),
+            )
+        return cursor.rowcount
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["timings"] = json.loads(job["timings"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class StageTracker:
+    """Callable handed to the pipeline as on_stage; records how long each stage took"""
+
+    def __init__(self, queue: JobQueue, job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._stage_start = time.perf_counter()
+
+    def __call__(self, stage: str):
+        self._close_stage()
+        self._stage = stage
+        self._stage_start = time.perf_counter()
+        self.queue.set_stage(self.job_id, stage, self.timings)
+
+    def _close_stage(self):
+        if self._stage is not None:
+            elapsed = time.perf_counter() - self._stage_start
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0.0) + elapsed, 3)
+
+    def finish(self) -> Dict[str, float]:
+        self._close_stage()
+        self._stage = None
+        return self.timings
+
+
+class IngestWorkers:
+    """Background threads that drain the job queue"""
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict[str, Any], StageTracker], dict],
+                 num_workers: int = settings.INGEST_WORKERS, poll_interval: float = 1.0):
+        self.queue = queue
+        self.handler = handler
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        requeued = self.queue.requeue_running()
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted ingestion jobs")
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """Wake idle workers after an enqueue instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job: Dict[str, Any]):
+        tracker = StageTracker(self.queue, job["job_id"])
+        try:
+            result = self.handler(job, tracker)
+            self.queue.finish(job["job_id"], tracker.finish(), result=result)
+        except Exception as e:
+            logger.error(f"Ingestion job {job['job_id']} failed: {e}", exc_info=True)
+            self.queue.finish(job["job_id"], tracker.finish(), error=str(e))
+        finally:
+            # Uploads are stored in their own per-job folder
+            job_dir = job["file_path"] if job["kind"] == JOB_KIND_BATCH else os.path.dirname(job["file_path"])
+            shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,107 @@
+# llm_client.py - shared, long-lived Gemini clients
+#
+# Every call site used to build a fresh ChatGoogleGenerativeAI per request, which
+# also meant a fresh gRPC channel (TLS + HTTP/2 handshake) per call. Clients here
+# are created once per (model, temperature, max_tokens) and reused, so their
+# channel stays open and requests are multiplexed over it.
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from config import settings
+
+
+class LLMClientPool:
+    """
+    Long-lived Gemini clients plus a per-model concurrency cap.
+
+    The cap is settings.LLM_MODEL_CONCURRENCY[model] (default LLM_MAX_CONCURRENCY)
+    and applies separately to blocking calls (threads) and awaited calls (per event loop).
+    """
+
+    def __init__(self, max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+                 model_concurrency: Optional[Dict[str, int]] = None):
+        self.max_concurrency = max_concurrency
+        self.model_concurrency = dict(model_concurrency if model_concurrency is not None
+                                      else settings.LLM_MODEL_CONCURRENCY)
+        self._clients: Dict[Tuple, ChatGoogleGenerativeAI] = {}
+        self._thread_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_limits: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _limit_for(self, model: str) -> int:
+        return max(1, self.model_concurrency.get(model, self.max_concurrency))
+
+    def get(self, model: str, temperature: float = settings.LLM_TEMPERATURE,
+            max_tokens: Optional[int] = None) -> ChatGoogleGenerativeAI:
+        key = (model, temperature, max_tokens)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                kwargs = {"max_tokens": max_tokens} if max_tokens is not None else {}
+                client = ChatGoogleGenerativeAI(
+                    model=model,
+                    temperature=temperature,
+                    convert_system_message_to_human=True,
+                    **kwargs,
+                )
+                self._clients[key] = client
+            return client
+
+    @contextmanager
+    def _thread_slot(self, model: str):
+        with self._lock:
+            limit = self._thread_limits.get(model)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self._limit_for(model))
+                self._thread_limits[model] = limit
+        with limit:
+            yield
+
+    def _async_slot(self, model: str) -> asyncio.Semaphore:
+        key = (id(asyncio.get_running_loop()), model)
+        with self._lock:
+            limit = self._async_limits.get(key)
+            if limit is None:
+                limit = asyncio.Semaphore(self._limit_for(model))
+                self._async_limits[key] = limit
+            return limit
+
+    def invoke(self, prompt, model: str, temperature: float = settings.LLM_TEMPERATURE,
+               max_tokens: Optional[int] = None):
+        client = self.get(model, temperature, max_tokens)
+        with self._thread_slot(model):
+            return client.invoke(prompt)
+
+    async def ainvoke(self, prompt, model: str, temperature: float = settings.LLM_TEMPERATURE,
+                      max_tokens: Optional[int] = None):
+        client = self.get(model, temperature, max_tokens)
+        async with self._async_slot(model):
+            return await client.ainvoke(prompt)
+
+    async def astream(self, prompt, model: str, temperature: float = settings.LLM_TEMPERATURE,
+                      max_tokens: Optional[int] = None):
+        """Yield text chunks as they arrive; holds the model slot for the whole stream"""
+        client = self.get(model, temperature, max_tokens)
+        async with self._async_slot(model):
+            async for chunk in client.astream(prompt):
+                if chunk.content:
+                    yield chunk.content
+
+
+llm_pool = LLMClientPool()
+
+
+def invoke(prompt, model: str, temperature: float = settings.LLM_TEMPERATURE, max_tokens: Optional[int] = None):
+    return llm_pool.invoke(prompt, model, temperature, max_tokens)
+
+
+async def ainvoke(prompt, model: str, temperature: float = settings.LLM_TEMPERATURE, max_tokens: Optional[int] = None):
+    return await llm_pool.ainvoke(prompt, model, temperature, max_tokens)
+
+
+def astream(prompt, model: str, temperature: float = settings.LLM_TEMPERATURE, max_tokens: Optional[int] = None):
+    return llm_pool.astream(prompt, model, temperature, max_tokens)
@@ -1,14 +1,26 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import json
 import os
 import shutil
-import hashlib
+import time
+import uuid
+from typing import List, Optional
 
 from config import settings
 from logger import logger
-from vector_store import add_to_faiss_index
-from rag import answer_question
+from vector_store import add_to_faiss_index, compute_pdf_hash
+from rag import aanswer_question, astream_answer
+from store_service import init_store_service, get_store_service
+from converter_registry import warm_up as warm_up_converter
+from batch_ingest import ingest_batch
+from executors import run_ingest, shutdown_pools
+from job_queue import JOB_KIND_BATCH, JobQueue, IngestWorkers
+from answer_cache import answer_cache
+from intent_classifier import get_intent_classifier
+from profile_extractor import extract_profile, parse_structured_query
+from reranker import get_reranker
 
 app = FastAPI(title="CV Chat API", version="1.0")
 
@@ -32,56 +44,189 @@ os.makedirs(FAISS_DIR, exist_ok=True)
 from candidate_manager import CandidateManager
 candidate_manager = CandidateManager(HASH_INDEX_FILE)
 
-def compute_pdf_hash(file_path: str) -> str:
-    """Compute a SHA256 hash of the PDF content."""
-    hash_sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
+def process_upload_job(job, on_stage):
+    """Queue handler: run the full single-CV pipeline for one uploaded file"""
+    if job["kind"] == JOB_KIND_BATCH:
+        return process_batch_job(job, on_stage)
+
+    on_stage("hashing")
+    file_hash = compute_pdf_hash(job["file_path"])
+
+    msg = add_to_faiss_index(job["file_path"], file_hash, FAISS_DIR, HASH_INDEX_FILE,
+                             store=get_store_service(), on_stage=on_stage)
+
+    # Get candidate info for the job result
+    candidate_data = candidate_manager.get_candidate_by_hash(file_hash) or {}
+
+    return {
+        "message": msg,
+        "candidate_id": candidate_data.get("candidate_id"),
+        "candidate_name": candidate_data.get("candidate_name", job["filename"])
+    }
+
+def process_batch_job(job, on_stage):
+    """Queue handler for /upload-batch: file_path is the job folder, one numbered sub-folder per PDF"""
+    batch_dir = job["file_path"]
+    pdf_paths = []
+    for entry in sorted(os.listdir(batch_dir), key=int):
+        file_dir = os.path.join(batch_dir, entry)
+        pdf_paths.extend(os.path.join(file_dir, fname) for fname in os.listdir(file_dir))
+    return ingest_batch(pdf_paths, HASH_INDEX_FILE, store=get_store_service(), on_stage=on_stage)
+
+def backfill_candidate_profiles(store):
+    """Extract structured profiles for candidates indexed before profiles existed"""
+    missing = candidate_manager.candidates_without_profile()
+    entries = []
+    for candidate_id in missing:
+        docs = store.candidate_documents(candidate_id)
+        if docs:
+            entries.append((candidate_id, extract_profile("\n".join(doc.page_content for doc in docs))))
+    candidate_manager.set_candidate_profiles(entries)
+    if entries:
+        logger.info(f"Extracted structured profiles for {len(entries)} existing candidates")
+
+job_queue = JobQueue(settings.JOB_DB_FILE)
+ingest_workers = IngestWorkers(job_queue, process_upload_job)
+
+@app.on_event("startup")
+def load_store_service():
+    """Load the embedding model, FAISS index, Docling converter, intent router and reranker once per worker"""
+    app.state.store = init_store_service(FAISS_DIR)
+    warm_up_converter()
+    backfill_candidate_profiles(app.state.store)
+    if settings.INTENT_CLASSIFIER_ENABLED:
+        get_intent_classifier(app.state.store.embedding_model)
+    if settings.RERANK_ENABLED:
+        get_reranker()
+    ingest_workers.start()
+
+@app.on_event("shutdown")
+def stop_worker_pools():
+    ingest_workers.stop()
+    shutdown_pools()
 
 @app.post("/upload-pdf")
 async def upload_only_pdf(file: UploadFile = File(...)):
-    """Upload a PDF, append embeddings, and remove file after indexing."""
+    """Upload a PDF and queue it for indexing. Poll /jobs/{job_id} for progress."""
     try:
         if not file.filename.endswith(".pdf"):
             return JSONResponse(status_code=400, content={"error": "Only PDF files are allowed."})
 
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
+        # Each job gets its own folder: keeps the original filename for name extraction
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(UPLOAD_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        file_path = os.path.join(job_dir, os.path.basename(file.filename))
 
-        # Save temporarily
+        # Save until a worker has processed it
         with open(file_path, "wb") as f:
             f.write(await file.read())
 
-        # Compute file hash
-        file_hash = compute_pdf_hash(file_path)
+        job_queue.enqueue(file.filename, file_path, job_id=job_id)
+        ingest_workers.notify()
 
-        # Build/append embeddings with candidate management
-        msg = add_to_faiss_index(file_path, file_hash, FAISS_DIR, HASH_INDEX_FILE)
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "status": "queued",
+            "message": f"'{file.filename}' queued for processing"
+        })
 
-        # Remove the uploaded file after processing
-        os.remove(file_path)
+    except Exception as e:
+        logger.error(f"PDF upload failed: {str(e)}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-        # Get candidate info for response
-        hash_index = candidate_manager.load_hash_index()
-        candidate_id = hash_index["file_hashes"].get(file_hash)
-        candidate_data = hash_index["candidates"].get(candidate_id, {})
-        
-        return {
-            "message": msg,
-            "candidate_name": candidate_data.get("candidate_name", file.filename)
-        }
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report stage, per-stage timings and result of an upload job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Job {job_id} not found"})
+    job.pop("file_path", None)
+    return job
+
+@app.post("/upload-batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload many PDFs and queue them as one job: parallel parse/clean, one embedding
+    batch, one FAISS commit. Poll /jobs/{job_id}; its result holds the per-file summary.
+    """
+    job_id = str(uuid.uuid4())
+    batch_dir = os.path.join(UPLOAD_DIR, job_id)
+    try:
+        pdf_paths, rejected = [], []
+        for i, file in enumerate(files):
+            if not file.filename.endswith(".pdf"):
+                rejected.append(file.filename)
+                continue
+            # One sub-folder per file so duplicate names in a batch don't overwrite each other
+            file_dir = os.path.join(batch_dir, str(i))
+            os.makedirs(file_dir, exist_ok=True)
+            file_path = os.path.join(file_dir, os.path.basename(file.filename))
+            with open(file_path, "wb") as f:
+                f.write(await file.read())
+            pdf_paths.append(file_path)
+
+        if not pdf_paths:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return JSONResponse(status_code=400, content={"error": "Only PDF files are allowed."})
+
+        # The worker removes batch_dir once the job has run
+        job_queue.enqueue(f"{len(pdf_paths)} PDFs", batch_dir, job_id=job_id, kind=JOB_KIND_BATCH)
+        ingest_workers.notify()
+
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "status": "queued",
+            "files": len(pdf_paths),
+            "rejected": rejected,
+            "message": f"{len(pdf_paths)} PDFs queued for processing"
+        })
 
     except Exception as e:
-        logger.error(f"PDF upload failed: {str(e)}", exc_info=True)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        logger.error(f"Batch upload failed: {str(e)}", exc_info=True)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+def _sse(event: dict) -> str:
+    payload = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+
+async def _sse_stream(question: str, candidate_ids=None):
+    async for event in astream_answer(question, candidate_ids):
+        yield _sse(event)
+
+def _parse_candidate_ids(values: Optional[List[str]]) -> Optional[List[str]]:
+    """Accepts repeated candidate_ids fields and/or comma-separated lists"""
+    if not values:
+        return None
+    ids = [candidate_id.strip() for value in values for candidate_id in value.split(",") if candidate_id.strip()]
+    return list(dict.fromkeys(ids)) or None
+
 @app.post("/ask")
-async def ask_question(question: str = Form(...)):
-    """Ask a question - simplified LLM-driven approach"""
+async def ask_question(request: Request, question: str = Form(...), stream: bool = Form(False),
+                       candidate_ids: Optional[List[str]] = Form(None)):
+    """
+    Ask a question - simplified LLM-driven approach.
+    candidate_ids limits retrieval to those candidates (see GET /candidates).
+    With stream=true (or Accept: text/event-stream) the answer is sent as
+    server-sent events: meta, token..., optional replace, done.
+    """
     try:
+        scope = _parse_candidate_ids(candidate_ids)
+        if scope:
+            unknown = [candidate_id for candidate_id in scope if not candidate_manager.get_candidate_by_id(candidate_id)]
+            if unknown:
+                return JSONResponse(status_code=404, content={"error": "Unknown candidate_ids", "candidate_ids": unknown})
+
+        if stream or "text/event-stream" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                _sse_stream(question, scope),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
         # Always call answer_question - it handles both scenarios internally
-        answer = answer_question(question)
+        answer = await aanswer_question(question, scope)
 
         if not answer or answer.strip() == "":
             return {"question": question, "answer": "I couldn't generate a response. Please try rephrasing your question."}
@@ -92,17 +237,118 @@ async def ask_question(question: str = Form(...)):
         logger.error(f"Question answering failed: {str(e)}", exc_info=True)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.get("/candidates")
+async def list_candidates():
+    """Indexed candidates with their ids (for scoping /ask) and chunk counts"""
+    chunk_counts = get_store_service().candidate_chunk_counts()
+    candidates = [{**candidate, "chunks": chunk_counts.get(candidate["candidate_id"], 0)}
+                  for candidate in candidate_manager.list_all_candidates()]
+    return {"count": len(candidates), "candidates": candidates}
+
+def _split_param(value: Optional[str]) -> List[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()] if value else []
+
+@app.get("/candidates/search")
+async def search_candidates(q: Optional[str] = None, skills: Optional[str] = None, roles: Optional[str] = None,
+                            min_years: Optional[float] = None, match: str = "all"):
+    """
+    Structured candidate lookup over the skills / roles / years extracted at ingest.
+    Either pass a question (q="React developers with 3+ years") or explicit
+    comma-separated skills / roles, min_years and match=all|any. No vector search, no LLM.
+    """
+    start = time.perf_counter()
+    if match not in ("all", "any"):
+        return JSONResponse(status_code=400, content={"error": "match must be 'all' or 'any'"})
+
+    query = {"skills": _split_param(skills), "roles": _split_param(roles), "min_years": min_years, "match": match}
+    if q:
+        parsed = parse_structured_query(q)
+        if parsed is None:
+            return JSONResponse(status_code=400, content={"error": "No known skill, role or years of experience in q"})
+        query = parsed
+    if not query["skills"] and not query["roles"] and query["min_years"] is None:
+        return JSONResponse(status_code=400, content={"error": "Pass q, skills, roles or min_years"})
+
+    candidates = candidate_manager.find_candidates(query["skills"], query["roles"], query["min_years"], query["match"])
+    return {
+        "query": query,
+        "count": len(candidates),
+        "candidates": candidates,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+@app.delete("/candidates/{candidate_id}")
+async def delete_candidate(candidate_id: str):
+    """Remove one candidate (vectors, profile, file hashes) without touching anyone else"""
+    try:
+        candidate = candidate_manager.get_candidate_by_id(candidate_id)
+        if candidate is None:
+            return JSONResponse(status_code=404, content={"error": f"Candidate {candidate_id} not found"})
+
+        # Vectors first: a failure in between leaves a candidate with no vectors, which can be deleted again
+        removed = await run_ingest(get_store_service().delete_candidate, candidate_id)
+        candidate_manager.delete_candidate(candidate_id)
+
+        logger.info(f"Deleted candidate {candidate['candidate_name']} ({candidate_id}), {removed} vectors")
+        return {"message": f"Candidate '{candidate['candidate_name']}' deleted", "candidate_id": candidate_id,
+                "vectors_removed": removed}
+
+    except Exception as e:
+        logger.error(f"Candidate delete failed: {str(e)}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.put("/candidates/{candidate_id}")
+async def update_candidate(candidate_id: str, file: UploadFile = File(...)):
+    """Re-ingest one candidate from a new (or the same, re-parsed) PDF, keeping its candidate_id"""
+    if candidate_manager.get_candidate_by_id(candidate_id) is None:
+        return JSONResponse(status_code=404, content={"error": f"Candidate {candidate_id} not found"})
+    if not file.filename.endswith(".pdf"):
+        return JSONResponse(status_code=400, content={"error": "Only PDF files are allowed."})
+
+    update_dir = os.path.join(UPLOAD_DIR, f"update_{uuid.uuid4().hex}")
+    try:
+        os.makedirs(update_dir, exist_ok=True)
+        file_path = os.path.join(update_dir, os.path.basename(file.filename))
+        with open(file_path, "wb") as f:
+            f.write(await file.read())
+
+        file_hash = compute_pdf_hash(file_path)
+        owner = candidate_manager.get_candidate_by_hash(file_hash)
+        if owner and owner["candidate_id"] != candidate_id:
+            return JSONResponse(status_code=409, content={
+                "error": "This file is already indexed for another candidate",
+                "candidate_id": owner["candidate_id"],
+            })
+
+        msg = await run_ingest(add_to_faiss_index, file_path, file_hash, FAISS_DIR, HASH_INDEX_FILE,
+                               store=get_store_service(), candidate_id=candidate_id)
+        return {
+            "message": msg,
+            "candidate": candidate_manager.get_candidate_by_id(candidate_id),
+            "chunks": len(get_store_service().candidate_documents(candidate_id)),
+        }
+
+    except Exception as e:
+        logger.error(f"Candidate update failed: {str(e)}", exc_info=True)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    finally:
+        shutil.rmtree(update_dir, ignore_errors=True)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Answer cache hit rates (exact and semantic tiers)"""
+    return {**answer_cache.stats(), "index_version": get_store_service().version}
+
 @app.post("/reset")
 async def reset_vector_store():
     """Completely reset FAISS and hash store."""
     try:
-        # Delete FAISS and hash index
-        if os.path.exists(FAISS_DIR):
-            shutil.rmtree(FAISS_DIR)
-            os.makedirs(FAISS_DIR, exist_ok=True)
+        # Delete FAISS (in memory and on disk) and the candidate store
+        get_store_service().reset()
 
-        if os.path.exists(HASH_INDEX_FILE):
-            os.remove(HASH_INDEX_FILE)
+        candidate_manager.clear()
+        answer_cache.clear()
 
         logger.warning("Vector store and candidate index reset")
         return {"message": "Vector store and hash index reset successfully."}
@@ -0,0 +1,116 @@
+# onnx_embeddings.py - ONNX Runtime backend for sentence-transformers models
+#
+# Selected with EMBEDDING_BACKEND=onnx. On first use the Hugging Face model is
+# exported to ONNX (and, with EMBEDDING_ONNX_QUANTIZE, int8 dynamically
+# quantized) under ONNX_MODEL_DIR; later starts load the exported file and never
+# import torch. Pooling matches all-MiniLM-L6-v2: attention-masked mean, then L2.
+#
+# Needs the optional onnxruntime + onnx packages (see requirements.txt).
+import os
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import settings
+from logger import logger
+
+
+def export_onnx(model_name: str, model_dir: str = settings.ONNX_MODEL_DIR,
+                quantize: bool = settings.EMBEDDING_ONNX_QUANTIZE) -> str:
+    """Export (once) and return the path of the .onnx file to load. The tokenizer is saved alongside."""
+    target = os.path.join(model_dir, re.sub(r"[^\w.-]", "_", model_name))
+    fp32_path = os.path.join(target, "model.onnx")
+    int8_path = os.path.join(target, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info(f"Exporting {model_name} to ONNX in {target}")
+        os.makedirs(target, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+        tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(target)
+        os.replace(tmp_path, fp32_path)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing {fp32_path} to int8")
+        tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+class OnnxEmbeddingEngine(Embeddings):
+    """Same interface as EmbeddingEngine (embed / embed_documents / embed_query), run by ONNX Runtime"""
+
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL, quantize: bool = settings.EMBEDDING_ONNX_QUANTIZE,
+                 batch_size: int = settings.EMBEDDING_BATCH_SIZE, num_threads: int = settings.EMBEDDING_THREADS,
+                 model_dir: str = settings.ONNX_MODEL_DIR, max_length: int = 256):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = export_onnx(model_name, model_dir, quantize)
+        # Distinct name so the embedding cache never mixes int8 and torch vectors
+        self.model_name = f"{model_name}@onnx{'-int8' if quantize else ''}"
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(path))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [node.name for node in self.session.get_inputs()]
+        self.dimension = self._encode(["dimension probe"]).shape[1]
+        logger.info(f"ONNX embedding backend ready: {path}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        hidden = self.session.run(None, feeds)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Longest first, so every batch holds texts of similar length
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch_ids = order[start:start + self.batch_size]
+            vectors[batch_ids] = self._encode([texts[i] for i in batch_ids])
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
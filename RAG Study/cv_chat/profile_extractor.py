@@ -0,0 +1,199 @@
+# profile_extractor.py - rule-based skill / role / years-of-experience extraction
+#
+# Runs on the cleaned golden chunk at ingest (no LLM call) and on questions at
+# query time, so both sides map onto the same canonical vocabulary:
+#   "React.js", "ReactJS" -> react      "Quality Assurance", "SQA" -> sqa
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# canonical skill -> aliases (lower case, matched on token boundaries)
+SKILL_ALIASES: Dict[str, List[str]] = {
+    "python": ["python"],
+    "java": ["java"],
+    "javascript": ["javascript", "js", "es6"],
+    "typescript": ["typescript", "ts"],
+    "c": ["c language", "c programming"],
+    "c++": ["c++", "cpp"],
+    "c#": ["c#", "csharp"],
+    "go": ["golang", "go lang"],
+    "rust": ["rust"],
+    "php": ["php"],
+    "ruby": ["ruby"],
+    "kotlin": ["kotlin"],
+    "swift": ["swift"],
+    "dart": ["dart"],
+    "r": ["r programming", "r language"],
+    "sql": ["sql"],
+    "html": ["html", "html5"],
+    "css": ["css", "css3", "scss", "sass", "tailwind", "tailwindcss", "bootstrap"],
+    "react": ["react", "react.js", "reactjs"],
+    "react native": ["react native"],
+    "angular": ["angular", "angularjs"],
+    "vue": ["vue", "vue.js", "vuejs"],
+    "next.js": ["next.js", "nextjs"],
+    "node.js": ["node", "node.js", "nodejs"],
+    "express": ["express", "express.js", "expressjs"],
+    "django": ["django"],
+    "flask": ["flask"],
+    "fastapi": ["fastapi"],
+    "spring": ["spring", "spring boot", "springboot"],
+    "laravel": ["laravel"],
+    ".net": [".net", "asp.net", "dotnet"],
+    "flutter": ["flutter"],
+    "android": ["android"],
+    "ios": ["ios"],
+    "mysql": ["mysql"],
+    "postgresql": ["postgresql", "postgres"],
+    "mongodb": ["mongodb", "mongo"],
+    "redis": ["redis"],
+    "oracle": ["oracle"],
+    "firebase": ["firebase"],
+    "elasticsearch": ["elasticsearch"],
+    "docker": ["docker"],
+    "kubernetes": ["kubernetes", "k8s"],
+    "aws": ["aws", "amazon web services"],
+    "azure": ["azure"],
+    "gcp": ["gcp", "google cloud"],
+    "terraform": ["terraform"],
+    "jenkins": ["jenkins"],
+    "ci/cd": ["ci/cd", "cicd", "continuous integration"],
+    "git": ["git", "github", "gitlab"],
+    "linux": ["linux", "ubuntu"],
+    "graphql": ["graphql"],
+    "rest api": ["rest", "restful", "rest api", "rest apis"],
+    "microservices": ["microservices", "microservice"],
+    "kafka": ["kafka"],
+    "spark": ["spark", "pyspark"],
+    "machine learning": ["machine learning", "ml"],
+    "deep learning": ["deep learning"],
+    "nlp": ["nlp", "natural language processing"],
+    "computer vision": ["computer vision", "opencv"],
+    "tensorflow": ["tensorflow"],
+    "pytorch": ["pytorch"],
+    "scikit-learn": ["scikit-learn", "sklearn"],
+    "pandas": ["pandas"],
+    "numpy": ["numpy"],
+    "llm": ["llm", "llms", "langchain", "rag"],
+    "power bi": ["power bi", "powerbi"],
+    "tableau": ["tableau"],
+    "excel": ["excel"],
+    "selenium": ["selenium"],
+    "cypress": ["cypress"],
+    "playwright": ["playwright"],
+    "appium": ["appium"],
+    "jmeter": ["jmeter"],
+    "postman": ["postman"],
+    "jira": ["jira"],
+    "manual testing": ["manual testing"],
+    "automation testing": ["automation testing", "test automation", "automated testing"],
+    "agile": ["agile", "scrum", "kanban"],
+    "figma": ["figma"],
+}
+
+# canonical role -> aliases; covers the role families generate_smart_fallback knows
+ROLE_ALIASES: Dict[str, List[str]] = {
+    "sqa": ["sqa", "qa", "quality assurance", "software tester", "test engineer", "tester", "qa engineer"],
+    "frontend": ["frontend", "front-end", "front end", "ui developer"],
+    "backend": ["backend", "back-end", "back end"],
+    "full stack": ["full stack", "full-stack", "fullstack", "mern", "mean stack"],
+    "mobile": ["mobile developer", "mobile app", "android developer", "ios developer", "flutter developer"],
+    "devops": ["devops", "site reliability", "sre", "cloud engineer"],
+    "data scientist": ["data scientist", "data science"],
+    "data engineer": ["data engineer", "data engineering", "etl"],
+    "data analyst": ["data analyst", "business analyst", "bi analyst"],
+    "ml engineer": ["ml engineer", "machine learning engineer", "ai engineer"],
+    "software engineer": ["software engineer", "software developer", "programmer"],
+    "project manager": ["project manager", "product manager", "scrum master"],
+    "designer": ["ui/ux", "ux designer", "ui designer", "graphic designer"],
+    "security": ["security engineer", "cyber security", "cybersecurity", "penetration tester"],
+}
+
+# Aliases that are ordinary English inside a question ("the rest of", "excel at", "in spring")
+QUESTION_STOP_ALIASES = frozenset({"rest", "express", "excel", "spring", "swift", "node", "rag"})
+
+_BOUNDARY_LEFT = r"(?<![\w+#./])"
+_BOUNDARY_RIGHT = r"(?![\w+#]|\.\w)"
+
+
+def _compile(aliases: Dict[str, List[str]], skip=frozenset()):
+    return [
+        (canonical, re.compile(_BOUNDARY_LEFT + "(?:" + "|".join(
+            re.escape(alias) for alias in sorted(names, key=len, reverse=True) if alias not in skip
+        ) + ")" + _BOUNDARY_RIGHT))
+        for canonical, names in aliases.items()
+        if any(alias not in skip for alias in names)
+    ]
+
+
+_SKILL_PATTERNS = _compile(SKILL_ALIASES)
+_ROLE_PATTERNS = _compile(ROLE_ALIASES)
+_QUESTION_SKILL_PATTERNS = _compile(SKILL_ALIASES, QUESTION_STOP_ALIASES)
+
+_YEARS_STATED = re.compile(r"(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years?|yrs?)(?:\s+of)?(?:\s+\w+){0,3}?\s+experience")
+_YEAR_RANGE = re.compile(r"\b((?:19|20)\d\d)\s*(?:-|–|—|to)\s*((?:19|20)\d\d|present|current|now|ongoing)\b")
+_MIN_YEARS_QUESTION = re.compile(
+    r"(?:at least|minimum(?: of)?|more than|over|>=?)\s*(\d{1,2})\s*\+?\s*(?:years?|yrs?)"
+    r"|(\d{1,2})\s*\+\s*(?:years?|yrs?)"
+    r"|(\d{1,2})\s*(?:years?|yrs?)\s*(?:or more|plus)"
+)
+
+
+def _match(patterns, text: str) -> List[str]:
+    return [canonical for canonical, pattern in patterns if pattern.search(text)]
+
+
+def estimate_years(text: str) -> Optional[float]:
+    """Stated "N years of experience" wins; otherwise the span from the earliest to the latest date range"""
+    lowered = text.lower()
+    stated = [float(value) for value in _YEARS_STATED.findall(lowered) if float(value) <= 50]
+    if stated:
+        return max(stated)
+
+    current_year = datetime.now().year
+    starts, ends = [], []
+    for start, end in _YEAR_RANGE.findall(lowered):
+        end_year = current_year if not end[0].isdigit() else int(end)
+        if int(start) <= end_year <= current_year:
+            starts.append(int(start))
+            ends.append(end_year)
+    if not starts:
+        return None
+    return float(max(ends) - min(starts))
+
+
+def extract_profile(text: str) -> Dict[str, object]:
+    """{"skills": [...], "roles": [...], "years_experience": float | None} from CV text"""
+    lowered = text.lower()
+    return {
+        "skills": _match(_SKILL_PATTERNS, lowered),
+        "roles": _match(_ROLE_PATTERNS, lowered),
+        "years_experience": estimate_years(text),
+    }
+
+
+def parse_structured_query(question: str) -> Optional[Dict[str, object]]:
+    """
+    Skills / roles / minimum years mentioned in a question, or None if it names none.
+    match is "any" for "React or Vue" style questions, otherwise "all".
+    """
+    lowered = question.lower()
+    skills = _match(_QUESTION_SKILL_PATTERNS, lowered)
+    roles = _match(_ROLE_PATTERNS, lowered)
+    # "React Native" also matches "react"; keep the more specific skill
+    if "react native" in skills and "react" in skills and not re.search(r"\breact\b(?!\s+native)", lowered):
+        skills.remove("react")
+
+    min_years = None
+    years_match = _MIN_YEARS_QUESTION.search(lowered)
+    if years_match:
+        min_years = float(next(group for group in years_match.groups() if group))
+
+    if not skills and not roles and min_years is None:
+        return None
+    return {
+        "skills": skills,
+        "roles": roles,
+        "min_years": min_years,
+        "match": "any" if re.search(r"\bor\b", lowered) else "all",
+    }
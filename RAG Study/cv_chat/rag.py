@@ -2,23 +2,29 @@
 import os
 import getpass
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 import re
 
 from config import settings
 from logger import logger
+from store_service import get_store_service
+from executors import run_query
+from answer_cache import answer_cache
+from sparse_index import reciprocal_rank_fusion
+from candidate_pooling import pool_documents, rank_candidates
+from candidate_store import get_candidate_store
+from profile_extractor import parse_structured_query
+from reranker import get_reranker
+from context_packer import ContextPacker
+import llm_client
+from intent_classifier import get_intent_classifier
 
 load_dotenv()
 
-def llm_general_knowledge(question: str) -> str:
-    """
-    Answer general knowledge questions using LLM
-    """
-    try:
-        prompt_template = """
+GENERAL_ERROR_MESSAGE = "I encountered an error while processing your question. Please try again."
+RAG_ERROR_MESSAGE = "Error analyzing CVs. Please try again."
+
+GENERAL_KNOWLEDGE_PROMPT = """
         You are a helpful AI assistant. Answer the following question clearly and accurately.
         
         QUESTION: {question}
@@ -32,42 +38,8 @@ def llm_general_knowledge(question: str) -> str:
         
         ANSWER:
         """
-        
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.3,
-            max_tokens=500,
-            convert_system_message_to_human=True
-        )
-        
-        prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["question"]
-        )
-        
-        final_prompt = prompt.invoke({"question": question})
-        response = llm.invoke(final_prompt)
-        
-        answer = response.content.strip()
-        
-        # Clean up formatting
-        answer = re.sub(r'[*_`#]', '', answer)
-        answer = re.sub(r'\n+', '\n', answer)
-        answer = answer.strip()
-        
-        return answer
-        
-    except Exception as e:
-        logger.error(f"General knowledge LLM failed: {e}")
-        return "I encountered an error while processing your question. Please try again."
 
-def llm_determine_intent(question: str) -> str:
-    """
-    Let LLM decide if the question is about uploaded CVs or general knowledge
-    Returns: "cv_related" or "general_knowledge"
-    """
-    try:
-        prompt_template = """
+INTENT_PROMPT = """
         You are analyzing a user question to determine if it's about analyzing CVs/resumes that have been uploaded to the system.
         
         QUESTION: {question}
@@ -80,67 +52,8 @@ def llm_determine_intent(question: str) -> str:
         
         DECISION:
         """
-        
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            temperature=0.1,
-            max_tokens=50,
-            convert_system_message_to_human=True
-        )
-        
-        prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["question"]
-        )
-        
-        final_prompt = prompt.invoke({"question": question})
-        response = llm.invoke(final_prompt)
-        
-        intent = response.content.strip().lower()
-        
-        if "cv_related" in intent:
-            logger.info(f"LLM determined intent: CV-related for question: {question}")
-            return "cv_related"
-        else:
-            logger.info(f"LLM determined intent: General knowledge for question: {question}")
-            return "general_knowledge"
-            
-    except Exception as e:
-        logger.warning(f"LLM intent detection failed, defaulting to general knowledge: {e}")
-        return "general_knowledge"
-
-def rag_answer(question: str) -> str:
-    """Answer questions using RAG from uploaded CVs - SIMPLIFIED"""
-    try:
-        # Initialize
-        GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-        if not GOOGLE_API_KEY:
-            GOOGLE_API_KEY = getpass.getpass("Enter Google API key: ")
-            os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-        embedding_model = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
-        vector_store = FAISS.load_local("faiss_index", embedding_model, allow_dangerous_deserialization=True)
-        
-        # Retrieve documents
-        retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 5})
-        retrieved_docs = retriever.invoke(question)
-        
-        if not retrieved_docs:
-            return "No relevant information found in the uploaded CVs."
-
-        # Prepare context
-        context_parts = []
-        candidate_names = []
-        
-        for doc in retrieved_docs:
-            candidate_name = doc.metadata.get('candidate_name', 'Unknown')
-            candidate_names.append(candidate_name)
-            context_parts.append(f"CANDIDATE: {candidate_name}\nCONTENT: {doc.page_content}")
-        
-        context_text = "\n\n".join(context_parts)
-        
-
-        prompt_template = """
+RAG_PROMPT = """
         You are an HR assistant analyzing CVs. Answer the question based STRICTLY on the provided context clearly and accurately.
         
         CONTEXT FROM UPLOADED CVs:
@@ -167,32 +80,276 @@ def rag_answer(question: str) -> str:
         
         ANSWER:
         """
+
+# (model, temperature, max_tokens) per call path; clients are shared via llm_client
+GENERAL_KNOWLEDGE_LLM = ("gemini-2.5-flash", 0.3, 500)
+INTENT_LLM = ("gemini-2.5-flash-lite", 0.1, 50)
+RAG_LLM = ("gemini-2.5-flash", 0.1, 1500)  # Reduced to avoid truncation
+
+class _StreamCleaner:
+    """_clean_answer applied chunk by chunk (markdown stripped, blank lines collapsed across chunks)"""
+
+    def __init__(self):
+        self._started = False
+        self._last_newline = False
+
+    def feed(self, text: str) -> str:
+        text = re.sub(r'\n+', '\n', re.sub(r'[*_`#]', '', text))
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        if self._last_newline and text.startswith('\n'):
+            text = text[1:]
+        if text:
+            self._last_newline = text.endswith('\n')
+        return text
+
+def _general_knowledge_prompt(question: str):
+    prompt = PromptTemplate(
+        template=GENERAL_KNOWLEDGE_PROMPT,
+        input_variables=["question"]
+    )
+    return prompt.invoke({"question": question})
+
+def _intent_prompt(question: str):
+    prompt = PromptTemplate(
+        template=INTENT_PROMPT,
+        input_variables=["question"]
+    )
+    return prompt.invoke({"question": question})
+
+def _clean_answer(answer: str) -> str:
+    """Strip markdown formatting and collapse blank lines"""
+    answer = re.sub(r'[*_`#]', '', answer.strip())
+    answer = re.sub(r'\n+', '\n', answer)
+    return answer.strip()
+
+def _parse_intent(content: str, question: str) -> str:
+    intent = content.strip().lower()
+    
+    if "cv_related" in intent:
+        logger.info(f"LLM determined intent: CV-related for question: {question}")
+        return "cv_related"
+    else:
+        logger.info(f"LLM determined intent: General knowledge for question: {question}")
+        return "general_knowledge"
+
+def _ensure_google_api_key():
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    if not GOOGLE_API_KEY:
+        GOOGLE_API_KEY = getpass.getpass("Enter Google API key: ")
+        os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+
+def _build_rag_prompt(retrieved_docs, question: str, packing: bool = None):
+    """
+    Prepare context from retrieved chunks. Returns (final_prompt, candidate_names).
+    With CONTEXT_PACKING_ENABLED only the question-relevant sections that fit
+    CONTEXT_TOKEN_BUDGET are included, duplicates dropped.
+    """
+    context_parts = []
+    candidate_names = []
+
+    if packing is None:
+        packing = settings.CONTEXT_PACKING_ENABLED
+    if packing:
+        packed, stats = ContextPacker().pack(question, retrieved_docs)
+        logger.info(f"Context packed to {stats['packed_tokens']}/{stats['original_tokens']} tokens "
+                    f"({stats['sections_kept']}/{stats['sections_total']} sections, "
+                    f"{stats['duplicates_dropped']} duplicates)")
+    else:
+        packed = [(doc, doc.page_content) for doc in retrieved_docs]
+
+    for doc, content in packed:
+        candidate_name = doc.metadata.get('candidate_name', 'Unknown')
+        candidate_names.append(candidate_name)
+        context_parts.append(f"CANDIDATE: {candidate_name}\nCONTENT: {content}")
+    
+    context_text = "\n\n".join(context_parts)
+    return RAG_PROMPT.format(context=context_text, question=question), candidate_names
+
+def _needs_fallback(answer: str) -> bool:
+    return not answer or len(answer) < 20 or answer.endswith(('1.', '2.', '-', '•'))
+
+def llm_general_knowledge(question: str) -> str:
+    """
+    Answer general knowledge questions using LLM
+    """
+    try:
+        response = llm_client.invoke(_general_knowledge_prompt(question), *GENERAL_KNOWLEDGE_LLM)
+        return _clean_answer(response.content)
         
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.1,
-            max_tokens=1500,  # Reduced to avoid truncation
-            convert_system_message_to_human=True
-        )
-        
-        final_prompt = prompt_template.format(context=context_text, question=question)
-        response = llm.invoke(final_prompt)
+    except Exception as e:
+        logger.error(f"General knowledge LLM failed: {e}")
+        return GENERAL_ERROR_MESSAGE
+
+async def allm_general_knowledge(question: str) -> str:
+    """Async llm_general_knowledge - awaits Gemini without blocking the event loop"""
+    try:
+        response = await llm_client.ainvoke(_general_knowledge_prompt(question), *GENERAL_KNOWLEDGE_LLM)
+        return _clean_answer(response.content)
         
-        answer = response.content.strip()
+    except Exception as e:
+        logger.error(f"General knowledge LLM failed: {e}")
+        return GENERAL_ERROR_MESSAGE
+
+def llm_determine_intent(question: str) -> str:
+    """
+    Let LLM decide if the question is about uploaded CVs or general knowledge
+    Returns: "cv_related" or "general_knowledge"
+    """
+    try:
+        response = llm_client.invoke(_intent_prompt(question), *INTENT_LLM)
+        return _parse_intent(response.content, question)
+            
+    except Exception as e:
+        logger.warning(f"LLM intent detection failed, defaulting to general knowledge: {e}")
+        return "general_knowledge"
+
+async def allm_determine_intent(question: str) -> str:
+    """Async llm_determine_intent"""
+    try:
+        response = await llm_client.ainvoke(_intent_prompt(question), *INTENT_LLM)
+        return _parse_intent(response.content, question)
+            
+    except Exception as e:
+        logger.warning(f"LLM intent detection failed, defaulting to general knowledge: {e}")
+        return "general_knowledge"
+
+def _local_intent(question: str, query_vector=None):
+    """In-process intent, or None when disabled or not confident enough"""
+    if not settings.INTENT_CLASSIFIER_ENABLED:
+        return None
+    try:
+        store = get_store_service()
+        if query_vector is None:
+            query_vector = store.embed_query(question)
+        intent = get_intent_classifier(store.embedding_model).route(query_vector)
+        if intent:
+            logger.info(f"Local classifier determined intent: {intent} for question: {question}")
+        return intent
+    except Exception as e:
+        logger.warning(f"Local intent classifier failed, using LLM router: {e}")
+        return None
+
+def determine_intent(question: str, query_vector=None) -> str:
+    """Local classifier first, LLM router only for low-confidence questions"""
+    return _local_intent(question, query_vector) or llm_determine_intent(question)
+
+async def adetermine_intent(question: str, query_vector=None) -> str:
+    """Async determine_intent; the local classifier runs in the query pool"""
+    intent = await run_query(_local_intent, question, query_vector)
+    return intent or await allm_determine_intent(question)
+
+def _prefilter_candidates(question: str):
+    """
+    Candidate ids whose extracted profile matches the skills / roles / years the
+    question names, or None when it names none, nothing matches, or too much does.
+    """
+    if not settings.STRUCTURED_PREFILTER_ENABLED:
+        return None
+    query = parse_structured_query(question)
+    if query is None:
+        return None
+    try:
+        matches = get_candidate_store(settings.CANDIDATE_DB_FILE).find_candidates(
+            query["skills"], query["roles"], query["min_years"], query["match"])
+    except Exception as e:
+        logger.warning(f"Structured pre-filter failed, searching all candidates: {e}")
+        return None
+    # No match may just mean the extractor missed it - let the search decide
+    if not matches or len(matches) > settings.STRUCTURED_PREFILTER_MAX_CANDIDATES:
+        return None
+    logger.info(f"Structured pre-filter: {len(matches)} candidates match {query}")
+    return [candidate["candidate_id"] for candidate in matches]
+
+def _retrieve(question: str, query_vector=None, k: int = 5, candidate_ids=None):
+    """
+    Search the resident index, reusing the query embedding when the caller already has it.
+    candidate_ids restricts the search to those candidates' chunks; otherwise the
+    structured pre-filter may narrow it to candidates matching the question.
+    With HYBRID_SEARCH_ENABLED, BM25 keyword hits are fused with the vector hits.
+    With RERANK_ENABLED, RERANK_CANDIDATES are fetched and the cross-encoder keeps the best k.
+    """
+    if not settings.RERANK_ENABLED:
+        return _search(question, query_vector, k, candidate_ids)
+    docs = _search(question, query_vector, max(k, settings.RERANK_CANDIDATES), candidate_ids)
+    try:
+        return get_reranker().rerank(question, docs, min(k, settings.RERANK_TOP_K))
+    except Exception as e:
+        logger.warning(f"Reranking failed, using retrieval order: {e}")
+        return docs[:k]
+
+def _search(question: str, query_vector, k: int, candidate_ids):
+    """
+    Top-k candidates, one golden chunk each. Chunk hits (golden chunks and
+    section vectors) are pooled per candidate with RETRIEVAL_POOLING; with
+    HYBRID_SEARCH_ENABLED the BM25 candidate ranking is fused in with RRF.
+    """
+    store = get_store_service()
+    if store.is_empty():
+        return []
+    scope = candidate_ids or _prefilter_candidates(question)
+    if query_vector is None:
+        query_vector = store.embed_query(question)
+
+    depth = max(k, settings.RETRIEVAL_HITS)
+    dense = store.similarity_search_with_score_by_vector(query_vector, k=depth, candidate_ids=scope)
+    ranked = pool_documents(dense)
+    if settings.HYBRID_SEARCH_ENABLED:
+        sparse = store.keyword_search(question, k=depth, candidate_ids=scope)
+        ranked = reciprocal_rank_fusion([ranked[:settings.HYBRID_CANDIDATES],
+                                         rank_candidates(sparse)[:settings.HYBRID_CANDIDATES]], k, key=str)
+    return store.golden_chunks(ranked[:k])
+
+def rag_answer(question: str, query_vector=None, candidate_ids=None) -> str:
+    """Answer questions using RAG from uploaded CVs - SIMPLIFIED"""
+    try:
+        _ensure_google_api_key()
+
+        # Retrieve documents from the resident index
+        retrieved_docs = _retrieve(question, query_vector, 5, candidate_ids)
         
-        # Clean up
-        answer = re.sub(r'[*_`#]', '', answer)
-        answer = re.sub(r'\n+', '\n', answer).strip()
+        if not retrieved_docs:
+            return "No relevant information found in the uploaded CVs."
+
+        final_prompt, candidate_names = _build_rag_prompt(retrieved_docs, question)
+        response = llm_client.invoke(final_prompt, *RAG_LLM)
+        answer = _clean_answer(response.content)
         
         # Better fallback check
-        if not answer or len(answer) < 20 or answer.endswith(('1.', '2.', '-', '•')):
+        if _needs_fallback(answer):
+            return generate_smart_fallback(candidate_names, retrieved_docs, question)
+        
+        return answer
+        
+    except Exception as e:
+        logger.error(f"RAG failed: {e}")
+        return RAG_ERROR_MESSAGE
+
+async def arag_answer(question: str, query_vector=None, candidate_ids=None) -> str:
+    """Async rag_answer: retrieval runs in the query pool, the Gemini call is awaited"""
+    try:
+        _ensure_google_api_key()
+
+        retrieved_docs = await run_query(_retrieve, question, query_vector, 5, candidate_ids)
+        
+        if not retrieved_docs:
+            return "No relevant information found in the uploaded CVs."
+
+        final_prompt, candidate_names = _build_rag_prompt(retrieved_docs, question)
+        response = await llm_client.ainvoke(final_prompt, *RAG_LLM)
+        answer = _clean_answer(response.content)
+        
+        if _needs_fallback(answer):
             return generate_smart_fallback(candidate_names, retrieved_docs, question)
         
         return answer
         
     except Exception as e:
         logger.error(f"RAG failed: {e}")
-        return "Error analyzing CVs. Please try again."
+        return RAG_ERROR_MESSAGE
 
 def generate_smart_fallback(candidate_names, retrieved_docs, question):
     """Generate smart fallback responses"""
@@ -216,29 +373,59 @@ def generate_smart_fallback(candidate_names, retrieved_docs, question):
         return f"Candidates found: {', '.join(candidate_names)}"
 
 
-def answer_question(question: str) -> str:
-    """al know
+
+def _is_cacheable(answer: str) -> bool:
+    return bool(answer) and answer not in (GENERAL_ERROR_MESSAGE, RAG_ERROR_MESSAGE)
+
+def answer_question(question: str, candidate_ids=None) -> str:
+    """
     Simplified LLM-driven approach:
+    - Cached: exact or semantically-equivalent question against the same index version and scope
     - No documents: Always use general knowledge
+    - Scoped to candidate_ids: RAG over those candidates only
     - With documents: Let LLM decide if question is CV-related or general knowledge
     """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return _route_question(question, None, candidate_ids)
+
+    store = get_store_service()
+    version = store.version
+    scope = answer_cache.scope_key(candidate_ids)
+    cached = answer_cache.get_exact(question, version, scope)
+    if cached is not None:
+        return cached
+
+    query_vector = store.embed_query(question)
+    cached = answer_cache.get_semantic(question, query_vector, version, scope)
+    if cached is not None:
+        return cached
+
+    answer = _route_question(question, query_vector, candidate_ids)
+    if _is_cacheable(answer):
+        answer_cache.put(question, version, answer, query_vector, scope)
+    return answer
+
+def _route_question(question: str, query_vector=None, candidate_ids=None) -> str:
     try:
-        # Check if FAISS index exists and has documents
-        faiss_exists = os.path.exists("faiss_index") and os.listdir("faiss_index")
-        
-        if not faiss_exists:
+        # Check if the resident FAISS index has documents
+        if get_store_service().is_empty():
             # Scene 1: No documents uploaded - always use general knowledge
             logger.info("No documents - using general knowledge LLM")
             return llm_general_knowledge(question)
+
+        if candidate_ids:
+            # Asking about specific candidates is CV-related by definition
+            logger.info(f"Using RAG scoped to {len(candidate_ids)} candidates")
+            return rag_answer(question, query_vector, candidate_ids)
         
         # Scene 2: Documents uploaded - let LLM decide routing
-        logger.info("Documents available - LLM deciding routing")
-        intent = llm_determine_intent(question)
+        logger.info("Documents available - deciding routing")
+        intent = determine_intent(question, query_vector)
         
         if intent == "cv_related":
             # Scene 2.1: CV-related question - use RAG
             logger.info("Using RAG for CV-related question")
-            return rag_answer(question)
+            return rag_answer(question, query_vector)
         else:
             # Scene 2.2: General knowledge question - use LLM directly
             logger.info("Using general knowledge LLM")
@@ -246,7 +433,164 @@ def answer_question(question: str) -> str:
 
     except Exception as e:
         logger.error(f"Error in answer_question: {e}", exc_info=True)
-        return "I encountered an error while processing your question. Please try again."
+        return GENERAL_ERROR_MESSAGE
+
+async def aanswer_question(question: str, candidate_ids=None) -> str:
+    """Async answer_question used by the FastAPI /ask endpoint"""
+    if not settings.ANSWER_CACHE_ENABLED:
+        return await _aroute_question(question, None, candidate_ids)
+
+    store = get_store_service()
+    version = store.version
+    scope = answer_cache.scope_key(candidate_ids)
+    cached = answer_cache.get_exact(question, version, scope)
+    if cached is not None:
+        logger.info("Answer cache hit (exact)")
+        return cached
+
+    query_vector = await run_query(store.embed_query, question)
+    cached = answer_cache.get_semantic(question, query_vector, version, scope)
+    if cached is not None:
+        logger.info("Answer cache hit (semantic)")
+        return cached
+
+    answer = await _aroute_question(question, query_vector, candidate_ids)
+    if _is_cacheable(answer):
+        answer_cache.put(question, version, answer, query_vector, scope)
+    return answer
+
+async def _aroute_question(question: str, query_vector=None, candidate_ids=None) -> str:
+    try:
+        if get_store_service().is_empty():
+            logger.info("No documents - using general knowledge LLM")
+            return await allm_general_knowledge(question)
+
+        if candidate_ids:
+            logger.info(f"Using RAG scoped to {len(candidate_ids)} candidates")
+            return await arag_answer(question, query_vector, candidate_ids)
+        
+        logger.info("Documents available - deciding routing")
+        intent = await adetermine_intent(question, query_vector)
+        
+        if intent == "cv_related":
+            logger.info("Using RAG for CV-related question")
+            return await arag_answer(question, query_vector)
+        else:
+            logger.info("Using general knowledge LLM")
+            return await allm_general_knowledge(question)
+
+    except Exception as e:
+        logger.error(f"Error in answer_question: {e}", exc_info=True)
+        return GENERAL_ERROR_MESSAGE
+
+# ---- Streaming (SSE) ---------------------------------------------------
+# Events are dicts: {"event": "meta" | "token" | "replace" | "done", ...}.
+# "replace" supersedes everything streamed so far (smart fallback / errors).
+
+async def astream_general_knowledge(question: str):
+    cleaner = _StreamCleaner()
+    try:
+        async for chunk in llm_client.astream(_general_knowledge_prompt(question), *GENERAL_KNOWLEDGE_LLM):
+            text = cleaner.feed(chunk)
+            if text:
+                yield {"event": "token", "text": text}
+    except Exception as e:
+        logger.error(f"General knowledge LLM stream failed: {e}")
+        yield {"event": "replace", "text": GENERAL_ERROR_MESSAGE}
+
+async def astream_rag_answer(question: str, query_vector=None, candidate_ids=None):
+    """
+    Stream the RAG answer. The first few characters are held back so a too-short
+    answer can still be swapped for generate_smart_fallback before anything is sent;
+    a truncated answer detected at the end is replaced with a "replace" event.
+    """
+    try:
+        _ensure_google_api_key()
+
+        retrieved_docs = await run_query(_retrieve, question, query_vector, 5, candidate_ids)
+        if not retrieved_docs:
+            yield {"event": "token", "text": "No relevant information found in the uploaded CVs."}
+            return
+
+        final_prompt, candidate_names = _build_rag_prompt(retrieved_docs, question)
+        yield {"event": "meta", "candidates": candidate_names}
+
+        cleaner = _StreamCleaner()
+        parts, pending, flushed = [], "", False
+        async for chunk in llm_client.astream(final_prompt, *RAG_LLM):
+            text = cleaner.feed(chunk)
+            if not text:
+                continue
+            parts.append(text)
+            if flushed:
+                yield {"event": "token", "text": text}
+                continue
+            pending += text
+            if len(pending.strip()) >= 20:
+                yield {"event": "token", "text": pending}
+                flushed = True
+
+        answer = "".join(parts).strip()
+        if _needs_fallback(answer):
+            fallback = generate_smart_fallback(candidate_names, retrieved_docs, question)
+            yield {"event": "replace" if flushed else "token", "text": fallback}
+        elif not flushed and pending:
+            yield {"event": "token", "text": pending}
+
+    except Exception as e:
+        logger.error(f"RAG stream failed: {e}")
+        yield {"event": "replace", "text": RAG_ERROR_MESSAGE}
+
+async def astream_answer(question: str, candidate_ids=None):
+    """Streaming counterpart of aanswer_question: cache, routing, then tokens as they arrive"""
+    store = get_store_service()
+    version = store.version
+    scope = answer_cache.scope_key(candidate_ids)
+    query_vector = None
+
+    if settings.ANSWER_CACHE_ENABLED:
+        cached = answer_cache.get_exact(question, version, scope)
+        if cached is None:
+            query_vector = await run_query(store.embed_query, question)
+            cached = answer_cache.get_semantic(question, query_vector, version, scope)
+        if cached is not None:
+            logger.info("Answer cache hit (stream)")
+            yield {"event": "meta", "route": "cache"}
+            yield {"event": "token", "text": cached}
+            yield {"event": "done", "answer": cached}
+            return
+
+    answer = ""
+    try:
+        if store.is_empty():
+            logger.info("No documents - streaming general knowledge LLM")
+            route = "general_knowledge"
+        elif candidate_ids:
+            route = "cv_related"
+        else:
+            route = await adetermine_intent(question, query_vector)
+        yield {"event": "meta", "route": route}
+
+        if route == "cv_related":
+            events = astream_rag_answer(question, query_vector, candidate_ids)
+        else:
+            events = astream_general_knowledge(question)
+        async for event in events:
+            if event["event"] == "token":
+                answer += event["text"]
+            elif event["event"] == "replace":
+                answer = event["text"]
+            yield event
+
+    except Exception as e:
+        logger.error(f"Error in astream_answer: {e}", exc_info=True)
+        answer = GENERAL_ERROR_MESSAGE
+        yield {"event": "replace", "text": answer}
+
+    answer = answer.strip()
+    if settings.ANSWER_CACHE_ENABLED and _is_cacheable(answer):
+        answer_cache.put(question, version, answer, query_vector, scope)
+    yield {"event": "done", "answer": answer}
 
 # For backward compatibility
 def answer_question_original(question: str):
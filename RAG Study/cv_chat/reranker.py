@@ -0,0 +1,82 @@
+# reranker.py - optional cross-encoder reranking of retrieved chunks
+#
+# Retrieval over-fetches RERANK_CANDIDATES chunks; a small CPU cross-encoder
+# scores (question, chunk) pairs in batches, in retrieval order, and only the
+# top RERANK_TOP_K scoring at least RERANK_MIN_SCORE go into the Gemini prompt.
+#
+# RERANK_TIME_BUDGET_MS caps the stage: a batch is only started if the batches
+# so far say it will finish in time. Chunks left unscored keep their retrieval
+# order behind the scored ones, so running out of budget degrades to plain retrieval.
+import threading
+import time
+from typing import List
+
+from langchain.schema import Document
+
+from config import settings
+from logger import logger
+
+
+class CrossEncoderReranker:
+    """sentence-transformers CrossEncoder; scores are sigmoid probabilities in [0, 1]"""
+
+    def __init__(self, model_name: str = settings.RERANK_MODEL, batch_size: int = settings.RERANK_BATCH_SIZE,
+                 max_length: int = settings.RERANK_MAX_LENGTH):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+    def score(self, question: str, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        scores = self.model.predict([(question, text) for text in texts], batch_size=len(texts),
+                                    show_progress_bar=False, convert_to_numpy=True)
+        return [float(score) for score in scores]
+
+    def rerank(self, question: str, docs: List[Document], k: int = settings.RERANK_TOP_K,
+               min_score: float = settings.RERANK_MIN_SCORE,
+               time_budget_ms: float = settings.RERANK_TIME_BUDGET_MS) -> List[Document]:
+        """Best k of docs above min_score, within the time budget"""
+        if not docs:
+            return []
+        start = time.perf_counter()
+        budget = time_budget_ms / 1000
+        scored = []
+        batch_seconds = 0.0
+        for offset in range(0, len(docs), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if offset and elapsed + batch_seconds > budget:
+                break
+            batch = docs[offset:offset + self.batch_size]
+            batch_start = time.perf_counter()
+            scores = self.score(question, [doc.page_content for doc in batch])
+            batch_seconds = max(batch_seconds, time.perf_counter() - batch_start)
+            scored.extend(zip(scores, range(offset, offset + len(batch))))
+
+        ranked = sorted(scored, key=lambda item: item[0], reverse=True)
+        kept = [docs[position] for score, position in ranked if score >= min_score][:k]
+        if len(kept) < settings.RERANK_MIN_KEEP:
+            # Never answer from nothing just because the reranker was unsure
+            kept = [docs[position] for _, position in ranked[:settings.RERANK_MIN_KEEP]]
+        unscored = docs[len(scored):]
+        if len(kept) < k and unscored:
+            kept.extend(unscored[:k - len(kept)])
+
+        logger.info(f"Reranked {len(scored)}/{len(docs)} chunks in {(time.perf_counter() - start) * 1000:.0f}ms, "
+                    f"kept {len(kept)}")
+        return kept
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """One loaded cross-encoder per process"""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
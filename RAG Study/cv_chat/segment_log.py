@@ -0,0 +1,209 @@
+# segment_log.py - append-only persistence for a LangChain FAISS store
+import os
+import json
+import pickle
+import shutil
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from logger import logger
+
+SNAPSHOT_DIR = "snapshot"
+SEGMENTS_DIR = "segments"
+SNAPSHOT_META = "snapshot.json"
+
+
+class SegmentLog:
+    """
+    Append-only FAISS persistence.
+
+    Layout of faiss_dir:
+        snapshot/index.faiss, snapshot/index.pkl  - compacted base (LangChain save_local format)
+        snapshot/snapshot.json                    - {"last_segment": N}
+        segments/000001.seg ...                   - one pickled write each, replayed on load
+
+    A segment either adds documents (with their vectors) or deletes documents by
+    docstore id. Deleted documents leave their FAISS rows behind until the owner
+    removes them physically (see VectorStoreService.compact).
+
+    A legacy faiss_dir/index.faiss + index.pkl (plain save_local) is read as the
+    base snapshot until the first compaction replaces it.
+    """
+
+    def __init__(self, faiss_dir: str):
+        self.faiss_dir = faiss_dir
+        self.snapshot_dir = os.path.join(faiss_dir, SNAPSHOT_DIR)
+        self.segments_dir = os.path.join(faiss_dir, SEGMENTS_DIR)
+        os.makedirs(self.segments_dir, exist_ok=True)
+        # Never reuse a sequence number the snapshot already covers
+        self.last_seq = max(self.list_segments() + [self._snapshot_last_segment(self._base_dir())])
+
+    # ---- segments -------------------------------------------------------
+
+    def list_segments(self) -> List[int]:
+        if not os.path.isdir(self.segments_dir):
+            return []
+        seqs = []
+        for fname in os.listdir(self.segments_dir):
+            if fname.endswith(".seg"):
+                try:
+                    seqs.append(int(fname[:-4]))
+                except ValueError:
+                    continue
+        return sorted(seqs)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.segments_dir, f"{seq:06d}.seg")
+
+    def append(self, record: dict) -> int:
+        """Write one segment file. Cost depends only on the record, not on the index size."""
+        seq = self.last_seq + 1
+        path = self._segment_path(seq)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.last_seq = seq
+        return seq
+
+    @staticmethod
+    def add_record(texts: List[str], vectors, metadatas: List[dict], ids: List[str]) -> dict:
+        return {
+            "op": "add",
+            "texts": list(texts),
+            "vectors": np.asarray(vectors, dtype=np.float32),
+            "metadatas": list(metadatas),
+            "ids": list(ids),
+        }
+
+    @staticmethod
+    def delete_record(ids: List[str]) -> dict:
+        return {"op": "delete", "ids": list(ids)}
+
+    def pending_segments(self) -> List[int]:
+        """Segments written after the current snapshot"""
+        base_seq = self._snapshot_last_segment(self._base_dir())
+        return [seq for seq in self.list_segments() if seq > base_seq]
+
+    # ---- load / replay --------------------------------------------------
+
+    @staticmethod
+    def _snapshot_last_segment(base_dir: Optional[str]) -> int:
+        if not base_dir:
+            return 0
+        meta_path = os.path.join(base_dir, SNAPSHOT_META)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                return json.load(f).get("last_segment", 0)
+        return 0
+
+    def _base_dir(self) -> Optional[str]:
+        # A crash between the two renames in write_snapshot leaves only snapshot.old
+        for candidate in (self.snapshot_dir, self.snapshot_dir + ".old", self.faiss_dir):
+            if os.path.exists(os.path.join(candidate, "index.faiss")):
+                return candidate
+        return None
+
+    def load(self, embedding) -> Optional[FAISS]:
+        """Load the base snapshot and replay every newer segment"""
+        store = None
+        base_dir = self._base_dir()
+        if base_dir:
+            store = FAISS.load_local(base_dir, embedding, allow_dangerous_deserialization=True)
+
+        base_seq = self._snapshot_last_segment(base_dir)
+        known_ids = set(store.index_to_docstore_id.values()) if store else set()
+        replayed = 0
+
+        for seq in self.list_segments():
+            if seq <= base_seq:
+                continue
+            try:
+                with open(self._segment_path(seq), "rb") as f:
+                    record = pickle.load(f)
+            except Exception as e:
+                logger.error(f"Skipping unreadable FAISS segment {seq}: {e}")
+                continue
+            store = self.apply(store, record, embedding, known_ids)
+            replayed += 1
+
+        if replayed:
+            logger.info(f"Replayed {replayed} FAISS segments from {self.segments_dir}")
+        return store
+
+    @staticmethod
+    def apply(store: Optional[FAISS], record: dict, embedding, known_ids: set) -> Optional[FAISS]:
+        """Apply one segment record. Ids already present are skipped so replay is idempotent."""
+        if record.get("op") == "delete":
+            if store is not None:
+                for doc_id in record["ids"]:
+                    store.docstore._dict.pop(doc_id, None)
+            return store
+        if record.get("op") != "add":
+            return store
+
+        rows = [i for i, doc_id in enumerate(record["ids"]) if doc_id not in known_ids]
+        if not rows:
+            return store
+
+        text_embeddings = [(record["texts"][i], record["vectors"][i]) for i in rows]
+        metadatas = [record["metadatas"][i] for i in rows]
+        ids = [record["ids"][i] for i in rows]
+
+        if store is None:
+            store = FAISS.from_embeddings(text_embeddings, embedding, metadatas=metadatas, ids=ids)
+        else:
+            store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        known_ids.update(ids)
+        return store
+
+    # ---- compaction -----------------------------------------------------
+
+    @staticmethod
+    def copy_store(store: FAISS) -> FAISS:
+        """Point-in-time copy of a store, cheap enough to take under the writer lock"""
+        return FAISS(
+            store.embedding_function,
+            faiss.clone_index(store.index),
+            InMemoryDocstore(dict(store.docstore._dict)),
+            dict(store.index_to_docstore_id),
+        )
+
+    def write_snapshot(self, store: FAISS, last_segment: int):
+        """
+        Persist store as the new base and drop the segments it covers.
+        store must contain every segment up to and including last_segment.
+        """
+        tmp_dir = self.snapshot_dir + ".tmp"
+        old_dir = self.snapshot_dir + ".old"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+        store.save_local(tmp_dir)
+        with open(os.path.join(tmp_dir, SNAPSHOT_META), "w") as f:
+            json.dump({"last_segment": last_segment, "ntotal": store.index.ntotal}, f)
+
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+        if os.path.exists(self.snapshot_dir):
+            os.replace(self.snapshot_dir, old_dir)
+        os.replace(tmp_dir, self.snapshot_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        # The legacy single-file layout is superseded by the first snapshot
+        for legacy in ("index.faiss", "index.pkl"):
+            legacy_path = os.path.join(self.faiss_dir, legacy)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+
+        for seq in self.list_segments():
+            if seq <= last_segment:
+                os.remove(self._segment_path(seq))
+
+        logger.info(f"Compacted FAISS segments up to {last_segment} ({store.index.ntotal} vectors)")
@@ -0,0 +1,224 @@
+# sparse_index.py - BM25 keyword index kept alongside the FAISS store
+#
+# Row i is FAISS row i (same docstore mapping), so keyword hits resolve to the
+# same Documents as vector hits. Layout under <faiss_dir>/bm25/:
+#   snapshot.pkl   postings, document lengths and docstore ids for rows [0, rows)
+#   log.jsonl      one {"row": r, "id": docstore id, "tf": {term: count}} per document added since
+#   log.old.jsonl  the previous log while a snapshot is being written
+#
+# Only term counts are persisted, so startup replays them without re-tokenizing;
+# rows missing after a crash are tokenized from the docstore (see VectorStoreService).
+# The recorded docstore ids let the owner find rows that no longer line up with
+# FAISS (e.g. a crash while deleted rows were being purged) and re-tokenize them.
+import json
+import math
+import os
+import pickle
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import settings
+from logger import logger
+
+BM25_DIR = "bm25"
+SNAPSHOT_FILE = "snapshot.pkl"
+LOG_FILE = "log.jsonl"
+OLD_LOG_FILE = "log.old.jsonl"
+
+# Keeps skill tokens intact: c++, c#, node.js, asp.net, ci/cd
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./][a-z0-9+#]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he her his i in is it its me my of on or our she that the "
+    "their them they this to was we were what which who whom will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    return dict(Counter(tokenize(text)))
+
+
+class BM25Index:
+    """Okapi BM25 over term counts, updated one document at a time"""
+
+    def __init__(self, path: str, k1: float = settings.BM25_K1, b: float = settings.BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: List[int] = []
+        self._ids: List[Optional[str]] = []
+        self._total_length = 0
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # ---- updates --------------------------------------------------------
+
+    def _index(self, row: int, counts: Dict[str, int], doc_id: Optional[str] = None):
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[row] = count
+        length = sum(counts.values())
+        self._lengths.append(length)
+        self._ids.append(doc_id)
+        self._total_length += length
+
+    def add(self, first_row: int, counts: Sequence[Dict[str, int]], ids: Optional[Sequence[str]] = None):
+        """Index documents at rows first_row.. and append them to the log"""
+        if first_row != len(self._lengths):
+            raise ValueError(f"BM25 index holds {len(self._lengths)} rows, cannot add at row {first_row}")
+        lines = []
+        for offset, doc_counts in enumerate(counts):
+            doc_id = ids[offset] if ids is not None else None
+            self._index(first_row + offset, doc_counts, doc_id)
+            lines.append(json.dumps({"row": first_row + offset, "id": doc_id, "tf": doc_counts}))
+        if lines:
+            # No fsync: a lost tail is re-tokenized from the docstore on the next load
+            with open(os.path.join(self.path, LOG_FILE), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def remove_rows(self, rows: Iterable[int]):
+        """
+        Drop the given rows and renumber the rest in order, as faiss remove_ids does.
+        The log still uses the old numbers: snapshot right after (begin_snapshot).
+        """
+        removed = set(rows)
+        if not removed:
+            return
+        new_rows: Dict[int, int] = {}
+        lengths, ids = [], []
+        for row, (length, doc_id) in enumerate(zip(self._lengths, self._ids)):
+            if row not in removed:
+                new_rows[row] = len(lengths)
+                lengths.append(length)
+                ids.append(doc_id)
+        postings = {}
+        for term, term_postings in self._postings.items():
+            kept = {new_rows[row]: count for row, count in term_postings.items() if row in new_rows}
+            if kept:
+                postings[term] = kept
+        self._postings, self._lengths, self._ids = postings, lengths, ids
+        self._total_length = sum(lengths)
+
+    def align(self, doc_ids: Sequence[str]) -> int:
+        """
+        Keep rows up to the first one whose recorded docstore id differs from
+        doc_ids (FAISS row order) and drop the rest, persisting the result.
+        Rows logged before ids were recorded are trusted. Returns the rows kept.
+        """
+        kept = min(len(self._lengths), len(doc_ids))
+        for row in range(kept):
+            if self._ids[row] is not None and self._ids[row] != doc_ids[row]:
+                kept = row
+                break
+        if kept < len(self._lengths):
+            self.remove_rows(range(kept, len(self._lengths)))
+            self.write_snapshot(self.begin_snapshot())
+        return kept
+
+    # ---- search ---------------------------------------------------------
+
+    def search(self, query: str, k: int, rows: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k (row, score), optionally restricted to the given rows"""
+        n = len(self._lengths)
+        if not n:
+            return []
+        allowed = set(rows) if rows is not None else None
+        avg_length = self._total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, count in postings.items():
+                if allowed is not None and row not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[row] / avg_length)
+                scores[row] = scores.get(row, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    # ---- persistence ----------------------------------------------------
+
+    def _load(self):
+        snapshot_path = os.path.join(self.path, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, "rb") as f:
+                    state = pickle.load(f)
+                self._postings, self._lengths = state["postings"], state["lengths"]
+                self._ids = state.get("ids") or [None] * len(self._lengths)
+                self._total_length = sum(self._lengths)
+            except Exception as e:
+                logger.error(f"Unreadable BM25 snapshot, rebuilding from the docstore: {e}")
+                self._postings, self._lengths, self._ids, self._total_length = {}, [], [], 0
+
+        replayed = 0
+        for name in (OLD_LOG_FILE, LOG_FILE):
+            log_path = os.path.join(self.path, name)
+            if not os.path.exists(log_path):
+                continue
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line
+                    if entry["row"] < len(self._lengths):
+                        continue  # already in the snapshot
+                    if entry["row"] > len(self._lengths):
+                        break  # gap; the caller re-tokenizes from here
+                    self._index(entry["row"], entry["tf"], entry.get("id"))
+                    replayed += 1
+        if self._lengths:
+            logger.info(f"Loaded BM25 index with {len(self._lengths)} rows ({replayed} replayed from the log)")
+
+    def begin_snapshot(self) -> bytes:
+        """
+        Serialize the current state and rotate the log. Call under the store lock,
+        then write_snapshot() outside it.
+        """
+        state = pickle.dumps({"postings": self._postings, "lengths": self._lengths, "ids": self._ids},
+                             protocol=pickle.HIGHEST_PROTOCOL)
+        log_path = os.path.join(self.path, LOG_FILE)
+        old_path = os.path.join(self.path, OLD_LOG_FILE)
+        if os.path.exists(log_path):
+            if os.path.exists(old_path):
+                # A previous snapshot never finished; keep both logs' entries
+                with open(old_path, "a", encoding="utf-8") as old, open(log_path, "r", encoding="utf-8") as new:
+                    old.write(new.read())
+                os.remove(log_path)
+            else:
+                os.replace(log_path, old_path)
+        return state
+
+    def write_snapshot(self, state: bytes):
+        snapshot_path = os.path.join(self.path, SNAPSHOT_FILE)
+        tmp_path = snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(state)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+        old_path = os.path.join(self.path, OLD_LOG_FILE)
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence], k: int, key=id, rrf_k: int = settings.RRF_K) -> list:
+    """Merge ranked lists: each item scores sum(1 / (rrf_k + rank)) over the lists it appears in"""
+    scores: Dict[object, float] = {}
+    items: Dict[object, object] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            item_key = key(item)
+            items.setdefault(item_key, item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (rrf_k + rank)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [items[item_key] for item_key in ordered[:k]]
@@ -0,0 +1,479 @@
+# store_service.py - resident embedding model + FAISS index
+import fcntl
+import os
+import shutil
+import threading
+import uuid
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain.schema import Document
+
+from config import settings
+from logger import logger
+from segment_log import SegmentLog
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+from ann_index import build_index, drop_ann, index_params, load_ann, save_ann, set_search_params
+from sparse_index import BM25_DIR, BM25Index, term_counts
+
+
+class IndexLockedError(RuntimeError):
+    """Another process already serves (and writes to) this FAISS directory"""
+
+
+def lock_index_dir(faiss_dir: str):
+    """
+    Take an exclusive, non-blocking flock on <faiss_dir>.lock and return the open
+    file, which holds the lock until it is closed or the process exits. The lock
+    file sits next to the directory so reset() can delete the directory safely.
+    """
+    lock_path = os.path.abspath(faiss_dir).rstrip(os.sep) + ".lock"
+    handle = open(lock_path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        raise IndexLockedError(f"{faiss_dir} is in use by another process (lock {lock_path}); "
+                               f"stop it or upload through the running server's /upload-batch")
+    return handle
+
+
+class VectorStoreService:
+    """
+    Process-wide holder for the embedding model and the FAISS index.
+
+    The model is loaded once and the index is kept in memory, so /ask and
+    /upload-pdf never hit the disk for reads. Writes embed outside the lock,
+    append one segment file (constant cost) and apply the same record to the
+    live index. A background thread folds segments into the snapshot once
+    FAISS_COMPACT_SEGMENTS have piled up.
+
+    With FAISS_INDEX_TYPE other than "flat", searches go to an ANN index trained
+    (in the background) on the flat index's vectors once there are
+    FAISS_ANN_MIN_VECTORS of them; new vectors are added to both.
+
+    An inverted index candidate_id -> FAISS rows backs candidate-scoped
+    searches, which score only that candidate subset.
+
+    A BM25 keyword index over the same rows is updated with every add and
+    persisted incrementally, for keyword_search().
+
+    delete_candidate / replace_candidate touch only that candidate's rows: its
+    documents leave the docstore (a delete segment makes that durable) and its
+    rows become tombstones that searches over-fetch past. Compaction removes
+    tombstoned rows from the flat index (faiss remove_ids) and the BM25 index,
+    renumbering the rest; the ANN index is then retrained.
+
+    The service is the only writer of its directory: segment numbers, the
+    embedding cache and candidates.db all assume one process. It holds an
+    exclusive lock on <faiss_dir>.lock for its lifetime, so a second process
+    (the batch CLI next to a running server, a second uvicorn worker) fails
+    with IndexLockedError instead of overwriting segments.
+    """
+
+    def __init__(self, faiss_dir: str = settings.FAISS_DIR, embedding_model_name: str = settings.EMBEDDING_MODEL):
+        self.faiss_dir = faiss_dir
+        self._dir_lock = lock_index_dir(faiss_dir)
+        self.embedding_model_name = embedding_model_name
+        self.embedding_model = get_embedding_engine(embedding_model_name)
+        # Indexing goes through the content-addressed cache; queries use the model directly
+        self.document_embeddings = get_cached_embeddings(self.embedding_model)
+        self.version = 0
+
+        self._store: Optional[FAISS] = None
+        self._log: Optional[SegmentLog] = None
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+
+        self.index_type = settings.FAISS_INDEX_TYPE
+        self._ann: Optional[faiss.Index] = None
+        self._ann_trained_on = 0
+        self._ann_lock = threading.Lock()
+
+        self._candidate_rows: Dict[str, List[int]] = {}
+        self._deleted_rows = set()
+        self._sparse: Optional[BM25Index] = None
+
+        self.load()
+
+    def load(self):
+        """(Re)load the snapshot and replay pending segments into memory"""
+        os.makedirs(self.faiss_dir, exist_ok=True)
+
+        with self._lock:
+            self._log = SegmentLog(self.faiss_dir)
+            self._store = self._log.load(self.embedding_model)
+            if self._store is not None:
+                logger.info(f"Loaded FAISS index with {self._store.index.ntotal} vectors from {self.faiss_dir}")
+            else:
+                logger.info(f"No FAISS index found in {self.faiss_dir} - starting empty")
+            self._ann, self._ann_trained_on = None, 0
+            self._load_ann()
+            self._rebuild_candidate_rows()
+            self._load_sparse()
+            self.version += 1
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._store is None or self._store.index.ntotal == 0
+
+    def count(self) -> int:
+        with self._lock:
+            return 0 if self._store is None else self._store.index.ntotal - len(self._deleted_rows)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding_model.embed_query(text)
+
+    def similarity_search(self, query: str, k: int = settings.SEARCH_K) -> List[Document]:
+        """Embed the query outside the lock, then search the live index"""
+        if self.is_empty():
+            return []
+        query_vector = self.embed_query(query)
+        return self.similarity_search_by_vector(query_vector, k=k)
+
+    def similarity_search_by_vector(self, query_vector: List[float], k: int = settings.SEARCH_K,
+                                    candidate_ids: Optional[Iterable[str]] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(query_vector, k, candidate_ids)]
+
+    def similarity_search_with_score_by_vector(self, query_vector: List[float], k: int = settings.SEARCH_K,
+                                               candidate_ids: Optional[Iterable[str]] = None
+                                               ) -> List[Tuple[Document, float]]:
+        """(doc, squared L2 distance) pairs, nearest first"""
+        query = np.asarray([query_vector], dtype=np.float32)
+        with self._lock:
+            if self._store is None:
+                return []
+            if candidate_ids is not None:
+                positions, distances = self._scoped_search(query[0], k, candidate_ids)
+            else:
+                # Tombstoned rows can take up to len(_deleted_rows) of the hits
+                distances, positions = (self._ann or self._store.index).search(query, k + len(self._deleted_rows))
+                positions, distances = positions[0], distances[0]
+            return [(doc, float(distance)) for doc, distance in zip(self._docs_at(positions, keep_missing=True), distances)
+                    if doc is not None][:k]
+
+    def _scoped_search(self, query_vector: np.ndarray, k: int, candidate_ids: Iterable[str]):
+        """Exact search over the given candidates' rows only; cost grows with their chunk count, not the index"""
+        rows = sorted({row for candidate_id in candidate_ids for row in self._candidate_rows.get(candidate_id, ())})
+        if not rows:
+            return [], []
+        vectors = np.vstack([self._store.index.reconstruct(row) for row in rows])
+        distances = np.sum((vectors - query_vector) ** 2, axis=1)
+        best = np.argsort(distances)[:k]
+        return [rows[i] for i in best], distances[best]
+
+    def golden_chunks(self, candidate_ids: Iterable[str]) -> List[Document]:
+        """The whole-CV chunk of each candidate, in the given order (sections are only search keys)"""
+        docs = []
+        with self._lock:
+            if self._store is None:
+                return []
+            for candidate_id in candidate_ids:
+                candidate_docs = self._docs_at(self._candidate_rows.get(candidate_id, ()))
+                golden = [doc for doc in candidate_docs if doc.metadata.get("document_type") != "cv_section"]
+                if golden or candidate_docs:
+                    docs.append((golden or candidate_docs)[0])
+        return docs
+
+    def candidate_documents(self, candidate_id: str) -> List[Document]:
+        with self._lock:
+            if self._store is None:
+                return []
+            return self._docs_at(self._candidate_rows.get(candidate_id, ()))
+
+    def candidate_chunk_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {candidate_id: len(rows) for candidate_id, rows in self._candidate_rows.items()}
+
+    def _rebuild_candidate_rows(self):
+        """Candidate inverted index and tombstones (rows whose document was deleted)"""
+        self._candidate_rows = {}
+        self._deleted_rows = set()
+        if self._store is None:
+            return
+        for row, doc_id in self._store.index_to_docstore_id.items():
+            doc = self._store.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                self._index_candidate_row(doc.metadata, row)
+            else:
+                self._deleted_rows.add(row)
+
+    def _index_candidate_row(self, metadata: dict, row: int):
+        candidate_id = metadata.get("candidate_id")
+        if candidate_id:
+            self._candidate_rows.setdefault(candidate_id, []).append(row)
+
+    def keyword_search(self, query: str, k: int = settings.SEARCH_K,
+                       candidate_ids: Optional[Iterable[str]] = None) -> List[Document]:
+        """BM25 search over chunk text, optionally scoped like similarity_search_by_vector"""
+        with self._lock:
+            if self._store is None or self._sparse is None:
+                return []
+            rows = None
+            if candidate_ids is not None:
+                rows = [row for candidate_id in candidate_ids for row in self._candidate_rows.get(candidate_id, ())]
+                if not rows:
+                    return []
+            hits = self._sparse.search(query, k + (len(self._deleted_rows) if rows is None else 0), rows)
+            return self._docs_at([row for row, _ in hits])[:k]
+
+    def _load_sparse(self):
+        """Load the persisted BM25 index and tokenize only the rows it is missing"""
+        self._sparse = BM25Index(os.path.join(self.faiss_dir, BM25_DIR))
+        total = 0 if self._store is None else self._store.index.ntotal
+        loaded = len(self._sparse)
+        doc_ids = [self._store.index_to_docstore_id[row] for row in range(total)]
+        if self._sparse.align(doc_ids) < loaded:
+            logger.warning(f"BM25 rows from {len(self._sparse)} on no longer match FAISS - re-tokenizing them")
+        missing = range(len(self._sparse), total)
+        if missing:
+            docs = [self._store.docstore.search(self._store.index_to_docstore_id[row]) for row in missing]
+            self._sparse.add(missing.start, [term_counts(doc.page_content if isinstance(doc, Document) else "")
+                                             for doc in docs], doc_ids[missing.start:])
+            logger.info(f"Tokenized {len(missing)} rows missing from the BM25 index")
+
+    def _docs_at(self, positions, keep_missing: bool = False) -> List[Optional[Document]]:
+        """Documents at FAISS rows; with keep_missing, None stands in for -1 / unknown rows so positions stay aligned"""
+        docs = []
+        for position in positions:
+            doc = None
+            if position != -1:
+                doc = self._store.docstore.search(self._store.index_to_docstore_id[int(position)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+            elif keep_missing:
+                docs.append(None)
+        return docs
+
+    def add_documents(self, docs: List[Document]) -> int:
+        """Embed docs and swap them into the live index. Returns the new vector count."""
+        if not docs:
+            return self.count()
+
+        record, counts = self._embed_documents(docs)
+        with self._lock:
+            seq = self._append_locked(record, counts)
+            self.version += 1
+            total = self._store.index.ntotal
+        logger.info(f"Appended {len(docs)} vectors to FAISS as segment {seq}")
+
+        self._maybe_compact()
+        self._maybe_build_ann(total)
+        return self.count()
+
+    def delete_candidate(self, candidate_id: str) -> int:
+        """Remove every vector of one candidate. Cost grows with its vector count. Returns how many were removed."""
+        with self._lock:
+            removed = self._delete_candidate_locked(candidate_id)
+            if removed:
+                self.version += 1
+        if removed:
+            logger.info(f"Deleted {removed} vectors of candidate {candidate_id}")
+            self._maybe_compact()
+        return removed
+
+    def replace_candidate(self, candidate_id: str, docs: List[Document]) -> Tuple[int, int]:
+        """
+        Swap one candidate's vectors for docs in a single step: searches see either
+        the old or the new version, never both or neither. Returns (removed, added).
+        """
+        record, counts = self._embed_documents(docs) if docs else (None, [])
+        with self._lock:
+            removed = self._delete_candidate_locked(candidate_id)
+            if record is not None:
+                self._append_locked(record, counts)
+            self.version += 1
+            total = self._store.index.ntotal if self._store is not None else 0
+        logger.info(f"Replaced candidate {candidate_id}: {removed} vectors removed, {len(docs)} added")
+
+        self._maybe_compact()
+        self._maybe_build_ann(total)
+        return removed, len(docs)
+
+    def _embed_documents(self, docs: List[Document]):
+        """(add segment record, BM25 term counts), computed outside the lock"""
+        texts = [doc.page_content for doc in docs]
+        ids = [str(uuid.uuid4()) for _ in docs]
+        vectors = self.document_embeddings.embed(texts)
+        return SegmentLog.add_record(texts, vectors, [doc.metadata for doc in docs], ids), \
+            [term_counts(text) for text in texts]
+
+    def _append_locked(self, record: dict, counts: List[Dict[str, int]]) -> int:
+        # Write-ahead: the segment is on disk before the live index changes
+        seq = self._log.append(record)
+        first_row = self._store.index.ntotal if self._store is not None else 0
+        self._store = SegmentLog.apply(self._store, record, self.embedding_model, set())
+        for offset, metadata in enumerate(record["metadatas"]):
+            self._index_candidate_row(metadata, first_row + offset)
+        if self._ann is not None:
+            self._ann.add(record["vectors"])
+        self._sparse.add(first_row, counts, record["ids"])
+        return seq
+
+    def _delete_candidate_locked(self, candidate_id: str) -> int:
+        rows = self._candidate_rows.get(candidate_id)
+        if self._store is None or not rows:
+            return 0
+        ids = [self._store.index_to_docstore_id[row] for row in rows]
+        self._log.append(SegmentLog.delete_record(ids))
+        SegmentLog.apply(self._store, SegmentLog.delete_record(ids), self.embedding_model, set())
+        del self._candidate_rows[candidate_id]
+        self._deleted_rows.update(rows)
+        return len(rows)
+
+    # ---- ANN search index -------------------------------------------------
+
+    def _load_ann(self):
+        """Reuse the persisted ANN index (plus vectors added since), or train one in the background"""
+        if self.index_type == "flat" or self._store is None:
+            return
+        loaded = load_ann(self.faiss_dir, self.index_type, index_params(self.index_type))
+        total = self._store.index.ntotal
+        if loaded is None or loaded[0].ntotal > total:
+            self._maybe_build_ann(total)
+            return
+        index, trained_on = loaded
+        if total > index.ntotal:
+            index.add(self._store.index.reconstruct_n(index.ntotal, total - index.ntotal))
+        set_search_params(index)
+        self._ann, self._ann_trained_on = index, trained_on
+        logger.info(f"Loaded {self.index_type} search index ({index.ntotal} vectors, trained on {trained_on})")
+
+    def _maybe_build_ann(self, total: int):
+        if self.index_type == "flat" or total < settings.FAISS_ANN_MIN_VECTORS:
+            return
+        if self._ann is not None and total < self._ann_trained_on * settings.FAISS_ANN_RETRAIN_GROWTH:
+            return
+        if self._ann_lock.locked():
+            return
+        threading.Thread(target=self.build_ann, name="faiss-ann-build", daemon=True).start()
+
+    def build_ann(self):
+        """Train the ANN index on every stored vector and swap it in. Searches use the old index meanwhile."""
+        if not self._ann_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                if self._store is None:
+                    return
+                vectors = self._store.index.reconstruct_n(0, self._store.index.ntotal)
+            params = index_params(self.index_type)
+            index = build_index(vectors, self.index_type, params)
+            if index is None:
+                return
+
+            with self._lock:
+                if self._store is None:
+                    return
+                # Catch up on vectors added while training
+                total = self._store.index.ntotal
+                if total > index.ntotal:
+                    index.add(self._store.index.reconstruct_n(index.ntotal, total - index.ntotal))
+                set_search_params(index)
+                self._ann, self._ann_trained_on = index, len(vectors)
+                persisted = faiss.clone_index(index)
+            save_ann(self.faiss_dir, persisted, self.index_type, params, len(vectors))
+            logger.info(f"Built {self.index_type} search index over {len(vectors)} vectors")
+        except Exception as e:
+            logger.error(f"ANN index build failed, staying on the previous index: {e}", exc_info=True)
+        finally:
+            self._ann_lock.release()
+
+    def _maybe_compact(self):
+        with self._lock:
+            total = self._store.index.ntotal if self._store is not None else 0
+            purge = len(self._deleted_rows) > settings.FAISS_PURGE_DELETED_FRACTION * total
+        if not purge and len(self._log.pending_segments()) < settings.FAISS_COMPACT_SEGMENTS:
+            return
+        if self._compact_lock.locked():
+            return
+        threading.Thread(target=self.compact, name="faiss-compaction", daemon=True).start()
+
+    def compact(self):
+        """Fold all pending segments into a fresh snapshot, dropping deleted candidates' rows"""
+        if not self._compact_lock.acquire(blocking=False):
+            return
+        purged = False
+        try:
+            # Purging renumbers rows, so wait for a running ANN build rather than race its swap-in
+            with (self._ann_lock if self._deleted_rows else nullcontext()) as ann_locked, self._lock:
+                if self._store is None:
+                    return
+                if ann_locked and self._deleted_rows:
+                    self._purge_deleted_locked()
+                    purged = True
+                snapshot = SegmentLog.copy_store(self._store)
+                last_segment = self._log.last_seq
+                log = self._log
+                ann = faiss.clone_index(self._ann) if self._ann is not None else None
+                ann_trained_on = self._ann_trained_on
+                sparse, sparse_state = self._sparse, self._sparse.begin_snapshot()
+            # The slow part (serializing the whole index) runs without blocking readers or writers
+            log.write_snapshot(snapshot, last_segment)
+            if ann is not None:
+                save_ann(self.faiss_dir, ann, self.index_type, index_params(self.index_type), ann_trained_on)
+            sparse.write_snapshot(sparse_state)
+        except Exception as e:
+            logger.error(f"FAISS compaction failed: {e}", exc_info=True)
+        finally:
+            self._compact_lock.release()
+        if purged:
+            self._maybe_build_ann(self.count())
+
+    def _purge_deleted_locked(self):
+        """Physically remove tombstoned rows from the flat index, the docstore mapping and BM25"""
+        deleted = self._deleted_rows
+        self._store.index.remove_ids(np.fromiter(sorted(deleted), dtype=np.int64, count=len(deleted)))
+        kept_ids = [doc_id for row, doc_id in sorted(self._store.index_to_docstore_id.items()) if row not in deleted]
+        self._store.index_to_docstore_id = dict(enumerate(kept_ids))
+        self._sparse.remove_rows(deleted)
+        # The ANN index's rows no longer line up; searches use the flat index until it is retrained
+        self._ann, self._ann_trained_on = None, 0
+        drop_ann(self.faiss_dir)
+        self._rebuild_candidate_rows()
+        logger.info(f"Purged {len(deleted)} deleted rows from FAISS ({self._store.index.ntotal} remain)")
+
+    def reset(self):
+        """Drop the in-memory index and everything persisted for it"""
+        # Wait for a running compaction / ANN build so neither can write stale files afterwards
+        with self._compact_lock, self._ann_lock, self._lock:
+            if os.path.exists(self.faiss_dir):
+                shutil.rmtree(self.faiss_dir)
+            os.makedirs(self.faiss_dir, exist_ok=True)
+            self._log = SegmentLog(self.faiss_dir)
+            self._store = None
+            self._ann, self._ann_trained_on = None, 0
+            self._candidate_rows = {}
+            self._deleted_rows = set()
+            self._sparse = BM25Index(os.path.join(self.faiss_dir, BM25_DIR))
+            self.version += 1
+
+    def close(self):
+        """Release the directory lock; the service must not be used afterwards"""
+        self._dir_lock.close()
+
+
+_service: Optional[VectorStoreService] = None
+_service_lock = threading.Lock()
+
+
+def init_store_service(faiss_dir: str = settings.FAISS_DIR) -> VectorStoreService:
+    """Create the process-wide service. Called once at app startup."""
+    global _service
+    with _service_lock:
+        if _service is None or _service.faiss_dir != faiss_dir:
+            if _service is not None:
+                _service.close()
+            _service = VectorStoreService(faiss_dir)
+        return _service
+
+
+def get_store_service() -> VectorStoreService:
+    """Return the process-wide service, creating it on first use outside the app"""
+    if _service is None:
+        return init_store_service()
+    return _service
@@ -0,0 +1,59 @@
+# streaming_pipeline.py - Docling conversion page window by page window
+#
+# The PDF is cut into windows of DOCLING_PAGES_PER_WINDOW pages (pypdfium2,
+# which Docling already depends on) and each window is converted on its own, so
+# callers get markdown as Docling produces it and can stop early. Peak memory is
+# one window, not the whole document.
+import io
+import os
+from typing import Iterator, Tuple
+
+import pypdfium2 as pdfium
+from docling.datamodel.base_models import DocumentStream
+
+from config import settings
+from logger import logger
+
+
+def iter_pdf_windows(pdf_path: str, pages_per_window: int = settings.DOCLING_PAGES_PER_WINDOW
+                     ) -> Iterator[Tuple[int, int, io.BytesIO]]:
+    """(first_page, last_page, PDF bytes) per window; pages are 1-based"""
+    source = pdfium.PdfDocument(pdf_path)
+    try:
+        total = len(source)
+        for start in range(0, total, pages_per_window):
+            pages = list(range(start, min(start + pages_per_window, total)))
+            window = pdfium.PdfDocument.new()
+            window.import_pages(source, pages=pages)
+            buffer = io.BytesIO()
+            window.save(buffer)
+            window.close()
+            buffer.seek(0)
+            yield pages[0] + 1, pages[-1] + 1, buffer
+    finally:
+        source.close()
+
+
+def stream_markdown(pdf_path: str, converter, pages_per_window: int = settings.DOCLING_PAGES_PER_WINDOW
+                    ) -> Iterator[Tuple[int, int, str]]:
+    """(first_page, last_page, markdown) as Docling finishes each window"""
+    name = os.path.basename(pdf_path)
+    for first_page, last_page, buffer in iter_pdf_windows(pdf_path, pages_per_window):
+        result = converter.convert(DocumentStream(name=f"{first_page}-{last_page}-{name}", stream=buffer))
+        markdown = result.document.export_to_markdown()
+        logger.info(f"Docling converted pages {first_page}-{last_page} of {name} ({len(markdown)} characters)")
+        if markdown.strip():
+            yield first_page, last_page, markdown
+
+
+def read_markdown(pdf_path: str, converter, max_chars: int = settings.DOCLING_MAX_MARKDOWN_CHARS,
+                  pages_per_window: int = settings.DOCLING_PAGES_PER_WINDOW) -> str:
+    """Markdown of the PDF, converting no further windows once max_chars have been collected"""
+    parts = []
+    collected = 0
+    for _, _, markdown in stream_markdown(pdf_path, converter, pages_per_window):
+        parts.append(markdown)
+        collected += len(markdown)
+        if collected >= max_chars:
+            break
+    return "\n\n".join(parts)
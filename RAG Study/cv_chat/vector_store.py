@@ -1,28 +1,52 @@
 import os
 import re
-from docling.document_converter import DocumentConverter
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import hashlib
 from langchain.schema import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 
 from config import settings
 from logger import logger
+from store_service import get_store_service
+from converter_registry import get_converter
+from streaming_pipeline import read_markdown, stream_markdown
+from profile_extractor import extract_profile
+import llm_client
 
 def initialize_docling_converter():
-    """Initialize Docling converter for optimal CV parsing - OPTIMIZED"""
-    pipeline_options = PdfPipelineOptions(
-        do_table_structure=False,  # DISABLED for speed
-        do_ocr=False,
-        generate_page_images=False,
-        generate_picture_images=False,
-        do_ocr_strategy="never",  # Explicitly disable OCR
-    )
+    """Return the cached CV converter (OCR and table structure OFF) - built once per worker"""
+    return get_converter()
+
+def compute_pdf_hash(file_path: str) -> str:
+    """Compute a SHA256 hash of the PDF content."""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+def split_markdown_sections(full_markdown):
+    """Basic section detection using markdown headers"""
+    structured_sections = {}
+    lines = full_markdown.split('\n')
+    current_section = "Professional Profile"
+    content_buffer = []
     
-    doc_converter = DocumentConverter()
-    return doc_converter
+    for line in lines:
+        line = line.strip()
+        if line.startswith('#') and len(line) > 2:
+            # This is a header line
+            if content_buffer:
+                structured_sections[current_section] = '\n'.join(content_buffer)
+                content_buffer = []
+            current_section = line.lstrip('#').strip()
+        elif line:
+            content_buffer.append(line)
+    
+    # Add the last section
+    if content_buffer:
+        structured_sections[current_section] = '\n'.join(content_buffer)
+    
+    return structured_sections
 
 def extract_structured_sections_with_docling(docling_result):
     """
@@ -33,26 +57,7 @@ def extract_structured_sections_with_docling(docling_result):
     try:
         # SIMPLIFIED: Just use markdown export and basic section detection
         full_markdown = docling_result.document.export_to_markdown()
-        
-        # Basic section detection using markdown headers
-        lines = full_markdown.split('\n')
-        current_section = "Professional Profile"
-        content_buffer = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#') and len(line) > 2:
-                # This is a header line
-                if content_buffer:
-                    structured_sections[current_section] = '\n'.join(content_buffer)
-                    content_buffer = []
-                current_section = line.lstrip('#').strip()
-            elif line:
-                content_buffer.append(line)
-        
-        # Add the last section
-        if content_buffer:
-            structured_sections[current_section] = '\n'.join(content_buffer)
+        structured_sections = split_markdown_sections(full_markdown)
             
     except Exception as e:
         logger.warning(f"Docling structure extraction failed: {e}")
@@ -135,13 +140,6 @@ def lightweight_llm_validation(filtered_sections, candidate_name):
         CLEANED PROFESSIONAL CV:
         """
         
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            temperature=0.1,
-            max_tokens=2000,  # Increased for more content
-            convert_system_message_to_human=True
-        )
-        
         prompt = PromptTemplate(
             template=prompt_template,
             input_variables=["candidate_name", "sections_text"]
@@ -152,7 +150,8 @@ def lightweight_llm_validation(filtered_sections, candidate_name):
             "sections_text": sections_text
         })
         
-        response = llm.invoke(final_prompt)
+        # max_tokens increased for more content
+        response = llm_client.invoke(final_prompt, "gemini-2.5-flash-lite", 0.1, max_tokens=2000)
         logger.info("Lightweight LLM validation completed")
         
         return response.content
@@ -194,6 +193,50 @@ def create_single_golden_chunk(final_content, candidate_data):
     logger.info(f"Created single golden chunk with {len(final_content)} characters")
     return [doc]
 
+def _split_text(text, max_chars):
+    """Split on line boundaries into pieces of at most max_chars (overlong lines are cut)"""
+    pieces, current = [], ""
+    for line in text.split('\n'):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current.strip():
+        pieces.append(current)
+    return [piece for piece in pieces if piece.strip()]
+
+def create_section_chunks(structured_sections, candidate_data, max_chars=None):
+    """
+    One searchable chunk per CV section (split to fit the embedding window), linked
+    to the candidate. Retrieval pools their hits per candidate and answers from the golden chunk.
+    """
+    max_chars = max_chars or settings.SECTION_CHUNK_CHARS
+    docs = []
+    for section_name, content in structured_sections.items():
+        content = remove_personal_info(content or "").strip()
+        if not content:
+            continue
+        for part, piece in enumerate(_split_text(content, max_chars)):
+            docs.append(Document(
+                page_content=f"{candidate_data['candidate_name']} - {section_name}\n{piece}",
+                metadata={
+                    "source": candidate_data["original_filename"],
+                    "candidate_id": candidate_data["candidate_id"],
+                    "candidate_name": candidate_data["candidate_name"],
+                    "document_type": "cv_section",
+                    "section": section_name,
+                    "section_part": part,
+                }
+            ))
+    logger.info(f"Created {len(docs)} section chunks for {candidate_data['candidate_name']}")
+    return docs
+
 def convert_pdf_with_docling_enhanced(pdf_path, candidate_data):
     """
     Enhanced PDF processing - GUARANTEES SINGLE CHUNK
@@ -232,28 +275,7 @@ def convert_pdf_with_docling_enhanced_optimized(pdf_path, candidate_data, pre_pr
     
     try:
         # Use the pre-processed content instead of reprocessing the PDF
-        full_markdown = pre_processed_content
-        
-        # Basic section detection using markdown headers
-        lines = full_markdown.split('\n')
-        current_section = "Professional Profile"
-        content_buffer = []
-        structured_sections = {}
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#') and len(line) > 2:
-                # This is a header line
-                if content_buffer:
-                    structured_sections[current_section] = '\n'.join(content_buffer)
-                    content_buffer = []
-                current_section = line.lstrip('#').strip()
-            elif line:
-                content_buffer.append(line)
-        
-        # Add the last section
-        if content_buffer:
-            structured_sections[current_section] = '\n'.join(content_buffer)
+        structured_sections = split_markdown_sections(pre_processed_content)
             
         logger.info(f"Extracted {len(structured_sections)} sections from pre-processed content: {list(structured_sections.keys())}")
         
@@ -274,12 +296,17 @@ def convert_pdf_with_docling_enhanced_optimized(pdf_path, candidate_data, pre_pr
 
 def convert_pdf_with_docling_basic(pdf_path, candidate_data):
     """Fallback basic processing - ALSO SINGLE CHUNK"""
-    converter = DocumentConverter()
-    result = converter.convert(pdf_path)
-    raw_text = result.document.export_to_markdown()
-    
-    # Basic personal info removal
-    cleaned_text = remove_personal_info(raw_text)
+    # Convert page window by page window and stop once the chunk is full,
+    # so a long PDF is never fully parsed or held in memory
+    cleaned_parts = []
+    cleaned_length = 0
+    for _, _, markdown in stream_markdown(pdf_path, initialize_docling_converter()):
+        # Basic personal info removal
+        cleaned_parts.append(remove_personal_info(markdown))
+        cleaned_length += len(cleaned_parts[-1])
+        if cleaned_length > 15000:
+            break
+    cleaned_text = "\n\n".join(cleaned_parts)
     
     # Ensure single chunk
     if len(cleaned_text) > 15000:
@@ -300,61 +327,104 @@ def convert_pdf_with_docling_basic(pdf_path, candidate_data):
     logger.info(f"Created fallback single chunk with {len(cleaned_text)} characters")
     return [doc]
 
-def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file):
-    """Enhanced with content-based name extraction - TRUE SINGLE CHUNK"""
+def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file, store=None, on_stage=None, candidate_id=None):
+    """
+    Enhanced with content-based name extraction - TRUE SINGLE CHUNK
+    on_stage(name) is called as the pipeline enters parsing / name_extraction / cleaning / embedding
+    With candidate_id, re-ingests that existing candidate: once the new chunks are built, its
+    candidate row and its vectors are swapped for the new file's together
+    """
+    if store is None:
+        store = get_store_service()
+    if on_stage is None:
+        on_stage = lambda stage: None
     
     from candidate_manager import CandidateManager
     candidate_manager = CandidateManager(hash_index_file)
     
-    # Check if file already processed
-    hash_index = candidate_manager.load_hash_index()
-    if file_hash in hash_index["file_hashes"]:
-        candidate_id = hash_index["file_hashes"][file_hash]
-        candidate_data = hash_index["candidates"][candidate_id]
-        return f"Skipped: '{candidate_data['candidate_name']}' already exists in vector store."
+    def skipped(candidate):
+        return f"Skipped: '{candidate['candidate_name']}' already exists in vector store."
+
+    # Check if file already processed (a re-ingest may reuse the same file)
+    candidate_data = candidate_manager.get_candidate_by_hash(file_hash)
+    if candidate_data and candidate_id is None:
+        return skipped(candidate_data)
+
+    def register(filename, content):
+        """(candidate_data, created); created is False if a concurrent upload claimed the file first"""
+        if candidate_id is None:
+            return candidate_manager.register_candidate(file_hash, filename, content)
+        # Re-ingest: nothing is written until the chunks exist (see the embedding stage)
+        replacement = candidate_manager.build_candidate(filename, content)
+        replacement["candidate_id"] = candidate_id
+        return replacement, True
+
+    section_docs = []
+    registered = False
 
     # PROCESS PDF ONLY ONCE and reuse the result
     try:
-        converter = DocumentConverter()
-        result = converter.convert(pdf_path)
-        full_content = result.document.export_to_markdown()
+        on_stage("parsing")
+        # Page window by page window, stopping once there is more than the golden chunk can keep
+        full_content = read_markdown(pdf_path, initialize_docling_converter())
         
         # Use first 2000 chars for name extraction
         sample_content = full_content[:2000]
         
         # Register new candidate WITH CONTENT for better name extraction
         filename = os.path.basename(pdf_path)
-        candidate_data = candidate_manager.register_candidate(file_hash, filename, sample_content)
+        on_stage("name_extraction")
+        candidate_data, created = register(filename, sample_content)
+        if not created:
+            # Another worker is indexing this file; adding our chunks would duplicate its candidate
+            return skipped(candidate_data)
+        registered = True
         
         # Process document with enhanced hybrid approach - PASS THE ALREADY PROCESSED CONTENT
         logger.info(f"Processing CV with enhanced pipeline: {candidate_data['candidate_name']}")
         
         # Use the already processed content instead of reprocessing the PDF
+        on_stage("cleaning")
         docs = convert_pdf_with_docling_enhanced_optimized(pdf_path, candidate_data, full_content)
+        if settings.SECTION_EMBEDDINGS_ENABLED:
+            section_docs = create_section_chunks(split_markdown_sections(full_content), candidate_data)
         
     except Exception as e:
         logger.error(f"PDF processing failed: {e}")
         # Fallback: register without content and process normally
         filename = os.path.basename(pdf_path)
-        candidate_data = candidate_manager.register_candidate(file_hash, filename, None)
+        if not registered:
+            candidate_data, created = register(filename, None)
+            if not created:
+                return skipped(candidate_data)
+        on_stage("cleaning")
         docs = convert_pdf_with_docling_enhanced(pdf_path, candidate_data)
     
-    # CRITICAL: NO SPLITTING - use documents as-is
-    chunks = docs  # Direct assignment - NO SPLITTING
+    # CRITICAL: NO SPLITTING - the golden chunk is what the LLM sees;
+    # section chunks are extra search keys pointing back to it
+    chunks = docs + section_docs
     
-    logger.info(f"Created {len(chunks)} golden chunks for: {candidate_data['candidate_name']}")
+    logger.info(f"Created {len(docs)} golden chunks and {len(section_docs)} section chunks for: {candidate_data['candidate_name']}")
 
-    # Save to vector store
-    embedding_model = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
-    
-    if os.path.exists(os.path.join(faiss_dir, "index.faiss")):
-        vector_store = FAISS.load_local(faiss_dir, embedding_model, allow_dangerous_deserialization=True)
-        vector_store.add_documents(chunks)
-        logger.info("Appended to existing FAISS index")
+    # Save to the resident vector store (embeds once, swaps into the live index)
+    on_stage("embedding")
+    if candidate_id is None:
+        store.add_documents(chunks)
     else:
-        vector_store = FAISS.from_documents(chunks, embedding_model)
-        logger.info("Created new FAISS index")
+        # Row first (it refuses a file owned by someone else), then the vectors;
+        # if the vector swap fails the old row is put back
+        previous = candidate_manager.get_candidate_by_id(candidate_id)
+        previous_hash = candidate_manager.get_candidate_file_hash(candidate_id)
+        candidate_manager.replace_candidate(file_hash, candidate_data)
+        try:
+            store.replace_candidate(candidate_id, chunks)
+        except Exception:
+            if previous and previous_hash:
+                candidate_manager.replace_candidate(previous_hash, previous)
+            raise
 
-    vector_store.save_local(faiss_dir)
+    # Structured skills / roles / years for zero-LLM candidate filtering
+    profile = extract_profile("\n".join(doc.page_content for doc in docs))
+    candidate_manager.set_candidate_profile(candidate_data["candidate_id"], profile)
     
     return f"Single golden chunk created successfully for '{candidate_data['candidate_name']}' (ID: {candidate_data['candidate_id']})"
\ No newline at end of file
@@ -1,4 +1,10 @@
 import requests
+from requests.adapters import HTTPAdapter
+
+# One keep-alive session for all image descriptions: the TLS handshake to the
+# Gemini endpoint is paid once, not once per image.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
 
 def gemini_describe_image(base64_image: str, api_key: str, model="gemini-2.5-flash") -> str:
     """
@@ -22,7 +28,7 @@ def gemini_describe_image(base64_image: str, api_key: str, model="gemini-2.5-fla
         }]
     }
 
-    res = requests.post(url, headers=headers, json=payload, timeout=60)
+    res = _session.post(url, headers=headers, json=payload, timeout=60)
     res.raise_for_status()
     data = res.json()
     return data["candidates"][0]["content"]["parts"][0]["text"]
@@ -0,0 +1,150 @@
+# parallel_indexer.py - multi-process PDF parsing overlapped with batched embedding
+#
+#   parse  : a process pool loads and splits PDFs, at most 2 * workers files in flight
+#   queue  : parsed files wait in a bounded queue; when it is full the pool stops
+#            being fed, so memory stays flat however large the corpus is
+#   embed  : the main process embeds chunks batch_size at a time while the pool
+#            keeps parsing, and adds each batch to the FAISS store
+#
+# Workers are spawned (not forked) so they never inherit the embedding model's
+# torch threads. Per-stage throughput is printed at the end: if "embedder waited"
+# is large, add workers; if it is near zero, embedding is the bottleneck.
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "0"))  # parser processes; 0 = one per CPU
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))  # chunks per embedding call
+INDEX_QUEUE_FILES = int(os.getenv("INDEX_QUEUE_FILES", "64"))  # parsed files waiting for the embedder
+
+_DONE = object()
+
+
+def list_pdfs(data_dir: str) -> List[str]:
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if name.lower().endswith(".pdf"))
+
+
+def parse_pdf(pdf_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, list, float, Optional[str]]:
+    """Runs in a worker: (path, [(text, metadata)], seconds, error)"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    start = time.perf_counter()
+    try:
+        docs = PyPDFLoader(pdf_path, mode="single").load()
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            is_separator_regex=False
+        )
+        chunks = [(chunk.page_content, chunk.metadata) for chunk in splitter.split_documents(docs)]
+        return pdf_path, chunks, time.perf_counter() - start, None
+    except Exception as e:
+        return pdf_path, [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def _feed_parsers(executor, pdf_paths, chunk_size, chunk_overlap, parsed: queue.Queue, max_in_flight, failure):
+    try:
+        remaining = iter(pdf_paths)
+        pending = set()
+        while True:
+            for path in remaining:
+                pending.add(executor.submit(parse_pdf, path, chunk_size, chunk_overlap))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parsed.put(future.result())  # blocks while the embedder is behind
+    except BaseException as e:
+        failure.append(e)
+    finally:
+        parsed.put(_DONE)
+
+
+def build_index(data_dir: str, save_path: str, embedding_model, workers: int = INDEX_WORKERS,
+                batch_size: int = INDEX_BATCH_SIZE, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """Parse every PDF in data_dir, embed and index the chunks, save to save_path. Returns the store (None if empty)."""
+    pdf_paths = list_pdfs(data_dir)
+    workers = workers or os.cpu_count() or 1
+    batch_size = max(1, batch_size)
+    print(f" Indexing {len(pdf_paths)} PDFs from {data_dir} with {workers} parser processes, batches of {batch_size}")
+
+    parsed = queue.Queue(maxsize=INDEX_QUEUE_FILES)
+    failure = []
+    vector_store = None
+    files = failed = chunks_total = 0
+    parse_seconds = embed_seconds = index_seconds = waited_seconds = 0.0
+    texts, metadatas = [], []
+
+    def flush():
+        nonlocal vector_store, embed_seconds, index_seconds, chunks_total
+        start = time.perf_counter()
+        vectors = embedding_model.embed_documents(texts)
+        embed_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        pairs = list(zip(texts, vectors))
+        if vector_store is None:
+            vector_store = FAISS.from_embeddings(pairs, embedding_model, metadatas=list(metadatas))
+        else:
+            vector_store.add_embeddings(pairs, metadatas=list(metadatas))
+        index_seconds += time.perf_counter() - start
+        chunks_total += len(texts)
+        print(f" [{files}/{len(pdf_paths)} files] {chunks_total} chunks indexed, "
+              f"{chunks_total / max(embed_seconds, 1e-9):.1f} chunks/s embedding")
+        texts.clear()
+        metadatas.clear()
+
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        feeder = threading.Thread(
+            target=_feed_parsers,
+            args=(executor, pdf_paths, chunk_size, chunk_overlap, parsed, 2 * workers, failure),
+            daemon=True,
+        )
+        feeder.start()
+        while True:
+            start = time.perf_counter()
+            item = parsed.get()
+            waited_seconds += time.perf_counter() - start
+            if item is _DONE:
+                break
+            pdf_path, chunks, seconds, error = item
+            files += 1
+            parse_seconds += seconds
+            if error:
+                failed += 1
+                print(f" Skipped {pdf_path}: {error}")
+                continue
+            for text, metadata in chunks:
+                texts.append(text)
+                metadatas.append(metadata)
+                if len(texts) >= batch_size:
+                    flush()
+        feeder.join()
+    if failure:
+        raise failure[0]
+    if texts:
+        flush()
+    wall_seconds = time.perf_counter() - wall_start
+
+    print(f" parse : {files} files ({failed} failed) in {parse_seconds:.1f}s of worker time, "
+          f"{files / max(wall_seconds, 1e-9):.1f} files/s overall")
+    print(f" embed : {chunks_total} chunks in {embed_seconds:.1f}s, {chunks_total / max(embed_seconds, 1e-9):.1f} chunks/s")
+    print(f" index : {index_seconds:.1f}s, {chunks_total / max(index_seconds, 1e-9):.1f} chunks/s")
+    print(f" embedder waited {waited_seconds:.1f}s for parsed files; total {wall_seconds:.1f}s")
+
+    if vector_store is None:
+        print(" No text extracted - nothing to save")
+        return None
+    vector_store.save_local(save_path)
+    print(f" Vector store saved successfully at: {save_path}")
+    return vector_store
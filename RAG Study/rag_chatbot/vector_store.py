@@ -1,56 +1,23 @@
 # vector_store.py
-import os
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.schema.document import Document
-from langchain.embeddings import HuggingFaceEmbeddings
+import argparse
 from langchain_community.vectorstores import FAISS
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+from parallel_indexer import INDEX_BATCH_SIZE, INDEX_WORKERS, build_index
 
 DATA_DIR = "data"
 SAVE_PATH = "faiss_index"
 
-def load_all_pdfs(data_dir: str):
-    """Load all PDF files from a directory."""
-    all_docs = []
-    for filename in os.listdir(data_dir):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(data_dir, filename)
-            print(f"Loading: {pdf_path}")
-            loader = PyPDFLoader(pdf_path, mode="single")
-            docs = loader.load()
-            all_docs.extend(docs)
-    print(f"Total documents loaded: {len(all_docs)}")
-    return all_docs
-
-def split_documents(documents: list[Document]):
-    """Split documents into overlapping text chunks."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-        is_separator_regex=False
-    )
-    return splitter.split_documents(documents)
-
-def build_vector_store():
-    """Build FAISS index from all PDFs in the data folder."""
-    documents = load_all_pdfs(DATA_DIR)
-    print("Splitting into chunks...")
-    chunks = split_documents(documents)
-    print(f"Total chunks created: {len(chunks)}")
-
+def build_vector_store(workers: int = INDEX_WORKERS, batch_size: int = INDEX_BATCH_SIZE):
+    """Build FAISS index from all PDFs in the data folder, parsing them in parallel."""
     print("Generating embeddings...")
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    print("Creating FAISS vector store...")
-    vector_store = FAISS.from_documents(chunks, embedding_model)
-
-    vector_store.save_local(SAVE_PATH)
-    print(f"Vector store saved successfully at: {SAVE_PATH}")
+    # Chunks embedded by a previous build are read back from embedding_cache/
+    embedding_model = get_cached_embeddings(get_embedding_engine())
+    build_index(DATA_DIR, SAVE_PATH, embedding_model, workers=workers, batch_size=batch_size)
 
 def load_vector_store():
     """Load an existing FAISS vector store."""
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model = get_embedding_engine()
     print("Loading existing FAISS vector store...")
     vector_store = FAISS.load_local(
         SAVE_PATH,
@@ -59,3 +26,10 @@ def load_vector_store():
     )
     print("Vector store loaded successfully.")
     return vector_store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS index from every PDF in data/")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS, help="PDF parser processes (0 = one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE, help="Chunks per embedding batch")
+    args = parser.parse_args()
+    build_vector_store(args.workers, args.batch_size)
@@ -2,7 +2,7 @@
 import os
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.responses import StreamingResponse, JSONResponse
-from vector_store import build_vector_store, load_vector_store, SAVE_PATH
+from vector_store import sync_vector_store, load_vector_store, DATA_DIR, SAVE_PATH
 from rag import stream_answer_generator
 
 app = FastAPI(title="RAG System API")
@@ -10,14 +10,16 @@ app = FastAPI(title="RAG System API")
 
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    os.makedirs("data", exist_ok=True)
-    file_path = os.path.join("data", file.filename)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    file_path = os.path.join(DATA_DIR, file.filename)
     try:
         with open(file_path, "wb") as f:
             f.write(await file.read())
-        # build vector store from the uploaded file (or all files in data/)
-        build_vector_store(pdf_path=file_path, save_path=SAVE_PATH)
-        return {"message": f"Index built successfully from {file.filename}"}
+        # only the new (or replaced) file is looked at; the rest of DATA_DIR is left to the daily sync
+        stats = sync_vector_store(DATA_DIR, SAVE_PATH, only=[file.filename])
+        if stats["failed"]:
+            return JSONResponse(status_code=422, content={"error": f"Could not read {file.filename}", "sync": stats})
+        return {"message": f"Index updated with {file.filename}", "sync": stats}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
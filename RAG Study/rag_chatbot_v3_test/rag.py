@@ -5,11 +5,11 @@ import threading
 import queue
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.callbacks.base import BaseCallbackHandler
 from vector_store import load_vector_store, SAVE_PATH
+from embedding_engine import get_embedding_engine
 
 load_dotenv()
 
@@ -81,7 +81,7 @@ def stream_answer_generator(question: str, save_path: str = SAVE_PATH, max_retri
     _ensure_google_api_key()
 
     # load vector store and prepare retriever
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model = get_embedding_engine()
     vector_store = FAISS.load_local(save_path, embedding_model, allow_dangerous_deserialization=True)
     retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": max_retrieval_k})
 
@@ -1,14 +1,32 @@
 # vector_store.py
+#
+# sync_vector_store keeps faiss_index in step with DATA_DIR incrementally. A
+# manifest next to the index records, per PDF, (mtime, size, sha256) and the
+# docstore ids of its chunks:
+#   same mtime and size   -> unchanged, not even read
+#   same sha256           -> touched only, manifest updated
+#   otherwise             -> old vectors deleted, file re-split and re-embedded
+#   gone from DATA_DIR    -> its vectors deleted
+# so a run costs roughly as much as the files that changed. A PDF that cannot be
+# read is reported as failed and left out of the manifest, so the next run retries
+# it; the other files are still indexed.
+#   python vector_store.py --sync
+import argparse
+import hashlib
+import json
 import os
-from typing import Optional, List
+import uuid
+from typing import Dict, Optional, List
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
 
 DATA_DIR = "data"
 SAVE_PATH = "faiss_index"
+MANIFEST_FILE = "manifest.json"
 
 
 def _load_pdfs_from_path(pdf_path: Optional[str]) -> List[Document]:
@@ -44,27 +62,164 @@ def build_vector_store(pdf_path: Optional[str] = None, save_path: str = SAVE_PAT
     Build FAISS index from a single PDF or from all PDFs in DATA_DIR.
     Returns the path where the index was saved.
     """
+    if not pdf_path:
+        # A full rebuild also writes the manifest, so later syncs are incremental
+        sync_vector_store(DATA_DIR, save_path, rebuild=True)
+        return save_path
+
     documents = _load_pdfs_from_path(pdf_path)
     if not documents:
         raise RuntimeError("No documents found to index.")
 
     chunks = split_documents(documents)
 
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # Unchanged chunks come from the embedding cache instead of being re-embedded
+    embedding_model = get_cached_embeddings(get_embedding_engine())
 
     vector_store = FAISS.from_documents(chunks, embedding_model)
 
     os.makedirs(save_path, exist_ok=True)
     vector_store.save_local(save_path)
+    # The index no longer matches any manifest; the next sync rebuilds it
+    manifest_path = os.path.join(save_path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
     return save_path
 
 
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest(save_path: str) -> Optional[Dict[str, dict]]:
+    manifest_path = os.path.join(save_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(save_path: str, manifest: Dict[str, dict]):
+    manifest_path = os.path.join(save_path, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def sync_vector_store(data_dir: str = DATA_DIR, save_path: str = SAVE_PATH, rebuild: bool = False,
+                      only: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Bring the index at save_path in line with the PDFs in data_dir.
+    only limits the sync to those file names (e.g. the one just uploaded); the
+    rest of the manifest is left as it is. Without a manifest to build on, every
+    file is synced regardless.
+    Returns counts of added, modified, deleted, unchanged and failed files.
+    """
+    embedding_model = get_cached_embeddings(get_embedding_engine())
+    manifest = None if rebuild else _load_manifest(save_path)
+    vector_store = None
+    if manifest is None:
+        # No manifest: the existing index cannot be mapped back to files, start over
+        manifest = {}
+        only = None
+    elif os.path.isdir(save_path):
+        vector_store = FAISS.load_local(save_path, embedding_model, allow_dangerous_deserialization=True)
+    else:
+        manifest = {}
+        only = None
+
+    pdfs = {}
+    if os.path.isdir(data_dir):
+        for fname in sorted(os.listdir(data_dir)):
+            if fname.lower().endswith(".pdf") and (only is None or fname in only):
+                pdfs[fname] = os.path.join(data_dir, fname)
+
+    stats = {"added": 0, "modified": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+    stale_ids: List[str] = []
+    to_index = []
+    tracked = set(manifest) if only is None else set(manifest) & set(only)
+    for fname in tracked - set(pdfs):
+        stale_ids.extend(manifest.pop(fname)["ids"])
+        stats["deleted"] += 1
+
+    for fname, path in pdfs.items():
+        stat = os.stat(path)
+        entry = manifest.get(fname)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            stats["unchanged"] += 1
+            continue
+        sha256 = _file_sha256(path)
+        if entry and entry["sha256"] == sha256:
+            entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+            stats["unchanged"] += 1
+            continue
+        if entry:
+            stale_ids.extend(entry["ids"])
+        manifest[fname] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": sha256, "ids": []}
+        to_index.append((fname, "modified" if entry else "added"))
+
+    if vector_store is not None and stale_ids:
+        # Ids a crash left in the manifest but never saved in the index are skipped
+        present = set(vector_store.index_to_docstore_id.values())
+        stale_ids = [doc_id for doc_id in stale_ids if doc_id in present]
+        if stale_ids:
+            vector_store.delete(stale_ids)
+
+    for fname, change in to_index:
+        try:
+            chunks = split_documents(PyPDFLoader(pdfs[fname], mode="single").load())
+        except Exception as e:
+            # Corrupt or encrypted: its old vectors are gone, and without a manifest entry the next run retries it
+            manifest.pop(fname)
+            stats["failed"] += 1
+            print(f"Skipped {fname}: {type(e).__name__}: {e}")
+            continue
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        manifest[fname]["ids"] = ids
+        stats[change] += 1
+        if not chunks:
+            continue
+        if vector_store is None:
+            vector_store = FAISS.from_documents(chunks, embedding_model, ids=ids)
+        else:
+            vector_store.add_documents(chunks, ids=ids)
+
+    # A modified file that failed to load still had its old vectors deleted
+    changed = stats["added"] + stats["modified"] + stats["deleted"] or bool(stale_ids)
+    if vector_store is None:
+        if pdfs and not stats["failed"]:
+            raise RuntimeError("No text found to index.")
+        return stats
+    os.makedirs(save_path, exist_ok=True)
+    if changed or rebuild:
+        vector_store.save_local(save_path)
+    # Written after the index: a crash in between can leave unreferenced vectors, which a rebuild clears
+    _save_manifest(save_path, manifest)
+    print(f"Sync {data_dir} -> {save_path}: {stats['added']} added, {stats['modified']} modified, "
+          f"{stats['deleted']} deleted, {stats['unchanged']} unchanged, {stats['failed']} failed")
+    return stats
+
+
 def load_vector_store(save_path: str = SAVE_PATH):
     """
     Load and return a FAISS vector store from save_path.
     """
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model = get_embedding_engine()
     if not os.path.isdir(save_path):
         raise FileNotFoundError(f"Vector store not found at {save_path}")
     vector_store = FAISS.load_local(save_path, embedding_model, allow_dangerous_deserialization=True)
     return vector_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the PDFs in DATA_DIR")
+    parser.add_argument("--sync", action="store_true", help="Only re-index files changed since the last run")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--save-path", default=SAVE_PATH)
+    args = parser.parse_args()
+    sync_vector_store(args.data_dir, args.save_path, rebuild=not args.sync)
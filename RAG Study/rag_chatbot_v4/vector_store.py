@@ -1,14 +1,24 @@
 import os
 import json
+import threading
 from docling.datamodel.base_models import InputFormat
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, EasyOcrOptions
 from docling.datamodel.settings import settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
+from segment_log import SegmentLog
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+from streaming_pipeline import stream_chunks, index_in_batches
+
+# Pending segments that trigger a background compaction into the snapshot
+COMPACT_AFTER_SEGMENTS = 50
+# Progress of files whose indexing has not finished yet, one JSON file per hash
+INGEST_DIR = "ingest"
+_compaction_lock = threading.Lock()
+
 
 def load_hash_index(hash_index_file):
     """Load the stored file hashes (if exists)."""
@@ -64,32 +74,127 @@ def convert_pdf_with_docling(pdf_path):
     
     return [doc]
 
+def embed_segment_record(chunks, embedding_model, id_prefix, first_chunk):
+    """
+    Embed chunks into one FAISS segment record. Ids are <id_prefix>-<chunk number>,
+    so indexing the same file again yields the same ids and replay keeps one copy.
+    """
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    ids = [f"{id_prefix}-{first_chunk + i}" for i in range(len(chunks))]
+    vectors = embedding_model.embed_documents(texts)
+    return SegmentLog.add_record(texts, vectors, metadatas, ids)
+
+
+def _ingest_progress_path(faiss_dir, file_hash):
+    return os.path.join(faiss_dir, INGEST_DIR, f"{file_hash}.json")
+
+
+def load_ingest_progress(faiss_dir, file_hash):
+    """
+    How far an interrupted indexing of file_hash got:
+        committed  - chunks already appended as segments
+        page       - first page of the window holding the next chunk
+        page_chunk - chunk number of that window's first chunk
+    """
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"committed": 0, "page": 1, "page_chunk": 0}
+
+
+def save_ingest_progress(faiss_dir, file_hash, progress):
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, path)
+
+
+def clear_ingest_progress(faiss_dir, file_hash):
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def stream_to_segment_log(open_chunks, embedding_model, faiss_dir, file_hash):
+    """
+    Embed chunks batch by batch, appending each batch as a segment the moment it is
+    embedded so it is searchable straight away. open_chunks(first_page) yields the
+    chunks from that page on. After every segment the progress file records the
+    window to restart from; a retry after a crash re-converts only that window and
+    skips the chunks already committed. Returns the number of chunks in the index.
+    """
+    log = SegmentLog(faiss_dir)
+    progress = load_ingest_progress(faiss_dir, file_hash)
+    if progress["committed"]:
+        print(f" Resuming at page {progress['page']}, {progress['committed']} chunks already indexed")
+    committed = progress["committed"]
+    window_start = {}  # window first page -> number of its first chunk
+
+    def numbered_chunks():
+        n = progress["page_chunk"]
+        for chunk in open_chunks(progress["page"]):
+            window_start.setdefault(chunk.metadata["page"], n)
+            if n >= committed:
+                yield chunk
+            n += 1
+
+    def append(batch):
+        nonlocal committed
+        log.append(embed_segment_record(batch, embedding_model, file_hash, committed))
+        committed += len(batch)
+        page = batch[-1].metadata["page"]
+        save_ingest_progress(faiss_dir, file_hash,
+                             {"committed": committed, "page": page, "page_chunk": window_start[page]})
+
+    index_in_batches(numbered_chunks(), append)
+
+    if len(log.pending_segments()) >= COMPACT_AFTER_SEGMENTS and not _compaction_lock.locked():
+        threading.Thread(target=compact_faiss_index, args=(faiss_dir, embedding_model), daemon=True).start()
+    return committed
+
+
+def compact_faiss_index(faiss_dir, embedding_model):
+    """Fold pending segments into a fresh snapshot (runs in a background thread)."""
+    if not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        log = SegmentLog(faiss_dir)
+        # Read the high-water mark first; segments appended during load are replayed again later, which is a no-op
+        last_segment = log.last_seq
+        vector_store = log.load(embedding_model)
+        if vector_store is not None:
+            log.write_snapshot(vector_store, last_segment)
+    except Exception as e:
+        print(f"FAISS compaction failed: {e}")
+    finally:
+        _compaction_lock.release()
+
+
 def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file):
     """Append new PDF embeddings to FAISS (if not already processed) using Docling for parsing."""
     hash_index = load_hash_index(hash_index_file)
     if file_hash in hash_index:
         return f"Skipped: '{os.path.basename(pdf_path)}' already exists in vector store."
 
-    # Load and process document using Docling instead of PyPDFLoader
-    docs = convert_pdf_with_docling(pdf_path)
-
-    # The rest of the logic remains exactly the same as your base code
     splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
+    embedding_model = get_cached_embeddings(get_embedding_engine())
 
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    # If FAISS exists -> append
-    if os.path.exists(os.path.join(faiss_dir, "index.faiss")):
-        vector_store = FAISS.load_local(faiss_dir, embedding_model, allow_dangerous_deserialization=True)
-        vector_store.add_documents(chunks)
-    else:
-        vector_store = FAISS.from_documents(chunks, embedding_model)
-
-    vector_store.save_local(faiss_dir)
+    # Convert and split page window by page window with Docling, appending one
+    # segment per batch of chunks, so long PDFs never sit in memory as a whole
+    converter = initialize_docling_converter()
+    written = stream_to_segment_log(
+        lambda first_page: stream_chunks(pdf_path, converter, splitter, first_page=first_page),
+        embedding_model, faiss_dir, file_hash,
+    )
+    print(f"✅ Indexed {written} chunks from {pdf_path}")
 
     # Update hash index
     hash_index[file_hash] = os.path.basename(pdf_path)
     save_hash_index(hash_index, hash_index_file)
+    clear_ingest_progress(faiss_dir, file_hash)
 
     return f"Embeddings added successfully for '{os.path.basename(pdf_path)}'."
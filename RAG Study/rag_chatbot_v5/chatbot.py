@@ -1,6 +1,7 @@
 # app.py
 import streamlit as st
 import requests
+import time
 
 # Configure the page
 st.set_page_config(
@@ -12,6 +13,8 @@ st.set_page_config(
 
 # Backend configuration
 BACKEND_URL = "http://localhost:5555"
+JOB_POLL_INTERVAL = 1.0  # seconds between /jobs/{id} polls
+JOB_POLL_TIMEOUT = 600
 
 def call_backend(endpoint, data=None, files=None):
     """Helper function to call backend API"""
@@ -21,10 +24,30 @@ def call_backend(endpoint, data=None, files=None):
             response = requests.post(url, files=files)
         else:
             response = requests.post(url, data=data)
-        return response.json() if response.status_code == 200 else None
+        return response.json() if response.ok else None
     except:
         return None
 
+def get_backend(endpoint):
+    """GET helper for status endpoints"""
+    try:
+        response = requests.get(f"{BACKEND_URL}{endpoint}")
+        return response.json() if response.ok else None
+    except:
+        return None
+
+def wait_for_job(job_id, status):
+    """Poll /jobs/{id} until the upload finishes instead of holding the upload request open"""
+    deadline = time.time() + JOB_POLL_TIMEOUT
+    while time.time() < deadline:
+        job = get_backend(f"/jobs/{job_id}")
+        if job and job.get("status") in ("done", "failed"):
+            return job
+        if job:
+            status.update(label=f"Processing CV... ({job.get('stage')})")
+        time.sleep(JOB_POLL_INTERVAL)
+    return None
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -65,6 +88,14 @@ if st.session_state.selected_file and not st.session_state.has_cv:
             files = {"file": (st.session_state.selected_file.name, st.session_state.selected_file.getvalue(), "application/pdf")}
             result = call_backend("/upload-pdf", files=files)
             
+            # Backends with a job queue answer right away with a job id - poll it
+            if result and "job_id" in result:
+                job = wait_for_job(result["job_id"], status)
+                if job and job.get("status") == "done":
+                    result = job["result"]
+                else:
+                    result = None
+            
             if result and "message" in result:
                 st.session_state.has_cv = True
                 st.session_state.uploaded_file_name = st.session_state.selected_file.name
@@ -1,16 +1,24 @@
 import os
 import json
+import uuid
+import threading
 from docling.datamodel.base_models import InputFormat
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, EasyOcrOptions
 from docling.datamodel.settings import settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 
+from segment_log import SegmentLog
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+import llm_client
+
+# Pending segments that trigger a background compaction into the snapshot
+COMPACT_AFTER_SEGMENTS = 50
+_compaction_lock = threading.Lock()
+
 
 def load_hash_index(hash_index_file):
     """Load the stored file hashes (if exists)."""
@@ -80,13 +88,6 @@ def validate_and_format_cv_structure(raw_text):
     try:
         print("Validating CV structure with LLM...")
         
-        # Initialize LLM for structuring
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.1,  # Low temperature for consistent formatting
-            convert_system_message_to_human=True
-        )
-        
         prompt = PromptTemplate(
             template=prompt_template,
             input_variables=["raw_text", "standard_headers"]
@@ -97,7 +98,8 @@ def validate_and_format_cv_structure(raw_text):
             "standard_headers": ", ".join(STANDARD_CV_HEADERS)
         })
         
-        response = llm.invoke(formatted_prompt)
+        # Low temperature for consistent formatting
+        response = llm_client.invoke(formatted_prompt, "gemini-2.5-flash", 0.1)
         print("CV structure validation completed")
         return response.content
         
@@ -174,6 +176,37 @@ def convert_pdf_with_docling(pdf_path):
     
     return [doc]
 
+def append_to_segment_log(chunks, embedding_model, faiss_dir):
+    """Embed chunks and persist them as one FAISS segment. Cost does not grow with the index."""
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    vectors = embedding_model.embed_documents(texts)
+
+    log = SegmentLog(faiss_dir)
+    log.append(SegmentLog.add_record(texts, vectors, metadatas, ids))
+
+    if len(log.pending_segments()) >= COMPACT_AFTER_SEGMENTS and not _compaction_lock.locked():
+        threading.Thread(target=compact_faiss_index, args=(faiss_dir, embedding_model), daemon=True).start()
+
+
+def compact_faiss_index(faiss_dir, embedding_model):
+    """Fold pending segments into a fresh snapshot (runs in a background thread)."""
+    if not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        log = SegmentLog(faiss_dir)
+        # Read the high-water mark first; segments appended during load are replayed again later, which is a no-op
+        last_segment = log.last_seq
+        vector_store = log.load(embedding_model)
+        if vector_store is not None:
+            log.write_snapshot(vector_store, last_segment)
+    except Exception as e:
+        print(f"FAISS compaction failed: {e}")
+    finally:
+        _compaction_lock.release()
+
+
 def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file):
     """Append new PDF embeddings to FAISS (if not already processed) using enhanced CV processing."""
     hash_index = load_hash_index(hash_index_file)
@@ -194,16 +227,10 @@ def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file):
     
     print(f"Split into {len(chunks)} chunks")
 
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    # If FAISS exists -> append
-    if os.path.exists(os.path.join(faiss_dir, "index.faiss")):
-        vector_store = FAISS.load_local(faiss_dir, embedding_model, allow_dangerous_deserialization=True)
-        vector_store.add_documents(chunks)
-    else:
-        vector_store = FAISS.from_documents(chunks, embedding_model)
+    embedding_model = get_cached_embeddings(get_embedding_engine())
 
-    vector_store.save_local(faiss_dir)
+    # Append one segment file instead of loading and rewriting the whole index
+    append_to_segment_log(chunks, embedding_model, faiss_dir)
 
     # Update hash index
     hash_index[file_hash] = os.path.basename(pdf_path)
@@ -0,0 +1,71 @@
+# embedding_engine.py - batched CPU sentence embeddings
+#
+# Drop-in replacement for HuggingFaceEmbeddings (same LangChain Embeddings
+# interface, so FAISS.from_documents / load_local accept it) that controls the
+# parts that matter on CPU: inputs sorted by length so each batch pads to a
+# similar size, an explicit batch size, a fixed torch thread count, and
+# L2-normalized float32 output.
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))  # texts per forward pass (length-sorted)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # torch intra-op threads; 0 keeps torch's default
+
+
+class EmbeddingEngine(Embeddings):
+    """SentenceTransformer wrapper with length-sorted batching. embed() returns an (n, dim) float32 array."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 num_threads: Optional[int] = EMBEDDING_THREADS, device: str = "cpu"):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # Longest first, so every batch holds texts of similar length
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch_ids = order[start:start + self.batch_size]
+            vectors[batch_ids] = self.model.encode(
+                [texts[i] for i in batch_ids],
+                batch_size=len(batch_ids),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_embedding_engine(model_name: str = DEFAULT_MODEL) -> EmbeddingEngine:
+    """One loaded model per name per process"""
+    with _engines_lock:
+        engine = _engines.get(model_name)
+        if engine is None:
+            engine = EmbeddingEngine(model_name)
+            _engines[model_name] = engine
+        return engine
@@ -1,11 +1,12 @@
 import os
 import getpass
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 
+from segment_log import SegmentLog
+from embedding_engine import get_embedding_engine
+import llm_client
+
 load_dotenv()
 
 def answer_question(question: str):
@@ -21,11 +22,13 @@ def answer_question(question: str):
             GOOGLE_API_KEY = getpass.getpass("Enter your Google API key: ")
             os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-        embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        embedding_model = get_embedding_engine()
         
         # Load vector store with error handling
         try:
-            vector_store = FAISS.load_local("faiss_index", embedding_model, allow_dangerous_deserialization=True)
+            vector_store = SegmentLog("faiss_index").load(embedding_model)
+            if vector_store is None:
+                return "I don't know (No documents have been uploaded yet)."
             print(" FAISS index loaded successfully")
         except Exception as e:
             print(f" Error loading FAISS index: {e}")
@@ -54,14 +57,6 @@ def answer_question(question: str):
 
         print(f" Context length: {len(context_text)} characters")
 
-        # Initialize LLM for answering
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.3,  
-            streaming=True,
-            convert_system_message_to_human=True
-        )
-
         # Improved prompt for structured CV data
         prompt = PromptTemplate(
             template="""
@@ -88,7 +83,7 @@ def answer_question(question: str):
         
         print(f" Sending prompt to LLM...")
         
-        answer = llm.invoke(final_prompt)
+        answer = llm_client.invoke(final_prompt, "gemini-2.5-flash", 0.3)
         
         print(f" LLM response received")
         return answer.content
@@ -0,0 +1,85 @@
+# streaming_pipeline.py - page-window Docling conversion -> chunks -> rolling embed/index batches
+#
+# A 300-page PDF is never converted, exported or split as a whole: the PDF is
+# cut into windows of DOCLING_PAGES_PER_WINDOW pages (pypdfium2, which Docling
+# already depends on), each window is converted and split on its own, and chunks
+# are embedded and written in batches of INDEX_BATCH_SIZE. Peak memory is one
+# window plus one batch, and each batch is committed as soon as it is embedded,
+# so the first one is searchable long before the last page is parsed. Chunks
+# never span two windows, which lets an interrupted file resume at a window.
+import io
+import os
+from typing import Callable, Iterator, List, Tuple
+
+import pypdfium2 as pdfium
+from docling.datamodel.base_models import DocumentStream
+from langchain.schema import Document
+
+DOCLING_PAGES_PER_WINDOW = int(os.getenv("DOCLING_PAGES_PER_WINDOW", "8"))
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "128"))  # chunks embedded + appended per segment
+
+
+def count_pages(pdf_path: str) -> int:
+    source = pdfium.PdfDocument(pdf_path)
+    try:
+        return len(source)
+    finally:
+        source.close()
+
+
+def iter_pdf_windows(pdf_path: str, pages_per_window: int = DOCLING_PAGES_PER_WINDOW,
+                     first_page: int = 1) -> Iterator[Tuple[int, int, io.BytesIO]]:
+    """(first_page, last_page, PDF bytes) per window from first_page on; pages are 1-based"""
+    source = pdfium.PdfDocument(pdf_path)
+    try:
+        total = len(source)
+        for start in range(first_page - 1, total, pages_per_window):
+            pages = list(range(start, min(start + pages_per_window, total)))
+            window = pdfium.PdfDocument.new()
+            window.import_pages(source, pages=pages)
+            buffer = io.BytesIO()
+            window.save(buffer)
+            window.close()
+            buffer.seek(0)
+            yield pages[0] + 1, pages[-1] + 1, buffer
+    finally:
+        source.close()
+
+
+def stream_markdown(pdf_path: str, converter, pages_per_window: int = DOCLING_PAGES_PER_WINDOW,
+                    first_page: int = 1) -> Iterator[Tuple[int, int, str]]:
+    """(first_page, last_page, markdown) as Docling finishes each window"""
+    name = os.path.basename(pdf_path)
+    for first_page, last_page, buffer in iter_pdf_windows(pdf_path, pages_per_window, first_page):
+        result = converter.convert(DocumentStream(name=f"{first_page}-{last_page}-{name}", stream=buffer))
+        markdown = result.document.export_to_markdown()
+        if markdown.strip():
+            yield first_page, last_page, markdown
+
+
+def stream_chunks(pdf_path: str, converter, splitter, pages_per_window: int = DOCLING_PAGES_PER_WINDOW,
+                  first_page: int = 1) -> Iterator[Document]:
+    """Split each window as it is converted, tagging chunks with their page range"""
+    for first_page, last_page, markdown in stream_markdown(pdf_path, converter, pages_per_window, first_page):
+        window_doc = Document(page_content=markdown,
+                              metadata={"source": pdf_path, "page": first_page, "page_end": last_page})
+        for chunk in splitter.split_documents([window_doc]):
+            yield chunk
+
+
+def index_in_batches(chunks: Iterator[Document], write_batch: Callable[[List[Document]], None],
+                     batch_size: int = INDEX_BATCH_SIZE) -> int:
+    """Hand chunks to write_batch batch_size at a time. Returns the number of chunks written."""
+    batch = []
+    written = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            write_batch(batch)
+            written += len(batch)
+            print(f" Indexed {written} chunks so far")
+            batch = []
+    if batch:
+        write_batch(batch)
+        written += len(batch)
+    return written
@@ -1,16 +1,26 @@
 import os
 import json
+import threading
 from docling.datamodel.base_models import InputFormat
 from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, EasyOcrOptions
 from docling.datamodel.settings import settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 
+from segment_log import SegmentLog
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+from streaming_pipeline import DOCLING_PAGES_PER_WINDOW, count_pages, stream_chunks, index_in_batches
+import llm_client
+
+# Pending segments that trigger a background compaction into the snapshot
+COMPACT_AFTER_SEGMENTS = 50
+# Progress of files whose indexing has not finished yet, one JSON file per hash
+INGEST_DIR = "ingest"
+_compaction_lock = threading.Lock()
+
 
 def load_hash_index(hash_index_file):
     """Load the stored file hashes (if exists)."""
@@ -81,13 +91,6 @@ def validate_and_format_cv_structure(raw_text):
     try:
         print(" Validating CV structure with LLM...")
         
-        # Initialize LLM for structuring
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.1, 
-            convert_system_message_to_human=True
-        )
-        
         prompt = PromptTemplate(
             template=prompt_template,
             input_variables=["raw_text", "standard_headers"]
@@ -98,7 +101,8 @@ def validate_and_format_cv_structure(raw_text):
             "standard_headers": ", ".join(STANDARD_CV_HEADERS)
         })
         
-        response = llm.invoke(formatted_prompt)
+        # Low temperature for consistent formatting
+        response = llm_client.invoke(formatted_prompt, "gemini-2.5-flash", 0.1)
         print(" CV structure validation completed")
         return response.content
         
@@ -176,39 +180,140 @@ def convert_pdf_with_docling(pdf_path):
     
     return [doc]
 
+def embed_segment_record(chunks, embedding_model, id_prefix, first_chunk):
+    """
+    Embed chunks into one FAISS segment record. Ids are <id_prefix>-<chunk number>,
+    so indexing the same file again yields the same ids and replay keeps one copy.
+    """
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+    ids = [f"{id_prefix}-{first_chunk + i}" for i in range(len(chunks))]
+    vectors = embedding_model.embed_documents(texts)
+    return SegmentLog.add_record(texts, vectors, metadatas, ids)
+
+
+def _ingest_progress_path(faiss_dir, file_hash):
+    return os.path.join(faiss_dir, INGEST_DIR, f"{file_hash}.json")
+
+
+def load_ingest_progress(faiss_dir, file_hash):
+    """
+    How far an interrupted indexing of file_hash got:
+        committed  - chunks already appended as segments
+        page       - first page of the window holding the next chunk
+        page_chunk - chunk number of that window's first chunk
+    """
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"committed": 0, "page": 1, "page_chunk": 0}
+
+
+def save_ingest_progress(faiss_dir, file_hash, progress):
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, path)
+
+
+def clear_ingest_progress(faiss_dir, file_hash):
+    path = _ingest_progress_path(faiss_dir, file_hash)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def stream_to_segment_log(open_chunks, embedding_model, faiss_dir, file_hash):
+    """
+    Embed chunks batch by batch, appending each batch as a segment the moment it is
+    embedded so it is searchable straight away. open_chunks(first_page) yields the
+    chunks from that page on. After every segment the progress file records the
+    window to restart from; a retry after a crash re-converts only that window and
+    skips the chunks already committed. Returns the number of chunks in the index.
+    """
+    log = SegmentLog(faiss_dir)
+    progress = load_ingest_progress(faiss_dir, file_hash)
+    if progress["committed"]:
+        print(f" Resuming at page {progress['page']}, {progress['committed']} chunks already indexed")
+    committed = progress["committed"]
+    window_start = {}  # window first page -> number of its first chunk
+
+    def numbered_chunks():
+        n = progress["page_chunk"]
+        for chunk in open_chunks(progress["page"]):
+            window_start.setdefault(chunk.metadata["page"], n)
+            if n >= committed:
+                yield chunk
+            n += 1
+
+    def append(batch):
+        nonlocal committed
+        log.append(embed_segment_record(batch, embedding_model, file_hash, committed))
+        committed += len(batch)
+        page = batch[-1].metadata["page"]
+        save_ingest_progress(faiss_dir, file_hash,
+                             {"committed": committed, "page": page, "page_chunk": window_start[page]})
+
+    index_in_batches(numbered_chunks(), append)
+
+    if len(log.pending_segments()) >= COMPACT_AFTER_SEGMENTS and not _compaction_lock.locked():
+        threading.Thread(target=compact_faiss_index, args=(faiss_dir, embedding_model), daemon=True).start()
+    return committed
+
+
+def compact_faiss_index(faiss_dir, embedding_model):
+    """Fold pending segments into a fresh snapshot (runs in a background thread)."""
+    if not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        log = SegmentLog(faiss_dir)
+        # Read the high-water mark first; segments appended during load are replayed again later, which is a no-op
+        last_segment = log.last_seq
+        vector_store = log.load(embedding_model)
+        if vector_store is not None:
+            log.write_snapshot(vector_store, last_segment)
+    except Exception as e:
+        print(f"FAISS compaction failed: {e}")
+    finally:
+        _compaction_lock.release()
+
+
 def add_to_faiss_index(pdf_path, file_hash, faiss_dir, hash_index_file):
     """Append new PDF embeddings to FAISS (if not already processed) using enhanced CV processing."""
     hash_index = load_hash_index(hash_index_file)
     if file_hash in hash_index:
         return f"Skipped: '{os.path.basename(pdf_path)}' already exists in vector store."
 
-    # Load and process document using enhanced CV processing
-    print(f" Processing CV with enhanced pipeline: {pdf_path}")
-    docs = convert_pdf_with_docling(pdf_path)
-
     # Use optimized chunking for structured CVs
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=300,  # Slightly larger to preserve header context
         chunk_overlap=80,
         separators=["\n## ", "\n# ", "\n\n", "\n", " "]  # Better for header-based splitting
     )
-    chunks = splitter.split_documents(docs)
-    
-    print(f" Split into {len(chunks)} chunks")
-
-    embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model = get_cached_embeddings(get_embedding_engine())
 
-    # If FAISS exists -> append
-    if os.path.exists(os.path.join(faiss_dir, "index.faiss")):
-        vector_store = FAISS.load_local(faiss_dir, embedding_model, allow_dangerous_deserialization=True)
-        vector_store.add_documents(chunks)
+    if count_pages(pdf_path) <= DOCLING_PAGES_PER_WINDOW:
+        # CV-sized: the LLM structuring pass needs the whole (short) text
+        print(f" Processing CV with enhanced pipeline: {pdf_path}")
+        chunks = splitter.split_documents(convert_pdf_with_docling(pdf_path))
+        print(f" Split into {len(chunks)} chunks")
+        # A single window (every chunk is tagged page 1), so a retry always starts from the top
+        open_chunks = lambda first_page: chunks
     else:
-        vector_store = FAISS.from_documents(chunks, embedding_model)
+        # Long document: convert, split and index page window by page window, no CV structuring
+        print(f" Streaming long document page window by page window: {pdf_path}")
+        converter = initialize_docling_converter()
+        open_chunks = lambda first_page: stream_chunks(pdf_path, converter, splitter, first_page=first_page)
 
-    vector_store.save_local(faiss_dir)
+    # One segment file per batch of chunks instead of rewriting the whole index
+    written = stream_to_segment_log(open_chunks, embedding_model, faiss_dir, file_hash)
+    print(f" Indexed {written} chunks")
 
     # Update hash index
     hash_index[file_hash] = os.path.basename(pdf_path)
     save_hash_index(hash_index, hash_index_file)
+    clear_ingest_progress(faiss_dir, file_hash)
 
     return f"Embeddings added successfully for '{os.path.basename(pdf_path)}' (with enhanced structuring)."
\ No newline at end of file
@@ -1,10 +1,13 @@
 # build_index.py
-import os
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.schema.document import Document
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+#
+#   python build_index.py --workers 8 --batch-size 256
+#
+# PDFs are parsed in a process pool while the main process embeds (see parallel_indexer.py)
+import argparse
+
+from embedding_engine import get_embedding_engine
+from embedding_cache import get_cached_embeddings
+from parallel_indexer import INDEX_BATCH_SIZE, INDEX_WORKERS, build_index
 
 # -------------------------------
 #Config
@@ -12,53 +15,23 @@ from langchain_community.vectorstores import FAISS
 DATA_DIR = "data"
 SAVE_PATH = "faiss_index"
 
-# -------------------------------
-#Load all PDFs
-# -------------------------------
-def load_all_pdfs(data_dir):
-    all_docs = []
-    for filename in os.listdir(data_dir):
-        if filename.endswith(".pdf"):
-            pdf_path = os.path.join(data_dir, filename)
-            print(f" Loading: {pdf_path}")
-            loader = PyPDFLoader(pdf_path, mode="single")
-            docs = loader.load()
-            all_docs.extend(docs)
-    print(f" Total documents loaded: {len(all_docs)}")
-    return all_docs
 
-documents = load_all_pdfs(DATA_DIR)
+def main():
+    parser = argparse.ArgumentParser(description="Build the FAISS index from every PDF in a directory")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--save-path", default=SAVE_PATH)
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS, help="PDF parser processes (0 = one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
 
-# -------------------------------
-# Split into chunks
-# -------------------------------
-def split_documents(documents: list[Document]):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-        is_separator_regex=False
-    )
-    return splitter.split_documents(documents)
+    print(" Generating embeddings using all-MiniLM-L6-v2...")
+    # Chunks embedded by a previous build are read back from embedding_cache/
+    embedding_model = get_cached_embeddings(get_embedding_engine())
+    build_index(args.data_dir, args.save_path, embedding_model, workers=args.workers,
+                batch_size=args.batch_size, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
 
-print(" Splitting into chunks...")
-chunks = split_documents(documents)
-print(f" Total chunks created: {len(chunks)}")
 
-# -------------------------------
-# Generate embeddings
-# -------------------------------
-print(" Generating embeddings using all-MiniLM-L6-v2...")
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-# -------------------------------
-# Create FAISS store
-# -------------------------------
-print(" Creating FAISS vector store...")
-vector_store = FAISS.from_documents(chunks, embedding_model)
-
-# -------------------------------
-# Save FAISS index
-# -------------------------------
-vector_store.save_local(SAVE_PATH)
-print(f" Vector store saved successfully at: {SAVE_PATH}")
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,9 @@ import os
 import getpass
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
+from embedding_engine import get_embedding_engine
 
 # -------------------------------
 #Environment Setup
@@ -23,7 +23,7 @@ GOOGLE_API_KEY = configure()
 # -------------------------------
 #Load Vector Store
 # -------------------------------
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+embedding_model = get_embedding_engine()
 vector_store = FAISS.load_local(
     "faiss_index",
     embedding_model,